@@ -0,0 +1,250 @@
+"""
+Admission control for expensive endpoints.
+
+Each limited endpoint gets two independent guards:
+
+* a concurrency limit: at most ``concurrency`` requests run at once in this
+  process; extra requests are turned away immediately with ``503``.
+* a per-user token bucket: ``rate`` requests per second with bursts of up to
+  ``burst``; requests over the limit get ``429``.
+
+Both answers carry ``Retry-After`` so well-behaved clients back off. The
+buckets live in memory by default; with ``ADMISSION_BACKEND_URL`` pointing at
+Redis they are shared by every worker instead.
+
+Limits are configured per endpoint through ``ADMISSION_LIMITS``::
+
+    {'download_report': {'concurrency': 4, 'rate': 0.2, 'burst': 2}}
+
+A missing key means that guard is not applied. A request only spends a
+token once it has a concurrency slot, so being turned away with ``503``
+costs the client nothing.
+"""
+
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+from flask_login import current_user
+
+MAX_TRACKED_KEYS = 100000
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class TokenBucket:
+    """In-process token buckets, one per key"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Consume a token; returns seconds to wait, or 0 when allowed"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(self._buckets) > MAX_TRACKED_KEYS:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # A bucket idle long enough to have refilled completely is equivalent to no bucket
+        full_after = self.burst / self.rate
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if now - state[1] < full_after
+        }
+
+
+class RedisTokenBucket:
+    """Token buckets shared between workers through Redis"""
+
+    SCRIPT = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, client, name, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.prefix = f"admission:{name}:"
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key):
+        return float(self._script(keys=[f"{self.prefix}{key}"], args=[self.rate, self.burst, time.time()]))
+
+
+class EndpointLimits:
+    def __init__(self, name, concurrency=None, bucket=None):
+        self.name = name
+        self.concurrency = ConcurrencyLimiter(concurrency) if concurrency else None
+        self.bucket = bucket
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_concurrency = 0
+
+
+class AdmissionController:
+    def __init__(self, app=None, on_decision=None):
+        self.limits = {}
+        self.redis = None
+        self.on_decision = on_decision  # Called with (limit name, outcome) for metrics
+        self._lock = threading.Lock()  # Guards the decision counters
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.limits = {}
+        self.redis = None
+        backend_url = app.config.get('ADMISSION_BACKEND_URL')
+        if backend_url:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("ADMISSION_BACKEND_URL is set but the 'redis' package is not installed")
+            self.redis = redis.Redis.from_url(backend_url)
+
+        for name, config in app.config.get('ADMISSION_LIMITS', {}).items():
+            bucket = None
+            if config.get('rate'):
+                burst = config.get('burst', max(1, math.ceil(config['rate'])))
+                if self.redis is not None:
+                    bucket = RedisTokenBucket(self.redis, name, config['rate'], burst)
+                else:
+                    bucket = TokenBucket(config['rate'], burst)
+            self.limits[name] = EndpointLimits(name, config.get('concurrency'), bucket)
+
+    def _reject(self, status, message, retry_after):
+        response = jsonify({'error': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def acquire(self, name, key):
+        """Admit one request to ``name`` for client ``key``.
+
+        Returns None when admitted (call :meth:`release` when it finishes), or
+        the ``(status, message, retry_after)`` to reject it with.
+        """
+        limits = self.limits.get(name)
+        if limits is None:
+            return None
+
+        if limits.concurrency is not None and not limits.concurrency.try_acquire():
+            self._count(limits, 'rejected_concurrency')
+            self._record(name, 'rejected_concurrency')
+            return 503, 'Server busy, please retry shortly', 1
+
+        if limits.bucket is not None:
+            wait = limits.bucket.take(key)
+            if wait > 0:
+                if limits.concurrency is not None:
+                    limits.concurrency.release()
+                self._count(limits, 'rejected_rate')
+                self._record(name, 'rejected_rate_limit')
+                return 429, 'Too many requests, please slow down', wait
+
+        self._count(limits, 'admitted')
+        self._record(name, 'admitted')
+        return None
+
+    def _count(self, limits, counter):
+        with self._lock:
+            setattr(limits, counter, getattr(limits, counter) + 1)
+
+    def _record(self, name, outcome):
+        if self.on_decision is not None:
+            self.on_decision(name, outcome)
+
+    def release(self, name):
+        limits = self.limits.get(name)
+        if limits is not None and limits.concurrency is not None:
+            limits.concurrency.release()
+
+    def release_early(self, name):
+        """Give back the current request's concurrency slot for ``name`` before the view returns.
+
+        For views that go on to wait without doing any work, such as a long
+        poll, so waiting clients don't hold slots others could use.
+        """
+        held = g.get('admission_held')
+        if held is not None and name in held:
+            held.discard(name)
+            self.release(name)
+
+    def limit(self, name):
+        """Decorator applying the limits configured for ``name`` to a view"""
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                key = current_user.get_id() if current_user.is_authenticated else request.remote_addr
+                rejection = self.acquire(name, key)
+                if rejection is not None:
+                    return self._reject(*rejection)
+                held = g.setdefault('admission_held', set())
+                held.add(name)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    if name in held:
+                        held.discard(name)
+                        self.release(name)
+            return wrapped
+        return decorator
+
+    def metrics(self):
+        with self._lock:
+            return {
+                name: {
+                    'admitted': limits.admitted,
+                    'rejected_rate_limit': limits.rejected_rate,
+                    'rejected_concurrency': limits.rejected_concurrency,
+                    'in_flight': limits.concurrency.in_flight if limits.concurrency else None,
+                    'concurrency_limit': limits.concurrency.limit if limits.concurrency else None,
+                    'rate': limits.bucket.rate if limits.bucket else None,
+                    'burst': limits.bucket.burst if limits.bucket else None,
+                }
+                for name, limits in self.limits.items()
+            }
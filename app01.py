@@ -1,56 +1,156 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, current_app, has_app_context, render_template, request, jsonify, redirect, url_for, flash, send_file, abort
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
 from datetime import datetime
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 import os
-import uuid
 from dotenv import load_dotenv
 import secrets
 import numpy as np
 import json
 import io
+import logging
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+import matplotlib
+matplotlib.use('Agg')  # Charts are only rendered to files; there is no display
 import matplotlib.pyplot as plt
 import base64
 import random
+import hashlib
+import time
+import mimetypes
+import posixpath
+from upload_storage import (spool_upload, store_spooled, remove_stored, stage_removal, finish_removal, undo_removal,
+                            discard, shard_path, file_extension)
+from background_tasks import BackgroundWorker, TaskResults
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from image_pipeline import build_variants
+from certificate_import import import_certificates, detect_format
+from catalog_import import catalog_key_for
+from read_models import (load_courses, with_descriptions, serialize_course, summary_query, to_records, record_rows,
+                         popularity, normalize_difficulty)
+from identity_cache import IdentityCache, CachedUser
+from password_hashing import PasswordHasher, HashingBusy
+from admission import AdmissionController
+from query_profiler import QueryProfiler
+from db_routing import RoutingSQLAlchemy, ReplicaRouter
+from db_backend import engine_options
+from cache import TieredCache, CATALOG_TAG, user_tag
+from singleflight import SingleFlight
+from events import EventBus, RESET
+from view_registry import ViewRegistry
+from preload import preload_fonts, compile_templates
+from observability import (Observability, TimedQueuePool, configure_logging, span, cache_lookup,
+                           admission_decision, flight_call, event_published)
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
-# MySQL Database Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
-
-# Additional recommended settings
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 3600,
-    'pool_size': 10,
-    'max_overflow': 20
-}
+def configure(app, overrides=None):
+    """Read the settings from the environment; ``overrides`` take precedence"""
+    # Database Configuration: MySQL in production; SQLite (WAL mode) works for development and benchmarks
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+    # Keep it outside static/: images are only served through the ownership-checked certificate_image route
+    app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+    app.config['BACKGROUND_WORKERS'] = int(os.environ.get('BACKGROUND_WORKERS', 2))
+    app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 60))  # seconds
+    app.config['IDENTITY_CACHE_SIZE'] = int(os.environ.get('IDENTITY_CACHE_SIZE', 10000))
+    # Changing the hash parameters upgrades existing hashes as users log in
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+    # Seconds a sign-in waits for room in a full hashing queue before a 503 (0: fail fast)
+    app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 0))
+
+    # Admission control for expensive endpoints (see admission.py); override with a JSON string
+    app.config['ADMISSION_LIMITS'] = json.loads(os.environ.get('ADMISSION_LIMITS', 'null')) or {
+        'download_report': {'concurrency': 4, 'rate': 0.2, 'burst': 3},
+        'recommendations': {'concurrency': 16, 'rate': 2, 'burst': 10},
+    }
+    app.config['ADMISSION_BACKEND_URL'] = os.environ.get('ADMISSION_BACKEND_URL')  # e.g. redis://localhost:6379/0
+
+    # SQL profiling and N+1 detection (see query_profiler.py)
+    app.config['SQL_PROFILER_ENABLED'] = os.environ.get('SQL_PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['SQL_PROFILER_STRICT'] = os.environ.get('SQL_PROFILER_STRICT', '').lower() in ('1', 'true', 'yes')
+    app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    app.config['SQL_QUERY_BUDGETS'] = json.loads(os.environ.get('SQL_QUERY_BUDGETS', '{}'))  # endpoint -> max queries
+    app.config['RECOMMENDATION_MAX_WAIT'] = 10  # seconds a follow-up request may wait for results
+    # Recommendation picks stay the same for a user for this long, then rotate (default: daily)
+    app.config['RECOMMENDATION_ROTATION_SECONDS'] = int(os.environ.get('RECOMMENDATION_ROTATION_SECONDS', 86400))
+    # Cache of computed payloads (see cache.py): per-worker LRU plus an optional shared tier
+    app.config['CACHE_URL'] = os.environ.get('CACHE_URL')  # e.g. redis://localhost:6379/1 or shm:///dev/shm/cd-cache.sqlite
+    app.config['CACHE_LOCAL_SIZE'] = int(os.environ.get('CACHE_LOCAL_SIZE', 2048))
+    app.config['CACHE_DEFAULT_TTL'] = float(os.environ.get('CACHE_DEFAULT_TTL', 300))  # seconds
+    app.config['CACHE_VERSION_TTL'] = float(os.environ.get('CACHE_VERSION_TTL', 0))
+    # How long /api/courses is served from the cached catalog when nothing invalidates it
+    app.config['CATALOG_CACHE_TTL'] = float(os.environ.get('CATALOG_CACHE_TTL', 60))
+    # Live dashboard updates (see events.py); they go through the cache's shared tier
+    app.config['EVENTS_RETENTION'] = float(os.environ.get('EVENTS_RETENTION', 300))  # seconds a reconnecting client can catch up
+    app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))
+    app.config['EVENTS_HEARTBEAT'] = float(os.environ.get('EVENTS_HEARTBEAT', 15))  # seconds between keep-alives on idle streams
 
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    # Logging and metrics (see observability.py)
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+    app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))  # Fraction of DEBUG/INFO records kept
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # Bearer token required by /metrics, if set
+    # Hand certificate image transfers to the front proxy: '', 'x-sendfile' or 'x-accel-redirect'
+    app.config['IMAGE_SENDFILE_MODE'] = os.environ.get('IMAGE_SENDFILE_MODE', '').lower()
+    # Internal nginx location that maps onto UPLOAD_FOLDER (used with x-accel-redirect)
+    app.config['IMAGE_ACCEL_REDIRECT_PREFIX'] = os.environ.get('IMAGE_ACCEL_REDIRECT_PREFIX', '/protected-uploads')
 
-db = SQLAlchemy(app)
+    # Optional read replicas (comma-separated URLs) used by read-only endpoints
+    app.config['SQLALCHEMY_REPLICA_URLS'] = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # After a user writes, their reads stay on the primary for this long
+    app.config['READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    app.config.update(overrides or {})
+
+    # Additional recommended settings (pool sizing only applies to server databases)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI'] or 'sqlite://', {
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'pool_size': 10,
+        'max_overflow': 20,
+        'poolclass': TimedQueuePool  # Records checkout wait for /metrics
+    }))
+
+log = logging.getLogger(__name__)
+
+# Extensions are bound to an application in create_app
+db = RoutingSQLAlchemy()
+replicas = ReplicaRouter()
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
+background = BackgroundWorker()
+certificate_recommendations = TaskResults()
+password_hasher = PasswordHasher()
+admission = AdmissionController(on_decision=admission_decision)
+query_profiler = QueryProfiler()
+observability = Observability()
+cache = TieredCache(on_lookup=cache_lookup)
+# Identical concurrent recommendation and report requests share one computation
+flights = SingleFlight(on_call=flight_call)
+events = EventBus(on_publish=event_published)
+identity_cache = IdentityCache(on_lookup=lambda hit: cache_lookup('identity', 'hit' if hit else 'miss'))
+views = ViewRegistry()
+
+def active_app():
+    """The application of the current context, else the module-level one (the async app has no Flask context)"""
+    return current_app._get_current_object() if has_app_context() else app
 
 # Database Models
 class Course(db.Model):
@@ -68,6 +168,30 @@ class Course(db.Model):
     url = db.Column(db.String(255))  # URL to the course
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    catalog_key = db.Column(db.String(255))  # Natural key used by catalog_import upserts
+    popularity_score = db.Column(db.Float)  # rating * 0.7 + students_count / 100000 * 0.3, kept in sync on write
+
+    __table_args__ = (
+        db.Index('uq_course_catalog_key', 'catalog_key', unique=True),
+        db.Index('ix_course_bucket_score', 'domain', 'difficulty', 'popularity_score'),
+        db.Index('ix_course_popularity_score', 'popularity_score'),
+    )
+
+@event.listens_for(Course, 'before_insert')
+def assign_catalog_key(mapper, connection, course):
+    if course.catalog_key is None and course.name:
+        course.catalog_key = catalog_key_for(course.name)
+
+@event.listens_for(Course, 'before_insert')
+@event.listens_for(Course, 'before_update')
+def update_popularity_score(mapper, connection, course):
+    course.popularity_score = popularity(course)
+
+@event.listens_for(Course, 'before_insert')
+@event.listens_for(Course, 'before_update')
+def normalize_course_difficulty(mapper, connection, course):
+    # Recommendation buckets match the stored spelling exactly
+    course.difficulty = normalize_difficulty(course.difficulty)
 
 class UserCertificate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -78,6 +202,57 @@ class UserCertificate(db.Model):
     feedback = db.Column(db.Text)
     image_path = db.Column(db.String(255))  # Path to the certificate image
 
+    __table_args__ = (db.Index('ix_user_certificate_user_course', 'user_id', 'course_id'),)
+
+@event.listens_for(UserCertificate, 'after_insert')
+@event.listens_for(UserCertificate, 'after_update')
+@event.listens_for(UserCertificate, 'after_delete')
+def remember_certificate_change(mapper, connection, certificate):
+    remember_invalidated_tag(object_session(certificate), user_tag(certificate.user_id))
+
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_update')
+@event.listens_for(Course, 'after_delete')
+def remember_catalog_change(mapper, connection, course):
+    remember_invalidated_tag(object_session(course), CATALOG_TAG)
+
+def remember_invalidated_tag(session, tag):
+    # Bumped once the change is committed; readers in between still see the old data
+    if session is not None:
+        session.info.setdefault('invalidated_tags', set()).add(tag)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed_tags(session):
+    tags = session.info.pop('invalidated_tags', ())
+    if tags:
+        cache.invalidate(*tags)
+
+class UploadBlob(db.Model):
+    """A content-addressed upload shared by every certificate that references it"""
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 of the file contents
+    path = db.Column(db.String(255), unique=True, nullable=False)  # Relative to UPLOAD_FOLDER
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    variants = db.Column(db.Text)  # JSON map of thumbnail name -> path, filled in by the image pipeline
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def variant_paths(self):
+        return variant_paths(self.variants)
+
+def variant_paths(variants):
+    """Decode an UploadBlob.variants value into a map of thumbnail name -> path"""
+    return json.loads(variants) if variants else {}
+
+class CourseLinkCheck(db.Model):
+    """Outcome of the last health check of a course URL (written by check_urls.py)"""
+    url = db.Column(db.String(255), primary_key=True)
+    status_code = db.Column(db.Integer)
+    ok = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.String(255))
+    final_url = db.Column(db.String(255))  # After redirects
+    elapsed_ms = db.Column(db.Integer)
+    checked_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -87,14 +262,205 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+
+def load_user_record(user_id):
+    """Fetch just the columns an authenticated request needs"""
+    # Always from the primary, so a newly registered user is never missing
+    with replicas.primary():
+        row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+    return CachedUser(*row) if row else None
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return identity_cache.get_or_load(int(user_id), load_user_record)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+    # Drop it again once the change is visible, in case a concurrent request
+    # re-cached the old row between the flush and the commit
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('invalidated_users', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed_users(session):
+    for user_id in session.info.pop('invalidated_users', ()):
+        identity_cache.invalidate(user_id)
+
+# Certificate upload storage
+UPLOAD_URL_PREFIX = 'uploads'  # Stored image_path values are this prefix plus the path relative to UPLOAD_FOLDER
+
+def upload_relative_path(image_path):
+    """Convert a stored image_path into a path relative to UPLOAD_FOLDER"""
+    path = image_path.replace('\\', '/')
+    prefix = UPLOAD_URL_PREFIX + '/'
+    return path[len(prefix):] if path.startswith(prefix) else os.path.basename(path)
+
+def add_upload_reference(digest, relative_path, size):
+    """Count one more reference to a stored upload, creating its row on first use.
+
+    The row stays locked until the transaction ends, so a delete of the last
+    reference can't remove the file in the meantime, and the increment is a
+    single UPDATE so concurrent uploads cannot lose a reference. Returns the
+    path the content is stored under.
+    """
+    stored_path = (UploadBlob.query.with_entities(UploadBlob.path).filter_by(digest=digest)
+                   .with_for_update().scalar())
+    if stored_path is not None:
+        UploadBlob.query.filter_by(digest=digest).update(
+            {UploadBlob.ref_count: UploadBlob.ref_count + 1},
+            synchronize_session=False
+        )
+        return stored_path
+    db.session.add(UploadBlob(digest=digest, path=relative_path, size=size, ref_count=1))
+    return relative_path
+
+def drop_upload_reference(image_path):
+    """Release one reference to a stored upload.
+
+    Returns the paths (relative to UPLOAD_FOLDER) of the original and its
+    thumbnails, to be removed from disk with the surrounding transaction (see
+    upload_storage.stage_removal). The list is empty while other certificates
+    still reference the same file. The row stays locked until the transaction
+    ends.
+    """
+    relative_path = upload_relative_path(image_path)
+    blob = UploadBlob.query.filter_by(path=relative_path).with_for_update().first()
+    if blob is None:
+        # Legacy upload stored before content addressing; owned by one certificate
+        return [relative_path]
+    UploadBlob.query.filter_by(digest=blob.digest).update(
+        {UploadBlob.ref_count: UploadBlob.ref_count - 1},
+        synchronize_session=False
+    )
+    remaining = UploadBlob.query.with_entities(UploadBlob.ref_count).filter_by(digest=blob.digest).scalar()
+    if remaining > 0:
+        return []
+    UploadBlob.query.filter_by(digest=blob.digest).delete(synchronize_session=False)
+    return [relative_path] + list(blob.variant_paths().values())
+
+def discard_unreferenced_upload(digest, relative_path):
+    """Remove a file stored for an upload whose transaction failed, unless another upload now references it"""
+    try:
+        if UploadBlob.query.filter_by(digest=digest).with_for_update().first() is None:
+            remove_stored(current_app.config['UPLOAD_FOLDER'], relative_path)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        log.warning("Cleaning up a failed upload failed", extra={'digest': digest}, exc_info=True)
+
+def process_certificate_image(digest):
+    """Background job: generate thumbnails for a newly stored upload"""
+    blob = UploadBlob.query.get(digest)
+    if blob is None or blob.variants is not None:
+        return
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    source = os.path.join(upload_folder, *blob.path.split('/'))
+    variants = build_variants(source, upload_folder, digest)
+    # Only fill the column if nobody else did in the meantime
+    updated = UploadBlob.query.filter_by(digest=digest, variants=None).update(
+        {UploadBlob.variants: json.dumps(variants)},
+        synchronize_session=False
+    )
+    if not updated and UploadBlob.query.filter_by(digest=digest).with_for_update().first() is None:
+        # The last reference was deleted while the thumbnails were being
+        # written, so nothing else knows about these files
+        for relative_path in variants.values():
+            remove_stored(upload_folder, relative_path)
+        db.session.commit()
+        log.info("Discarded thumbnails of a deleted upload", extra={'digest': digest})
+        return
+    db.session.commit()
+    log.info("Generated thumbnails", extra={'digest': digest, 'variants': len(variants)})
+
+def certificate_image_urls(certificate_id, image_path, variants, build_url=url_for):
+    """Build the full-size and thumbnail URLs for a certificate image.
+
+    The stored filename is part of every URL, so for content-addressed files
+    a URL always refers to the same bytes and can be cached indefinitely.
+    ``variants`` maps thumbnail names to paths (see variant_paths).
+    """
+    if not image_path:
+        return None, {}
+    relative_path = upload_relative_path(image_path)
+    full_url = build_url('certificate_image', certificate_id=certificate_id,
+                         variant='original', filename=posixpath.basename(relative_path))
+    thumbnails = {
+        name: build_url('certificate_image', certificate_id=certificate_id,
+                        variant=name, filename=posixpath.basename(path))
+        for name, path in variants.items()
+    }
+    return full_url, thumbnails
+
+def upload_variants_query(relative_paths):
+    return select(UploadBlob.path, UploadBlob.variants).where(UploadBlob.path.in_(list(relative_paths)))
+
+def build_relative_url(endpoint, **values):
+    """url_for outside a request (background jobs, the async app): the path only"""
+    return active_app().url_map.bind('').build(endpoint, values)
+
+def certificate_payload(cert, variants, build_url=url_for):
+    """Response payload for a row of user_certificate_query"""
+    image_url, thumbnails = certificate_image_urls(cert.id, cert.image_path, variants, build_url)
+    return {
+        'id': cert.id,
+        'course_id': cert.course_id,
+        'course_name': cert.course_name,
+        'domain': cert.domain,
+        'duration': cert.duration,
+        'difficulty': cert.difficulty,
+        'performance_score': cert.performance_score,
+        'completion_date': cert.completion_date.isoformat(),
+        'image_url': image_url,
+        'thumbnail_url': thumbnails.get('sm', image_url),
+        'thumbnails': thumbnails
+    }
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LEGACY_UPLOAD_MAX_AGE = 24 * 3600
+
+def send_upload(relative_path, content_addressed):
+    """Send a stored upload, offloading the transfer to the proxy when configured"""
+    full_path = os.path.abspath(os.path.join(current_app.config['UPLOAD_FOLDER'], *relative_path.split('/')))
+    if not os.path.isfile(full_path):
+        abort(404)
+    
+    mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    etag = relative_path.replace('/', '-') if content_addressed else None
+    max_age = IMMUTABLE_MAX_AGE if content_addressed else LEGACY_UPLOAD_MAX_AGE
+    mode = current_app.config['IMAGE_SENDFILE_MODE']
+    
+    if mode == 'x-accel-redirect':
+        # nginx serves the bytes (including Range requests) from an internal location
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = '/'.join([current_app.config['IMAGE_ACCEL_REDIRECT_PREFIX'].rstrip('/'), relative_path])
+    elif mode == 'x-sendfile':
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Sendfile'] = full_path
+    else:
+        # conditional=True answers If-None-Match and Range requests; the file
+        # object goes through wsgi.file_wrapper, which servers turn into sendfile()
+        response = send_file(full_path, mimetype=mimetype, conditional=True,
+                             etag=etag or True, max_age=max_age)
+    
+    if etag and mode:
+        response.set_etag(etag)
+    # Images are only visible to their owner, so shared caches must not keep them
+    response.cache_control.public = None
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    if content_addressed:
+        response.cache_control.immutable = True
+    return response
 
 # ML Model for Course Recommendations
 def train_recommendation_model():
@@ -149,311 +515,290 @@ def train_recommendation_model():
     
     return model, scaler
 
-def get_course_recommendations(user_data):
+def course_records(*criteria):
+    """Column-projected course records (no description) matching ``criteria``"""
+    return load_courses(db.session, Course.__table__, *criteria)
+
+def catalog_payloads():
+    """Summary payloads (no description) for every course, as served by /api/courses"""
+    return [serialize_course(record, include_description=False) for record in course_records()]
+
+def cached_catalog_payloads():
+    """catalog_payloads through the cache; shared, so never modify them"""
+    return cache.get_or_set('catalog', catalog_payloads, tags=[CATALOG_TAG], ttl=current_app.config['CATALOG_CACHE_TTL'])
+
+def course_payloads(records):
+    """Serialize the chosen courses, fetching their descriptions in one query"""
+    with_descriptions(db.session, Course.__table__, records)
+    return [serialize_course(record) for record in records]
+
+def top_courses_query(limit, *criteria, user_id=None):
+    """Highest-scoring courses matching ``criteria``, skipping ones the user has completed.
+
+    Ranked by the stored popularity_score, so the database returns just the
+    top ``limit`` rows, walking ix_course_bucket_score for a domain/difficulty bucket.
+    """
+    course_table = Course.__table__
+    if user_id:
+        completed = select(UserCertificate.id).where(
+            UserCertificate.course_id == course_table.c.id,
+            UserCertificate.user_id == user_id
+        )
+        criteria += (~exists(completed),)
+    return (summary_query(course_table, *criteria)
+            .order_by(course_table.c.popularity_score.desc(), course_table.c.id)
+            .limit(limit))
+
+def top_courses(limit, *criteria, user_id=None):
+    return to_records(db.session.execute(top_courses_query(limit, *criteria, user_id=user_id)))
+
+def cached_top_courses(name, limit, *criteria, user_id=None):
+    """top_courses through the cache; ``name`` identifies ``criteria`` in the cache key"""
+    def load():
+        return record_rows(top_courses(limit, *criteria, user_id=user_id))
+    if not user_id:
+        rows = cache.get_or_set(f"top_courses:{name}:{limit}", load, tags=[CATALOG_TAG])
+    else:
+        # Excludes the user's completed courses, so it changes with their certificates
+        rows = cache.get_or_set(f"top_courses:{name}:{limit}:{user_id}", load,
+                                tags=[CATALOG_TAG, user_tag(user_id)], shared_only=True)
+    return to_records(rows)
+
+# Domains whose courses are suggested alongside each other
+RELATED_DOMAINS = {
+    'Data Analysis': ['Machine Learning', 'Full-Stack Development'],
+    'Full-Stack Development': ['Data Analysis', 'Machine Learning'],
+    'Machine Learning': ['Data Analysis', 'Full-Stack Development']
+}
+
+# Buckets to recommend from after a course of each difficulty:
+# (difficulty, look in related domains instead of the same one)
+NEXT_STEPS = {
+    'intermediate': [('Intermediate', False), ('Advanced', False)],
+    'advanced': [('Advanced', False), ('Advanced', True)],
+    'beginner': [('Intermediate', False), ('Beginner', True)],
+}
+RECOMMENDATION_CANDIDATES = 3  # Each bucket's pick is a seeded random choice among its top courses
+DEFAULT_RECOMMENDATION_POOL = 5
+DEFAULT_RECOMMENDATION_COUNT = 2
+
+def recommendation_buckets(domain, difficulty):
+    """(criteria, description) of each bucket to recommend from after a course.
+
+    After an intermediate course: an intermediate and an advanced course in the same domain.
+    After an advanced course: an advanced course in the same domain and one in a related domain.
+    After a beginner course: an intermediate course in the same domain and a beginner
+    course in a related domain.
+    """
+    buckets = []
+    for bucket_difficulty, related in NEXT_STEPS.get(difficulty.lower(), NEXT_STEPS['beginner']):
+        if related:
+            if domain not in RELATED_DOMAINS:
+                continue
+            domain_filter = Course.domain.in_(RELATED_DOMAINS[domain])
+        else:
+            domain_filter = Course.domain == domain
+        buckets.append(((domain_filter, Course.difficulty == bucket_difficulty),
+                        f"{bucket_difficulty.lower()} candidates in {'related domains' if related else domain}"))
+    return buckets
+
+def recommendation_period():
+    """(index of the current rotation period, seconds until it ends)"""
+    rotation = active_app().config['RECOMMENDATION_ROTATION_SECONDS']
+    now = time.time()
+    return int(now // rotation), rotation - now % rotation
+
+def recommendation_rng(user_id, period, bucket):
+    """RNG for picking from a bucket: the same picks for a user, bucket and period, varied across them"""
+    digest = hashlib.sha256(f"{user_id}|{period}|{bucket}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def recommendation_cache_entry(user_data):
+    """(key, tags, ttl, shared_only, period) of a recommendation payload in the cache, for both apps.
+
+    Picks are stable within a rotation period, so the payload is cached until
+    the period ends (at most CACHE_DEFAULT_TTL), or until the catalog or the
+    user's certificates change.
+    """
+    period, remaining = recommendation_period()
+    user_id = user_data.get('user_id')
+    key = f"recommendations:{user_data.get('domain')}/{user_data.get('difficulty')}/{user_id}:{period}"
+    tags = [CATALOG_TAG, user_tag(user_id)] if user_id else [CATALOG_TAG]
+    return key, tags, min(remaining, active_app().config['CACHE_DEFAULT_TTL']), bool(user_id), period
+
+def get_course_recommendations(user_data, period=None):
     """Get course recommendations based on user's completed course"""
+    if period is None:
+        period = recommendation_period()[0]
     try:
-        print(f"Getting recommendations for user data: {user_data}")
-        
-        # Get the domain and difficulty of the completed course
-        domain = user_data.get('domain', 'Programming')  # Default to Programming if not specified
-        difficulty = user_data.get('difficulty', 'Beginner')  # Default to Beginner if not specified
-        
-        print(f"Using domain: {domain}, difficulty: {difficulty}")
-        
-        # Get courses in the same domain
-        domain_courses = Course.query.filter_by(domain=domain).all()
-        print(f"Found {len(domain_courses)} courses in domain {domain}")
-        
-        if not domain_courses:
-            print(f"No courses found in domain {domain}, using default recommendations")
-            return get_default_recommendations(user_data)
-        
-        # Get user's previously completed courses
-        user_id = user_data.get('user_id')
-        completed_courses = []
-        if user_id:
-            completed_certificates = UserCertificate.query.filter_by(user_id=user_id).all()
-            completed_courses = [cert.course_id for cert in completed_certificates]
-            print(f"User has completed {len(completed_courses)} courses")
-        
-        # Sort courses by rating and students count, but exclude completed courses
-        available_courses = [c for c in domain_courses if c.id not in completed_courses]
-        if not available_courses:
-            print("No available courses in domain after excluding completed ones")
-            return get_default_recommendations(user_data)
+        with span('recommendation_scoring'):
+            # Get the domain and difficulty of the completed course
+            domain = user_data.get('domain', 'Programming')  # Default to Programming if not specified
+            difficulty = user_data.get('difficulty', 'Beginner')  # Default to Beginner if not specified
+            user_id = user_data.get('user_id')
+            log.debug("Getting recommendations", extra={'domain': domain, 'difficulty': difficulty, 'user_id': user_id})
             
-        # Sort by rating and students count
-        sorted_courses = sorted(
-            available_courses,
-            key=lambda x: (x.rating * 0.7 + (x.students_count / 100000) * 0.3),
-            reverse=True
-        )
-        
-        recommendations = []
-        
-        # If the completed course was intermediate, recommend:
-        # 1. One intermediate course in the same domain
-        # 2. One advanced course in the same domain
-        if difficulty.lower() == 'intermediate':
-            print("Finding intermediate and advanced course recommendations")
-            # Find intermediate courses (excluding completed ones)
-            intermediate_courses = [c for c in sorted_courses 
-                                 if c.difficulty.lower() == 'intermediate']
-            
-            # Find advanced courses
-            advanced_courses = [c for c in sorted_courses 
-                              if c.difficulty.lower() == 'advanced']
-            
-            print(f"Found {len(intermediate_courses)} intermediate courses and {len(advanced_courses)} advanced courses")
-            
-            # Add one intermediate course if available (randomly select from top 3)
-            if intermediate_courses:
-                top_intermediate = intermediate_courses[:min(3, len(intermediate_courses))]
-                selected_course = random.choice(top_intermediate)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
-            
-            # Add one advanced course if available (randomly select from top 3)
-            if advanced_courses:
-                top_advanced = advanced_courses[:min(3, len(advanced_courses))]
-                selected_course = random.choice(top_advanced)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
-        
-        # If the completed course was advanced, recommend:
-        # 1. One advanced course in the same domain
-        # 2. One advanced course in a related domain
-        elif difficulty.lower() == 'advanced':
-            print("Finding advanced course recommendations")
-            # Find other advanced courses in the same domain
-            same_domain_advanced = [c for c in sorted_courses 
-                                  if c.difficulty.lower() == 'advanced']
-            
-            # Get advanced courses from related domains
-            related_domains = {
-                'Data Analysis': ['Machine Learning', 'Full-Stack Development'],
-                'Full-Stack Development': ['Data Analysis', 'Machine Learning'],
-                'Machine Learning': ['Data Analysis', 'Full-Stack Development']
-            }
-            
-            related_domain_courses = []
-            if domain in related_domains:
-                for related_domain in related_domains[domain]:
-                    related_courses = Course.query.filter_by(
-                        domain=related_domain,
-                        difficulty='Advanced'
-                    ).all()
-                    # Filter out completed courses
-                    related_courses = [c for c in related_courses if c.id not in completed_courses]
-                    related_domain_courses.extend(related_courses)
-            
-            print(f"Found {len(same_domain_advanced)} advanced courses in same domain and {len(related_domain_courses)} in related domains")
-            
-            # Sort related domain courses
-            related_domain_courses.sort(
-                key=lambda x: (x.rating * 0.7 + (x.students_count / 100000) * 0.3),
-                reverse=True
-            )
-            
-            # Add one advanced course from the same domain if available (randomly select from top 3)
-            if same_domain_advanced:
-                top_same_domain = same_domain_advanced[:min(3, len(same_domain_advanced))]
-                selected_course = random.choice(top_same_domain)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
-            
-            # Add one advanced course from a related domain if available (randomly select from top 3)
-            if related_domain_courses:
-                top_related = related_domain_courses[:min(3, len(related_domain_courses))]
-                selected_course = random.choice(top_related)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
-        
-        # If the completed course was beginner, recommend:
-        # 1. One intermediate course in the same domain
-        # 2. One beginner course in a related domain
-        else:  # beginner
-            print("Finding intermediate and beginner course recommendations")
-            # Find intermediate courses in the same domain
-            intermediate_courses = [c for c in sorted_courses 
-                                 if c.difficulty.lower() == 'intermediate']
-            
-            # Get beginner courses from related domains
-            related_domains = {
-                'Data Analysis': ['Machine Learning', 'Full-Stack Development'],
-                'Full-Stack Development': ['Data Analysis', 'Machine Learning'],
-                'Machine Learning': ['Data Analysis', 'Full-Stack Development']
-            }
-            
-            related_domain_courses = []
-            if domain in related_domains:
-                for related_domain in related_domains[domain]:
-                    related_courses = Course.query.filter_by(
-                        domain=related_domain,
-                        difficulty='Beginner'
-                    ).all()
-                    # Filter out completed courses
-                    related_courses = [c for c in related_courses if c.id not in completed_courses]
-                    related_domain_courses.extend(related_courses)
-            
-            print(f"Found {len(intermediate_courses)} intermediate courses and {len(related_domain_courses)} beginner courses in related domains")
-            
-            # Sort related domain courses
-            related_domain_courses.sort(
-                key=lambda x: (x.rating * 0.7 + (x.students_count / 100000) * 0.3),
-                reverse=True
-            )
-            
-            # Add one intermediate course if available (randomly select from top 3)
-            if intermediate_courses:
-                top_intermediate = intermediate_courses[:min(3, len(intermediate_courses))]
-                selected_course = random.choice(top_intermediate)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
-            
-            # Add one beginner course from a related domain if available (randomly select from top 3)
-            if related_domain_courses:
-                top_related = related_domain_courses[:min(3, len(related_domain_courses))]
-                selected_course = random.choice(top_related)
-                recommendations.append({
-                    'id': selected_course.id,
-                    'name': selected_course.name,
-                    'domain': selected_course.domain,
-                    'duration': selected_course.duration,
-                    'difficulty': selected_course.difficulty,
-                    'prerequisites': selected_course.prerequisites,
-                    'description': selected_course.description,
-                    'instructor': selected_course.instructor,
-                    'rating': selected_course.rating,
-                    'url': selected_course.url
-                })
+            recommendations = []
+            for index, (criteria, description) in enumerate(recommendation_buckets(domain, difficulty)):
+                # Pick from the top of the bucket, excluding completed courses
+                bucket = f"{domain}/{difficulty.lower()}/{index}"
+                candidates = cached_top_courses(bucket, RECOMMENDATION_CANDIDATES, *criteria, user_id=user_id)
+                log.debug("Found recommendation candidates", extra={'bucket': description, 'candidates': len(candidates)})
+                if candidates:
+                    recommendations.append(recommendation_rng(user_id, period, bucket).choice(candidates))
         
         # If no recommendations were found, use default recommendations
         if not recommendations:
-            print("No specific recommendations found, using default recommendations")
-            return get_default_recommendations(user_data)
+            log.debug("No specific recommendations found, using default recommendations")
+            return get_default_recommendations(user_data, period)
         
-        print(f"Returning {len(recommendations)} recommendations")
-        return recommendations
+        return course_payloads(recommendations)
         
-    except Exception as e:
-        print(f"Error getting recommendations: {str(e)}")
-        return get_default_recommendations(user_data)
+    except Exception:
+        log.exception("Error getting recommendations")
+        return get_default_recommendations(user_data, period)
 
-def get_default_recommendations(user_data):
+def course_bucket(course_id):
+    """Domain, duration and difficulty of a course, or None if it doesn't exist"""
+    def load():
+        row = db.session.query(Course.domain, Course.duration, Course.difficulty).filter(Course.id == course_id).first()
+        return row._asdict() if row is not None else None
+    return cache.get_or_set(f"course_bucket:{course_id}", load, tags=[CATALOG_TAG])
+
+def recommendations_for_course(course_id):
+    """Recommendations that follow on from completing the given course"""
+    user_data = course_bucket(course_id)
+    if user_data is None:
+        return []
+    return cached_recommendations(user_data)
+
+def cached_recommendations(user_data):
+    """get_course_recommendations through the cache; concurrent misses compute it once (in all workers)"""
+    key, tags, ttl, shared_only, period = recommendation_cache_entry(user_data)
+    return cache.get_or_set(key, lambda: get_course_recommendations(user_data, period), tags=tags, ttl=ttl,
+                            shared_only=shared_only)
+
+def get_default_recommendations(user_data, period=None):
     """Get default course recommendations when no specific recommendations are available"""
+    if period is None:
+        period = recommendation_period()[0]
     try:
-        print("Getting default recommendations")
-        
-        # Get user's previously completed courses
-        user_id = user_data.get('user_id')
-        completed_courses = []
-        if user_id:
-            completed_certificates = UserCertificate.query.filter_by(user_id=user_id).all()
-            completed_courses = [cert.course_id for cert in completed_certificates]
-            print(f"User has completed {len(completed_courses)} courses")
-        
-        # Get all courses excluding completed ones
-        all_courses = Course.query.all()
-        available_courses = [c for c in all_courses if c.id not in completed_courses]
-        
-        if not available_courses:
-            print("No available courses for default recommendations")
-            return []
-        
-        # Sort by rating and students count
-        sorted_courses = sorted(
-            available_courses,
-            key=lambda x: (x.rating * 0.7 + (x.students_count / 100000) * 0.3),
-            reverse=True
-        )
-        
-        # Get top 5 courses
-        top_courses = sorted_courses[:min(5, len(sorted_courses))]
-        
-        # Randomly select 2 courses from the top 5
-        selected_courses = random.sample(top_courses, min(2, len(top_courses)))
-        
-        recommendations = []
-        for course in selected_courses:
-            recommendations.append({
-                'id': course.id,
-                'name': course.name,
-                'domain': course.domain,
-                'duration': course.duration,
-                'difficulty': course.difficulty,
-                'prerequisites': course.prerequisites,
-                'description': course.description,
-                'instructor': course.instructor,
-                'rating': course.rating,
-                'url': course.url
-            })
+        with span('recommendation_scoring', fallback=True):
+            # Top courses overall, excluding ones the user has completed
+            top = cached_top_courses('default', DEFAULT_RECOMMENDATION_POOL, user_id=user_data.get('user_id'))
+            
+            if not top:
+                log.info("No available courses for default recommendations")
+                return []
+            
+            # Select a few of them, the same ones for this user until the period rotates
+            rng = recommendation_rng(user_data.get('user_id'), period, 'default')
+            selected_courses = rng.sample(top, min(DEFAULT_RECOMMENDATION_COUNT, len(top)))
         
-        print(f"Returning {len(recommendations)} default recommendations")
-        return recommendations
+        return course_payloads(selected_courses)
         
-    except Exception as e:
-        print(f"Error getting default recommendations: {str(e)}")
+    except Exception:
+        log.exception("Error getting default recommendations")
         return []
 
+def user_certificate_query(user_id):
+    """A user's certificates with the course fields shown next to them, in one query"""
+    return (select(UserCertificate.id, UserCertificate.course_id, UserCertificate.completion_date,
+                   UserCertificate.performance_score, UserCertificate.image_path,
+                   Course.name.label('course_name'), Course.domain, Course.duration, Course.difficulty)
+            .join(Course, Course.id == UserCertificate.course_id)
+            .where(UserCertificate.user_id == user_id)
+            .order_by(UserCertificate.id))
+
+def user_certificate_rows(user_id):
+    return db.session.execute(user_certificate_query(user_id)).all()
+
+def user_statistics(user_id):
+    """certificate_statistics for a user, cached until their certificates change"""
+    return cache.get_or_set(f"statistics:{user_id}", lambda: certificate_statistics(user_certificate_rows(user_id)),
+                            tags=[user_tag(user_id)], shared_only=True)
+
+def certificate_statistics(certificates):
+    """Statistics payload for rows of user_certificate_query"""
+    stats = {
+        'total_courses': len(certificates),
+        'domains': {},
+        'difficulty_levels': {},
+        'average_score': 0,
+        'certificates': []  # Add certificates data for progress chart
+    }
+    
+    if certificates:
+        total_score = 0
+        for cert in certificates:
+            stats['domains'][cert.domain] = stats['domains'].get(cert.domain, 0) + 1
+            stats['difficulty_levels'][cert.difficulty] = stats['difficulty_levels'].get(cert.difficulty, 0) + 1
+            if cert.performance_score:
+                total_score += cert.performance_score
+                
+            # Add certificate data for progress chart
+            stats['certificates'].append({
+                'completion_date': cert.completion_date.isoformat(),
+                'course_name': cert.course_name,
+                'domain': cert.domain,
+                'difficulty': cert.difficulty,
+                'performance_score': cert.performance_score
+            })
+        
+        stats['average_score'] = total_score / len(certificates)
+    
+    return stats
+
+def statistics_summary(stats):
+    """A statistics payload without its per-certificate list, for live updates"""
+    return {key: value for key, value in stats.items() if key != 'certificates'}
+
+def publish_certificate_change(user_id, added_id=None, removed_id=None):
+    """Background job: send a certificate change and the new statistics to the user's dashboards"""
+    if added_id is not None:
+        cert = db.session.execute(user_certificate_query(user_id).where(UserCertificate.id == added_id)).first()
+        if cert is not None:
+            variants = {}
+            if cert.image_path:
+                row = db.session.execute(upload_variants_query([upload_relative_path(cert.image_path)])).first()
+                variants = variant_paths(row.variants) if row is not None else {}
+            events.publish(user_id, 'certificate_added', certificate_payload(cert, variants, build_relative_url))
+    if removed_id is not None:
+        events.publish(user_id, 'certificate_removed', {'id': removed_id})
+    events.publish(user_id, 'statistics', statistics_summary(user_statistics(user_id)))
+
+def publish_recommendations(user_id, certificate_id, future):
+    """Done callback of a certificate's background recommendations"""
+    if not future.cancelled() and future.exception() is None:
+        events.publish(user_id, 'recommendations', {'certificate_id': certificate_id,
+                                                    'recommendations': future.result()})
+
+def payload_etag(payload):
+    """ETag of a JSON payload; both apps compute it the same way, whatever their JSON encoder"""
+    return hashlib.md5(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def conditional_json(payload):
+    """JSON response with an ETag, so a client holding the same body gets 304 Not Modified"""
+    response = jsonify(payload)
+    response.set_etag(payload_etag(payload))
+    # Revalidated on every use: it changes when the catalog or the user's certificates do
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@views.errorhandler(HashingBusy)
+def password_hashing_busy(e):
+    response = current_app.response_class('Too many sign-in attempts in progress, please retry shortly.', status=503)
+    response.headers['Retry-After'] = '2'
+    return response
+
 # Routes
-@app.route('/')
+@views.route('/')
 def index():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@views.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -464,6 +809,10 @@ def login():
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
+            if user.password_needs_rehash():
+                # Hash parameters changed since this password was set; upgrade it now
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             return redirect(url_for('dashboard'))
         else:
@@ -471,7 +820,7 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@views.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -481,11 +830,16 @@ def register():
         email = request.form.get('email')
         password = request.form.get('password')
         
-        if User.query.filter_by(username=username).first():
+        # One query covers both uniqueness checks
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).all()
+        
+        if any(row.username == username for row in existing):
             flash('Username already exists')
             return redirect(url_for('register'))
         
-        if User.query.filter_by(email=email).first():
+        if any(row.email == email for row in existing):
             flash('Email already registered')
             return redirect(url_for('register'))
         
@@ -499,219 +853,317 @@ def register():
     
     return render_template('register.html')
 
-@app.route('/logout')
+@views.route('/logout')
 @login_required
 def logout():
     logout_user()
     return redirect(url_for('login'))
 
-@app.route('/dashboard')
+@views.route('/dashboard')
 @login_required
 def dashboard():
     return render_template('dashboard.html')
 
-@app.route('/api/courses', methods=['GET'])
+@views.route('/api/courses', methods=['GET'])
 @login_required
+@replicas.read_only
 def get_courses():
-    courses = Course.query.all()
-    print(f"API: Returning {len(courses)} courses")
-    return jsonify([{
-        'id': course.id,
-        'name': course.name,
-        'domain': course.domain,
-        'duration': course.duration,
-        'difficulty': course.difficulty,
-        'prerequisites': course.prerequisites,
-        'description': course.description,
-        'rating': course.rating,
-        'instructor': course.instructor,
-        'url': course.url  # Add URL to the response
-    } for course in courses])
-
-@app.route('/api/recommendations/<int:course_id>', methods=['GET'])
+    # The course pickers only need the summary fields; ?include=description adds the long text
+    include_description = 'description' in request.args.get('include', '').split(',')
+    if include_description:
+        courses = with_descriptions(db.session, Course.__table__, course_records())
+        payloads = [serialize_course(course) for course in courses]
+    else:
+        # Preloaded into the cache before the workers fork
+        payloads = cached_catalog_payloads()
+    return jsonify(payloads)
+
+@views.route('/api/recommendations/<int:course_id>', methods=['GET'])
 @login_required
+@admission.limit('recommendations')
+@replicas.read_only
 def get_recommendations_by_course(course_id):
-    course = Course.query.get_or_404(course_id)
-    user_data = {
-        'domain': course.domain,
-        'duration': course.duration,
-        'difficulty': course.difficulty
-    }
-    recommendations = get_course_recommendations(user_data)
-    return jsonify(recommendations)
+    user_data = course_bucket(course_id)
+    if user_data is None:
+        abort(404)
+    recommendations = cached_recommendations(user_data)
+    return conditional_json(recommendations)
 
-@app.route('/api/recommendations', methods=['POST'])
+@views.route('/api/recommendations', methods=['POST'])
 @login_required
+@admission.limit('recommendations')
+@replicas.read_only
 def get_recommendations():
     try:
         data = request.json
-        print(f"Received recommendation request with data: {data}")
         
         if not data:
-            print("No data provided in request")
+            log.info("No data provided in recommendation request")
             return jsonify([])
             
-        recommendations = get_course_recommendations(data)
-        print(f"Returning {len(recommendations)} recommendations")
-        return jsonify(recommendations)
-    except Exception as e:
-        print(f"Error in recommendations API: {str(e)}")
+        recommendations = cached_recommendations(data)
+        return conditional_json(recommendations)
+    except Exception:
+        log.exception("Error in recommendations API")
         return jsonify([])
 
-@app.route('/api/certificates', methods=['POST'])
+@views.route('/api/certificates', methods=['POST'])
 @login_required
 def add_certificate():
     try:
         data = request.form
-        print("Received form data:", data)
         
         # Handle image upload
-        image_path = None
         if 'certificate_image' not in request.files:
-            print("No certificate_image in request.files")
+            log.info("Certificate upload without certificate_image")
             return jsonify({'error': 'No file uploaded'}), 400
             
         file = request.files['certificate_image']
         if not file or not file.filename:
-            print("No selected file or empty filename")
+            log.info("Certificate upload with no file selected")
             return jsonify({'error': 'No file selected'}), 400
             
-        # Generate a unique filename
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        
-        # Ensure upload directory exists
-        upload_path = os.path.join(app.config['UPLOAD_FOLDER'])
-        os.makedirs(upload_path, exist_ok=True)
+        if 'course_id' not in data:
+            log.info("Certificate upload without course_id")
+            return jsonify({'error': 'Course ID is required'}), 400
         
+        # Stream the upload to disk, hashing it as it is written
+        upload_folder = current_app.config['UPLOAD_FOLDER']
         try:
-            file_path = os.path.join(upload_path, unique_filename)
-            print(f"Saving file to: {file_path}")
-            file.save(file_path)
-            image_path = os.path.join('uploads', unique_filename)
-            print(f"File saved successfully at {file_path}")
+            temp_path, digest, size = spool_upload(file.stream, upload_folder)
         except Exception as e:
-            print(f"Error saving file: {str(e)}")
+            log.exception("Error saving upload")
             return jsonify({'error': f'Failed to save file: {str(e)}'}), 500
         
-        if 'course_id' not in data:
-            print("No course_id in form data")
-            return jsonify({'error': 'Course ID is required'}), 400
-            
-        # Create new certificate
-        new_certificate = UserCertificate(
-            user_id=current_user.id,
-            course_id=data['course_id'],
-            performance_score=data.get('performance_score'),
-            feedback=data.get('feedback'),
-            image_path=image_path
-        )
-        
+        created = False
+        relative_path = shard_path(digest, file_extension(file.filename))
         try:
+            try:
+                relative_path = add_upload_reference(digest, relative_path, size)
+                db.session.flush()
+            except IntegrityError:
+                # Another request registered the same content first; count against its row
+                db.session.rollback()
+                relative_path = add_upload_reference(digest, relative_path, size)
+            # Stored under the row lock: a delete of the last reference either
+            # finished before (and the file is written again) or waits for this commit
+            created = store_spooled(temp_path, upload_folder, relative_path)
+            log.info("Stored upload", extra={'digest': digest, 'path': relative_path, 'new_file': created})
+            image_path = '/'.join([UPLOAD_URL_PREFIX, relative_path])
+            
+            # Create new certificate
+            new_certificate = UserCertificate(
+                user_id=current_user.id,
+                course_id=data['course_id'],
+                performance_score=data.get('performance_score'),
+                feedback=data.get('feedback'),
+                image_path=image_path
+            )
             db.session.add(new_certificate)
+            db.session.flush()
+            certificate_id = new_certificate.id
+            course_id = new_certificate.course_id
             db.session.commit()
-            print(f"Certificate added successfully for user {current_user.id}")
+            log.info("Certificate added", extra={'user_id': current_user.id, 'certificate_id': certificate_id})
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            log.exception("Database error adding certificate")
             db.session.rollback()
+            if created:
+                discard_unreferenced_upload(digest, relative_path)
             return jsonify({'error': f'Database error: {str(e)}'}), 500
+        finally:
+            discard(temp_path)
         
-        # Get course details for recommendations
-        course = Course.query.get(data['course_id'])
+        # Thumbnails are generated once per stored file, off the request thread
+        if created:
+            background.submit(process_certificate_image, digest)
         
-        # Get recommendations based on the uploaded certificate
-        user_data = {
-            'domain': course.domain,
-            'duration': course.duration,
-            'difficulty': course.difficulty
-        }
-        
-        recommendations = get_course_recommendations(user_data)
+        # Recommendations are computed off the request path and fetched by the
+        # client from the follow-up endpoint, or pushed to its live stream
+        recommendations = background.submit(recommendations_for_course, course_id)
+        certificate_recommendations.put(certificate_id, recommendations)
+        if events.enabled:
+            user_id = current_user.id
+            recommendations.add_done_callback(lambda done: publish_recommendations(user_id, certificate_id, done))
+            background.submit(publish_certificate_change, user_id, added_id=certificate_id)
         
         return jsonify({
             'message': 'Certificate added successfully',
-            'recommendations': recommendations
+            'certificate_id': certificate_id,
+            'recommendations_url': url_for('get_certificate_recommendations', certificate_id=certificate_id)
         })
         
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        log.exception("Unexpected error adding certificate")
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
-@app.route('/api/statistics/<int:user_id>')
+@views.route('/api/certificates/<int:certificate_id>/recommendations')
 @login_required
+@admission.limit('recommendations')
+@replicas.read_only
+def get_certificate_recommendations(certificate_id):
+    """Recommendations for a newly added certificate.
+
+    Waits up to ``?wait=`` seconds for the background computation started by
+    add_certificate and answers 202 if it is still running. When this process
+    has no record of the job (another worker took the upload, or it has been
+    evicted) the recommendations are computed inline.
+    """
+    certificate = UserCertificate.query.get_or_404(certificate_id)
+    if certificate.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    future = certificate_recommendations.get(certificate_id)
+    if future is None:
+        return jsonify({'status': 'ready', 'recommendations': recommendations_for_course(certificate.course_id)})
+    
+    wait = min(request.args.get('wait', 0, type=float), current_app.config['RECOMMENDATION_MAX_WAIT'])
+    if wait > 0 and not future.done():
+        # Waiting does no work here: let other requests have the slot and the connection
+        admission.release_early('recommendations')
+        db.session.close()
+    try:
+        recommendations = future.result(timeout=max(wait, 0))
+    except FutureTimeoutError:
+        response = jsonify({'status': 'pending'})
+        response.headers['Retry-After'] = '1'
+        return response, 202
+    except Exception:
+        log.warning("Background recommendations failed", extra={'certificate_id': certificate_id}, exc_info=True)
+        recommendations = recommendations_for_course(certificate.course_id)
+    return jsonify({'status': 'ready', 'recommendations': recommendations})
+
+@views.route('/api/certificates/import', methods=['POST'])
+@login_required
+def bulk_import_certificates():
+    """Import many certificates for the current user from a CSV or JSONL file"""
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    file_format = request.form.get('format') or detect_format(file.filename)
+    if file_format not in ('csv', 'jsonl'):
+        return jsonify({'error': f'Unsupported format: {file_format}'}), 400
+    
+    try:
+        report = import_certificates(
+            db.engine,
+            (UserCertificate.__table__, Course.__table__, User.__table__),
+            file.stream,
+            file_format,
+            user_id=current_user.id
+        )
+    except Exception as e:
+        log.exception("Bulk import failed")
+        return jsonify({'error': f'Import failed: {str(e)}'}), 500
+    
+    if report.inserted:
+        # Written through db.engine, which the session's write tracking doesn't see
+        replicas.note_write()
+    if report.user_ids:
+        cache.invalidate(*[user_tag(user_id) for user_id in report.user_ids])
+        # Too many changes to send one by one; the dashboards re-fetch instead
+        for user_id in report.user_ids:
+            events.publish(user_id, RESET)
+    log.info("Bulk import finished", extra={'user_id': current_user.id, 'inserted': report.inserted,
+                                            'failed': report.failed, 'elapsed': round(report.elapsed, 2)})
+    return jsonify(report.to_dict())
+
+@views.route('/api/statistics/<int:user_id>')
+@login_required
+@replicas.read_only
 def get_statistics(user_id):
     # Ensure users can only access their own statistics
     if current_user.id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
         
-    certificates = UserCertificate.query.filter_by(user_id=user_id).all()
-    stats = {
-        'total_courses': len(certificates),
-        'domains': {},
-        'difficulty_levels': {},
-        'average_score': 0,
-        'certificates': []  # Add certificates data for progress chart
-    }
-    
-    if certificates:
-        total_score = 0
-        for cert in certificates:
-            course = Course.query.get(cert.course_id)
-            stats['domains'][course.domain] = stats['domains'].get(course.domain, 0) + 1
-            stats['difficulty_levels'][course.difficulty] = stats['difficulty_levels'].get(course.difficulty, 0) + 1
-            if cert.performance_score:
-                total_score += cert.performance_score
-                
-            # Add certificate data for progress chart
-            stats['certificates'].append({
-                'completion_date': cert.completion_date.isoformat(),
-                'course_name': course.name,
-                'domain': course.domain,
-                'difficulty': course.difficulty,
-                'performance_score': cert.performance_score
-            })
-        
-        stats['average_score'] = total_score / len(certificates)
-    
-    return jsonify(stats)
+    return jsonify(user_statistics(user_id))
 
-@app.route('/api/certificates/<int:user_id>')
+@views.route('/api/certificates/<int:user_id>')
 @login_required
+@replicas.read_only
 def get_user_certificates(user_id):
     # Ensure users can only access their own certificates
     if current_user.id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    certificates = UserCertificate.query.filter_by(user_id=user_id).all()
-    result = []
+    certificates = user_certificate_rows(user_id)
     
-    for cert in certificates:
-        course = Course.query.get(cert.course_id)
-        result.append({
-            'id': cert.id,
-            'course_id': cert.course_id,
-            'course_name': course.name,
-            'domain': course.domain,
-            'duration': course.duration,
-            'difficulty': course.difficulty,
-            'performance_score': cert.performance_score,
-            'completion_date': cert.completion_date.isoformat(),
-            'image_path': cert.image_path
-        })
+    # Look up the thumbnails of every referenced upload in one query
+    image_paths = {upload_relative_path(cert.image_path) for cert in certificates if cert.image_path}
+    variants = {}
+    if image_paths:
+        variants = {path: variant_paths(value) for path, value in db.session.execute(upload_variants_query(image_paths))}
     
+    result = [
+        certificate_payload(cert, variants.get(upload_relative_path(cert.image_path), {}) if cert.image_path else {})
+        for cert in certificates
+    ]
     return jsonify(result)
 
-@app.route('/upload', methods=['GET'])
+@views.route('/certificates/<int:certificate_id>/image/<variant>/<filename>')
+@login_required
+@replicas.read_only
+def certificate_image(certificate_id, variant, filename):
+    """Serve a certificate image (or one of its thumbnails) to its owner"""
+    certificate = UserCertificate.query.get_or_404(certificate_id)
+    if certificate.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if not certificate.image_path:
+        abort(404)
+    
+    relative_path = upload_relative_path(certificate.image_path)
+    blob = UploadBlob.query.filter_by(path=relative_path).first()
+    if variant != 'original':
+        relative_path = blob.variant_paths().get(variant) if blob is not None else None
+        if relative_path is None:
+            abort(404)
+    
+    # The filename pins the URL to specific content; stale links get a 404
+    if posixpath.basename(relative_path) != filename:
+        abort(404)
+    
+    return send_upload(relative_path, content_addressed=blob is not None)
+
+@views.before_request
+def refuse_static_uploads():
+    """Keep uploads out of the /static route when UPLOAD_FOLDER is still under static/"""
+    if request.endpoint != 'static':
+        return
+    upload_root = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    requested = os.path.abspath(os.path.join(current_app.static_folder, request.view_args.get('filename', '')))
+    if requested == upload_root or requested.startswith(upload_root + os.sep):
+        abort(404)
+
+@views.route('/api/admission/metrics')
+@observability.protected(fallback=login_required)
+def admission_metrics():
+    return jsonify(admission.metrics())
+
+@views.route('/upload', methods=['GET'])
 @login_required
 def upload_certificate():
     return render_template('upload_certificate.html')
 
-@app.route('/download_report')
+@views.route('/download_report')
 @login_required
+@admission.limit('download_report')
+@replicas.read_only
 def download_report():
-    # Get user data
     user = current_user
-    certificates = UserCertificate.query.filter_by(user_id=user.id).all()
+    # A double click (even one landing on another worker) builds the report once
+    pdf = flights.do(f"report:{user.id}", lambda: base64.b64encode(build_progress_report(user)).decode('ascii'),
+                     shared=True)
+    return send_file(
+        io.BytesIO(base64.b64decode(pdf)),
+        as_attachment=True,
+        download_name=f"{user.username}_progress_report.pdf",
+        mimetype='application/pdf'
+    )
+
+def build_progress_report(user):
+    """The PDF progress report for ``user``, as bytes"""
+    certificates = user_certificate_rows(user.id)
     
     # Get statistics
     stats = {
@@ -724,9 +1176,8 @@ def download_report():
     if certificates:
         total_score = 0
         for cert in certificates:
-            course = Course.query.get(cert.course_id)
-            stats['domains'][course.domain] = stats['domains'].get(course.domain, 0) + 1
-            stats['difficulty_levels'][course.difficulty] = stats['difficulty_levels'].get(course.difficulty, 0) + 1
+            stats['domains'][cert.domain] = stats['domains'].get(cert.domain, 0) + 1
+            stats['difficulty_levels'][cert.difficulty] = stats['difficulty_levels'].get(cert.difficulty, 0) + 1
             if cert.performance_score:
                 total_score += cert.performance_score
         
@@ -790,15 +1241,16 @@ def download_report():
         elements.append(Paragraph("Domain Distribution", styles['Heading2']))
         elements.append(Spacer(1, 12))
         
-        plt.figure(figsize=(6, 4))
-        plt.pie(stats['domains'].values(), labels=stats['domains'].keys(), autopct='%1.1f%%')
-        plt.title('Course Domains')
+        with span('chart_render', chart='domains'):
+            plt.figure(figsize=(6, 4))
+            plt.pie(stats['domains'].values(), labels=stats['domains'].keys(), autopct='%1.1f%%')
+            plt.title('Course Domains')
         
-        # Save chart to buffer
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png')
-        img_buffer.seek(0)
-        plt.close()
+            # Save chart to buffer
+            img_buffer = io.BytesIO()
+            plt.savefig(img_buffer, format='png')
+            img_buffer.seek(0)
+            plt.close()
         
         # Add chart to PDF
         img_data = img_buffer.getvalue()
@@ -811,17 +1263,18 @@ def download_report():
         elements.append(Paragraph("Difficulty Levels", styles['Heading2']))
         elements.append(Spacer(1, 12))
         
-        plt.figure(figsize=(6, 4))
-        plt.bar(stats['difficulty_levels'].keys(), stats['difficulty_levels'].values())
-        plt.title('Difficulty Distribution')
-        plt.xlabel('Difficulty Level')
-        plt.ylabel('Number of Courses')
+        with span('chart_render', chart='difficulty'):
+            plt.figure(figsize=(6, 4))
+            plt.bar(stats['difficulty_levels'].keys(), stats['difficulty_levels'].values())
+            plt.title('Difficulty Distribution')
+            plt.xlabel('Difficulty Level')
+            plt.ylabel('Number of Courses')
         
-        # Save chart to buffer
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png')
-        img_buffer.seek(0)
-        plt.close()
+            # Save chart to buffer
+            img_buffer = io.BytesIO()
+            plt.savefig(img_buffer, format='png')
+            img_buffer.seek(0)
+            plt.close()
         
         # Add chart to PDF
         img_data = img_buffer.getvalue()
@@ -860,18 +1313,19 @@ def download_report():
             date = datetime(int(year), int(month_num), 1)
             month_labels.append(date.strftime('%b %Y'))
         
-        plt.figure(figsize=(6, 4))
-        plt.plot(month_labels, cumulative_data, marker='o')
-        plt.title('Course Completion Progress')
-        plt.xlabel('Month')
-        plt.ylabel('Total Courses Completed')
-        plt.grid(True)
+        with span('chart_render', chart='progress'):
+            plt.figure(figsize=(6, 4))
+            plt.plot(month_labels, cumulative_data, marker='o')
+            plt.title('Course Completion Progress')
+            plt.xlabel('Month')
+            plt.ylabel('Total Courses Completed')
+            plt.grid(True)
         
-        # Save chart to buffer
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png')
-        img_buffer.seek(0)
-        plt.close()
+            # Save chart to buffer
+            img_buffer = io.BytesIO()
+            plt.savefig(img_buffer, format='png')
+            img_buffer.seek(0)
+            plt.close()
         
         # Add chart to PDF
         img_data = img_buffer.getvalue()
@@ -888,11 +1342,10 @@ def download_report():
         table_data = [["Course Name", "Domain", "Difficulty", "Score", "Completion Date"]]
         
         for cert in certificates:
-            course = Course.query.get(cert.course_id)
             table_data.append([
-                course.name,
-                course.domain,
-                course.difficulty,
+                cert.course_name,
+                cert.domain,
+                cert.difficulty,
                 f"{cert.performance_score or 'N/A'}%",
                 cert.completion_date.strftime('%Y-%m-%d')
             ])
@@ -919,18 +1372,11 @@ def download_report():
         elements.append(Paragraph("No certificates found.", styles['Normal']))
     
     # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    
-    # Return PDF as download
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"{user.username}_progress_report.pdf",
-        mimetype='application/pdf'
-    )
+    with span('pdf_build'):
+        doc.build(elements)
+    return buffer.getvalue()
 
-@app.route('/api/certificates/<int:certificate_id>', methods=['DELETE'])
+@views.route('/api/certificates/<int:certificate_id>', methods=['DELETE'])
 @login_required
 def delete_certificate(certificate_id):
     try:
@@ -941,15 +1387,27 @@ def delete_certificate(certificate_id):
         if certificate.user_id != current_user.id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Delete the certificate image file if it exists
+        # Release the certificate's reference to its image
+        unreferenced_paths = []
         if certificate.image_path:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(certificate.image_path))
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            unreferenced_paths = drop_upload_reference(certificate.image_path)
         
-        # Delete the certificate from the database
+        # Delete the certificate from the database. Files no other certificate
+        # points at are moved aside while the upload's row is still locked, and
+        # only deleted once the commit succeeds.
         db.session.delete(certificate)
-        db.session.commit()
+        db.session.flush()
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        staged = stage_removal(upload_folder, unreferenced_paths)
+        try:
+            db.session.commit()
+        except Exception:
+            undo_removal(upload_folder, staged)
+            raise
+        finish_removal(upload_folder, staged)
+        
+        if events.enabled:
+            background.submit(publish_certificate_change, current_user.id, removed_id=certificate_id)
         
         return jsonify({'message': 'Certificate deleted successfully'})
         
@@ -957,7 +1415,77 @@ def delete_certificate(certificate_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
+def preload_shared_state(app):
+    """Load what every worker needs before the master forks them.
+
+    The cached catalog, report fonts and compiled templates are inherited
+    copy-on-write. The database pool is emptied afterwards so no connection
+    is shared between processes.
+    """
+    started = datetime.now()
+    with app.app_context():
+        payloads = cached_catalog_payloads()
+        preload_fonts()
+        compile_templates(app)
+        db.session.remove()
+        db.engine.dispose()
+    replicas.dispose()
+    elapsed = (datetime.now() - started).total_seconds()
+    log.info("Preloaded shared state", extra={'courses': len(payloads), 'elapsed': round(elapsed, 2)})
+
+def reset_after_fork(app):
+    """Give a newly forked worker its own connection pools"""
+    with app.app_context():
+        db.engine.dispose()
+    replicas.dispose()
+
+def warm_up(app):
+    """Exercise a worker before it accepts traffic.
+
+    Opens the first pooled database connection and sends one request through
+    the full WSGI stack, so the first real user doesn't pay for either.
+    """
+    started = datetime.now()
     with app.app_context():
-        db.create_all()
-    app.run(debug=True) 
\ No newline at end of file
+        with db.engine.connect():
+            pass
+    with app.test_client() as client:
+        status = client.get('/login').status_code
+    elapsed = (datetime.now() - started).total_seconds()
+    log.info("Worker warmed up", extra={'pid': os.getpid(), 'elapsed': round(elapsed, 2), 'login_status': status})
+
+def create_app(config=None):
+    """Build an application: settings from the environment, with ``config`` on top.
+
+    Scripts import the extensions and models from this module, so they are
+    module-level objects; each call binds them to the application it builds
+    (the last one wins, as with any shared extension). The module-level
+    ``app`` is the one built on import, served by wsgi.py.
+    """
+    app = Flask(__name__)
+    configure(app, config)
+    configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'], app.config['LOG_SAMPLE_RATE'])
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    db.init_app(app)
+    replicas.init_app(app, db)
+    login_manager.init_app(app)
+    background.init_app(app)
+    password_hasher.init_app(app)
+    admission.init_app(app)
+    query_profiler.init_app(app)
+    observability.init_app(app, profiler=query_profiler)
+    cache.init_app(app)
+    # Single-flight leaders, events and identities are shared through the cache's shared tier
+    flights.store = cache.shared
+    events.init_app(app)
+    events.store = cache.shared
+    identity_cache.init_app(app, shared=cache.shared)
+    views.init_app(app)
+    return app
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=True)
@@ -0,0 +1,338 @@
+"""
+Async (ASGI) variant of the read APIs.
+
+The Flask app serves each request on a worker thread that sits idle while
+MySQL answers. This module serves the read endpoints from an asyncio event
+loop instead, over an async driver (aiomysql, or aiosqlite for SQLite), so
+one process keeps hundreds of requests in flight with a small connection
+pool:
+
+* ``GET /api/courses`` (``?include=description``)
+* ``GET /api/statistics/<user_id>``
+* ``GET /api/certificates/<user_id>``
+* ``GET /api/recommendations/<course_id>``, ``POST /api/recommendations``
+* ``GET /api/events``: the user's live dashboard updates, as server-sent
+  events (see events.py)
+
+Responses match the Flask endpoints: the queries, serializers and
+recommendation buckets are the ones defined in ``app01`` and
+``read_models``. Requests are authenticated with the Flask session cookie,
+so both apps must share ``SECRET_KEY``; put them behind one proxy and route
+these paths here. Admission limits apply as in the Flask app (per process),
+and reads go to a replica unless the user's read-your-writes window is open.
+The catalog and statistics share the Flask app's cache (see cache.py);
+calls into it run on the threadpool, since the shared tier blocks.
+Identical concurrent recommendation requests share one computation per
+process (see singleflight.py). An open event stream holds no database
+connection or thread, just a queue, so a worker can keep thousands of idle
+dashboards connected.
+
+    uvicorn async_api:app --host 0.0.0.0 --port 8001 --workers 2
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from functools import wraps
+
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app01 import (app as flask_app, admission, cache, events, identity_cache, Course, User,
+                   build_relative_url, certificate_payload, certificate_statistics, payload_etag, recommendation_buckets,
+                   recommendation_cache_entry, recommendation_rng, top_courses_query,
+                   upload_relative_path, upload_variants_query, user_certificate_query, variant_paths,
+                   DEFAULT_RECOMMENDATION_COUNT, DEFAULT_RECOMMENDATION_POOL, RECOMMENDATION_CANDIDATES)
+from cache import CATALOG_TAG, MISSING, user_tag
+from db_backend import get_async_engine
+from db_routing import RYW_SESSION_KEY
+from identity_cache import CachedUser
+from events import RESET, Event
+from observability import EVENT_STREAMS, flight_call
+from read_models import apply_descriptions, description_query, serialize_course, summary_query, to_records
+from singleflight import AsyncSingleFlight
+
+log = logging.getLogger(__name__)
+
+ASYNC_POOL_OPTIONS = {
+    'pool_pre_ping': True,
+    'pool_recycle': 3600,
+    'pool_size': int(os.environ.get('ASYNC_DB_POOL_SIZE', 20)),
+    'max_overflow': int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 40)),
+}
+
+course_table = Course.__table__
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+
+engines = {'primary': None, 'replicas': []}
+replica_cycle = None
+flights = AsyncSingleFlight(on_call=flight_call)
+
+
+async def startup():
+    global replica_cycle
+    # Created here rather than at import so every server worker gets its own pools
+    engines['primary'] = get_async_engine(flask_app.config['SQLALCHEMY_DATABASE_URI'], **ASYNC_POOL_OPTIONS)
+    engines['replicas'] = [get_async_engine(url, **ASYNC_POOL_OPTIONS)
+                           for url in flask_app.config['SQLALCHEMY_REPLICA_URLS']]
+    replica_cycle = itertools.cycle(engines['replicas']) if engines['replicas'] else None
+
+
+async def shutdown():
+    for engine in [engines['primary']] + engines['replicas']:
+        if engine is not None:
+            await engine.dispose()
+
+
+def flask_session(request):
+    """The Flask session stored in the request's cookie, or an empty dict"""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    try:
+        return session_serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def read_engine(session):
+    """A replica, unless none is configured or the user's read-your-writes window is open"""
+    if replica_cycle is None or session.get(RYW_SESSION_KEY, 0) > time.time():
+        return engines['primary']
+    return next(replica_cycle)
+
+
+async def session_user(connection, session):
+    user_id = session.get('_user_id')
+    if user_id is None:
+        return None
+    user_id = int(user_id)
+    user = identity_cache.peek(user_id)
+    if user is None:
+        result = await connection.execute(select(User.id, User.username, User.email).where(User.id == user_id))
+        row = result.first()
+        user = CachedUser(*row) if row else None
+        identity_cache.put(user_id, user)
+    return user
+
+
+def read_endpoint(limit=None):
+    """Authenticate the request and hand the view a connection for its reads"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request):
+            session = flask_session(request)
+            async with read_engine(session).connect() as connection:
+                user = await session_user(connection, session)
+                if user is None:
+                    return JSONResponse({'error': 'Authentication required'}, status_code=401)
+                if limit is None:
+                    return await view(request, connection, user)
+
+                rejection = admission.acquire(limit, user.get_id())
+                if rejection is not None:
+                    status, message, retry_after = rejection
+                    return JSONResponse({'error': message}, status_code=status,
+                                        headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+                try:
+                    return await view(request, connection, user)
+                finally:
+                    admission.release(limit)
+        return wrapped
+    return decorator
+
+
+async def cached(key, load, tags=(), ttl=None, shared_only=False):
+    """Async counterpart of cache.get_or_set; ``load`` is a coroutine function.
+
+    Concurrent misses in this process each call ``load``.
+    """
+    if shared_only and cache.shared is None:
+        return await load()
+    value = await run_in_threadpool(cache.get, key, tags, MISSING, ttl)
+    if value is MISSING:
+        value = await load()
+        await run_in_threadpool(cache.set, key, value, tags, ttl)
+    return value
+
+
+async def fetch_records(connection, query):
+    return to_records(await connection.execute(query))
+
+
+def conditional_json(request, payload):
+    """Counterpart of app01.conditional_json: an ETag, and 304 when the client already has the body"""
+    etag = f'"{payload_etag(payload)}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if request.method in ('GET', 'HEAD') and etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+async def course_recommendations(connection, user_data, period):
+    """Async counterpart of app01.get_course_recommendations (same seeded picks)"""
+    domain = user_data.get('domain', 'Programming')
+    difficulty = user_data.get('difficulty', 'Beginner')
+    user_id = user_data.get('user_id')
+
+    recommendations = []
+    for index, (criteria, _) in enumerate(recommendation_buckets(domain, difficulty)):
+        bucket = f"{domain}/{difficulty.lower()}/{index}"
+        candidates = await fetch_records(connection, top_courses_query(RECOMMENDATION_CANDIDATES, *criteria, user_id=user_id))
+        if candidates:
+            recommendations.append(recommendation_rng(user_id, period, bucket).choice(candidates))
+
+    if not recommendations:
+        top = await fetch_records(connection, top_courses_query(DEFAULT_RECOMMENDATION_POOL, user_id=user_id))
+        rng = recommendation_rng(user_id, period, 'default')
+        recommendations = rng.sample(top, min(DEFAULT_RECOMMENDATION_COUNT, len(top)))
+
+    if recommendations:
+        ids = {record.id for record in recommendations}
+        apply_descriptions(recommendations, await connection.execute(description_query(course_table, ids)))
+    return [serialize_course(record) for record in recommendations]
+
+
+async def cached_recommendations(connection, user_data):
+    """course_recommendations through the cache shared with the Flask app.
+
+    Concurrent misses in this process compute it once.
+    """
+    key, tags, ttl, shared_only, period = recommendation_cache_entry(user_data)
+
+    async def compute():
+        # On its own connection, since the flight can outlive the request that started it
+        async with connection.engine.connect() as own_connection:
+            return await course_recommendations(own_connection, user_data, period)
+    return await cached(key, lambda: flights.do(key, compute), tags, ttl, shared_only)
+
+
+@read_endpoint()
+async def get_courses(request, connection, user):
+    if 'description' in request.query_params.get('include', '').split(','):
+        courses = await fetch_records(connection, summary_query(course_table))
+        ids = {course.id for course in courses}
+        if ids:
+            apply_descriptions(courses, await connection.execute(description_query(course_table, ids)))
+        return JSONResponse([serialize_course(course) for course in courses])
+
+    async def load():
+        courses = await fetch_records(connection, summary_query(course_table))
+        return [serialize_course(course, include_description=False) for course in courses]
+    return JSONResponse(await cached('catalog', load, [CATALOG_TAG], flask_app.config['CATALOG_CACHE_TTL']))
+
+
+@read_endpoint()
+async def get_statistics(request, connection, user):
+    user_id = request.path_params['user_id']
+    if user.id != user_id:
+        return JSONResponse({'error': 'Unauthorized'}, status_code=403)
+    async def load():
+        return certificate_statistics((await connection.execute(user_certificate_query(user_id))).all())
+    return JSONResponse(await cached(f"statistics:{user_id}", load, [user_tag(user_id)], shared_only=True))
+
+
+@read_endpoint()
+async def get_user_certificates(request, connection, user):
+    user_id = request.path_params['user_id']
+    if user.id != user_id:
+        return JSONResponse({'error': 'Unauthorized'}, status_code=403)
+    certificates = (await connection.execute(user_certificate_query(user_id))).all()
+
+    image_paths = {upload_relative_path(cert.image_path) for cert in certificates if cert.image_path}
+    variants = {}
+    if image_paths:
+        result = await connection.execute(upload_variants_query(image_paths))
+        variants = {path: variant_paths(value) for path, value in result}
+
+    return JSONResponse([
+        certificate_payload(cert, variants.get(upload_relative_path(cert.image_path), {}) if cert.image_path else {},
+                            build_relative_url)
+        for cert in certificates
+    ])
+
+
+@read_endpoint(limit='recommendations')
+async def get_recommendations_by_course(request, connection, user):
+    result = await connection.execute(
+        select(Course.domain, Course.duration, Course.difficulty).where(Course.id == request.path_params['course_id'])
+    )
+    row = result.first()
+    if row is None:
+        return JSONResponse({'error': 'Not found'}, status_code=404)
+    return conditional_json(request, await cached_recommendations(connection, row._asdict()))
+
+
+@read_endpoint(limit='recommendations')
+async def get_recommendations(request, connection, user):
+    try:
+        data = await request.json()
+        if not data:
+            return JSONResponse([])
+        return conditional_json(request, await cached_recommendations(connection, data))
+    except Exception:
+        log.exception("Error in async recommendations API")
+        return JSONResponse([])
+
+
+def last_event_id(request):
+    """The id the client's EventSource sends when it reconnects, if any"""
+    value = request.headers.get('last-event-id', '')
+    return int(value) if value.isdigit() else None
+
+
+async def event_stream(user_id, after):
+    subscription = await run_in_threadpool(events.subscribe, user_id, asyncio.get_running_loop())
+    EVENT_STREAMS.inc()
+    try:
+        # Reconnect after a second if the connection drops
+        yield 'retry: 1000\n\n'
+        sent = subscription.since
+        if after is not None:
+            missed = await run_in_threadpool(events.replay, user_id, after)
+            if missed is None:
+                yield Event(sent, user_id, RESET, None).encode()
+            for event in missed or ():
+                yield event.encode()
+                sent = max(sent, event.id)
+        heartbeat = flask_app.config['EVENTS_HEARTBEAT']
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield ': keep-alive\n\n'  # Also how a closed connection gets noticed
+            elif event.id > sent:  # Not already sent by the replay
+                yield event.encode()
+                sent = event.id
+    finally:
+        events.unsubscribe(subscription)
+        EVENT_STREAMS.dec()
+
+
+@read_endpoint()
+async def get_events(request, connection, user):
+    if not events.enabled:
+        # EventSource gives up on an error status; the dashboard falls back to re-fetching
+        return JSONResponse({'error': 'Live updates are not available'}, status_code=503)
+    return StreamingResponse(event_stream(user.id, last_event_id(request)), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+app = Starlette(
+    routes=[
+        Route('/api/courses', get_courses),
+        Route('/api/statistics/{user_id:int}', get_statistics),
+        Route('/api/certificates/{user_id:int}', get_user_certificates),
+        Route('/api/recommendations/{course_id:int}', get_recommendations_by_course),
+        Route('/api/recommendations', get_recommendations, methods=['POST']),
+        Route('/api/events', get_events),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
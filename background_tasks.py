@@ -0,0 +1,81 @@
+"""
+In-process background worker for jobs that should not hold up a response.
+
+Jobs run on a small thread pool inside an application context, so they can
+use the database session exactly like a request handler does. The pool is
+created lazily on first use, which keeps it out of any pre-fork parent.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    def __init__(self, app=None, max_workers=2):
+        self.app = app
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('BACKGROUND_WORKERS', self.max_workers)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='background'
+                )
+            return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` in the background; returns a Future"""
+        return self._get_executor().submit(self._run, func, args, kwargs)
+
+    def _run(self, func, args, kwargs):
+        with self.app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                log.exception("Background task failed", extra={'task': func.__name__})
+                raise
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+class TaskResults:
+    """Bounded map of recently submitted jobs, keyed by an id the client knows.
+
+    Only the newest ``max_entries`` futures are kept; older ones are dropped,
+    and callers are expected to recompute when a key is no longer present
+    (which is also what happens when the follow-up request lands on another
+    worker process).
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, future):
+        with self._lock:
+            self._futures[key] = future
+            self._futures.move_to_end(key)
+            while len(self._futures) > self.max_entries:
+                self._futures.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._futures.get(key)
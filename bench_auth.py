@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Login throughput benchmark.
+
+Creates (or reuses) a benchmark user in the configured database and hammers
+POST /login from concurrent clients through the Flask test client, then
+reports logins/sec and latency percentiles. Point DATABASE_URL at a scratch
+database before running it.
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from app01 import app, db, User
+
+# Load environment variables
+load_dotenv()
+
+BENCH_USERNAME = 'bench_login_user'
+BENCH_PASSWORD = 'bench-password'
+
+def ensure_bench_user():
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(username=BENCH_USERNAME).first()
+        if not user:
+            user = User(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com")
+            db.session.add(user)
+        user.set_password(BENCH_PASSWORD)
+        db.session.commit()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_client(requests_per_client):
+    client = app.test_client()
+    latencies = []
+    failures = 0
+    for _ in range(requests_per_client):
+        start = time.perf_counter()
+        response = client.post('/login', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 302:
+            failures += 1
+        # Log out again so the next attempt performs a full login
+        client.get('/logout')
+    return latencies, failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark login throughput and latency')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=25, help='Logins per client')
+    args = parser.parse_args()
+
+    ensure_bench_user()
+    print(f"Hash method: {app.config['PASSWORD_HASH_METHOD']}, "
+          f"hash workers: {app.config['PASSWORD_HASH_WORKERS']}, clients: {args.clients}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(run_client, [args.requests] * args.clients))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    failures = sum(client_failures for _, client_failures in results)
+
+    print(f"Logins: {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} logins/sec), {failures} failed")
+    print(f"Latency p50: {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95: {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    return failures == 0
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Read API throughput benchmark: Flask (gunicorn) against the async variant.
+
+Start both servers on the same database and SECRET_KEY, e.g.::
+
+    export ADMISSION_LIMITS='{"recommendations": {}}'
+    gunicorn -c gunicorn.conf.py --bind 127.0.0.1:8000
+    uvicorn async_api:app --port 8001
+
+then run::
+
+    python bench_read_api.py --flask-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001 --concurrency 200
+
+A benchmark user with a few certificates is created (or reused) in the
+configured database and logged in through the Flask app; the same session
+cookie authenticates against both servers. Each target gets the same mix of
+read requests at the given concurrency, and the script prints requests/sec
+and latency percentiles for each. Leave ADMISSION_LIMITS at its defaults to
+see how many requests the limits turn away instead (counted as rejected).
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from dotenv import load_dotenv
+import aiohttp
+from app01 import app, db, Course, User, UserCertificate
+
+# Load environment variables
+load_dotenv()
+
+BENCH_USERNAME = 'bench_read_user'
+BENCH_PASSWORD = 'bench-password'
+BENCH_CERTIFICATES = 5
+
+def ensure_bench_user():
+    """Create the benchmark user and certificates if needed; returns (user id, course ids)"""
+    with app.app_context():
+        user = User.query.filter_by(username=BENCH_USERNAME).first()
+        if not user:
+            user = User(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com")
+            user.set_password(BENCH_PASSWORD)
+            db.session.add(user)
+            db.session.flush()
+        course_ids = [course_id for course_id, in db.session.query(Course.id).order_by(Course.id).limit(BENCH_CERTIFICATES)]
+        if not course_ids:
+            raise SystemExit("No courses in the database; run add_courses.py first")
+        if UserCertificate.query.filter_by(user_id=user.id).count() == 0:
+            for course_id in course_ids:
+                db.session.add(UserCertificate(user_id=user.id, course_id=course_id, performance_score=85))
+        db.session.commit()
+        return user.id, course_ids
+
+def request_mix(user_id, course_ids):
+    """(method, path, json body) for one round of the read endpoints"""
+    return [
+        ('GET', '/api/courses', None),
+        ('GET', f'/api/statistics/{user_id}', None),
+        ('GET', f'/api/certificates/{user_id}', None),
+        ('GET', f'/api/recommendations/{course_ids[0]}', None),
+        ('POST', '/api/recommendations', {'domain': 'Machine Learning', 'difficulty': 'Intermediate', 'user_id': user_id}),
+    ]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+async def login(flask_url):
+    """Log in through the Flask app and return its session cookies"""
+    jar = aiohttp.CookieJar(unsafe=True)
+    async with aiohttp.ClientSession(cookie_jar=jar) as session:
+        async with session.post(f"{flask_url}/login", data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD},
+                                allow_redirects=False) as response:
+            if response.status != 302:
+                raise SystemExit(f"Login failed with status {response.status}")
+        return {cookie.key: cookie.value for cookie in jar}
+
+async def run_target(base_url, cookies, mix, total, concurrency):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    latencies = []
+    failures = 0
+    rejected = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, cookies=cookies) as session:
+        async def one(index):
+            nonlocal failures, rejected
+            method, path, body = mix[index % len(mix)]
+            async with limit:
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, base_url + path, json=body) as response:
+                        await response.read()
+                        if response.status in (429, 503):
+                            rejected += 1
+                        elif response.status != 200:
+                            failures += 1
+                except aiohttp.ClientError:
+                    failures += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(total)))
+        elapsed = time.perf_counter() - started
+    return latencies, failures, rejected, elapsed
+
+def report(name, latencies, failures, rejected, elapsed):
+    print(f"{name}: {len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/sec), "
+          f"{rejected} rejected by admission limits, {failures} failed")
+    print(f"  latency p50: {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95: {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+async def run(args):
+    user_id, course_ids = ensure_bench_user()
+    mix = request_mix(user_id, course_ids)
+    cookies = await login(args.flask_url)
+    print(f"Concurrency: {args.concurrency}, requests per target: {args.requests}")
+
+    ok = True
+    for name, base_url in (('flask', args.flask_url), ('async', args.async_url)):
+        if not base_url:
+            continue
+        # One small round first so connection pools and caches are warm on both
+        await run_target(base_url, cookies, mix, len(mix), 1)
+        latencies, failures, rejected, elapsed = await run_target(base_url, cookies, mix, args.requests, args.concurrency)
+        report(name, latencies, failures, rejected, elapsed)
+        ok = ok and failures == 0
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare read API throughput of the Flask and async servers')
+    parser.add_argument('--flask-url', default='http://127.0.0.1:8000', help='Flask server (also used to log in)')
+    parser.add_argument('--async-url', default='http://127.0.0.1:8001', help='Async server; empty to skip')
+    parser.add_argument('--concurrency', type=int, default=200, help='Requests in flight per target')
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per target')
+    return asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
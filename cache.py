@@ -0,0 +1,424 @@
+"""
+Two-tier cache for computed read payloads.
+
+Every worker keeps a bounded in-process LRU (the local tier) in front of an
+optional shared tier that all workers on all hosts see, so a payload
+computed by one worker is reused by the others instead of being rebuilt by
+each of them:
+
+* ``CACHE_URL=redis://host:6379/1`` (or ``rediss://``, ``unix://``): any
+  Redis-protocol server (requires the ``redis`` package);
+* ``CACHE_URL=shm:///dev/shm/certificate-dashboard-cache.sqlite``: a SQLite
+  file on tmpfs, shared by the workers of a single host;
+* unset: local tier only.
+
+Keys are versioned. Each one carries :data:`KEY_VERSION` (bump it when a
+payload's shape changes, so old entries are never read back) and the
+current generation of each of its tags, e.g. ``user:42`` or ``catalog``.
+:meth:`TieredCache.invalidate` bumps a tag's generation, which orphans every
+key computed under the old one in both tiers at once; orphans age out by
+TTL. Workers read tag generations from the shared tier on every lookup;
+``CACHE_VERSION_TTL`` lets them reuse a generation for that many seconds
+instead, at the price of seeing other workers' invalidations that late.
+
+:meth:`TieredCache.get_or_set` protects against stampedes: on a miss one
+thread per process computes the value while the others wait for it (see
+singleflight.py), and with a shared tier a short lock key lets one worker
+compute it while the other workers poll for the result.
+
+Values must be JSON-serializable and are shared between callers, so treat
+them as read-only.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from singleflight import MISSING, SingleFlight, wait_for_result
+
+log = logging.getLogger(__name__)
+
+KEY_VERSION = 1
+DEFAULT_SHM_PATH = '/dev/shm/certificate-dashboard-cache.sqlite'
+
+CATALOG_TAG = 'catalog'  # Anything derived from the course table
+
+
+def user_tag(user_id):
+    """Tag for anything derived from a user's certificates"""
+    return f"user:{user_id}"
+
+
+def tag_key(tag):
+    return f"tag:{tag}"
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= now:
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisStore:
+    """Shared tier on a Redis-protocol server; values are stored as JSON"""
+
+    def __init__(self, client, prefix=''):
+        self.client = client  # redis-py reconnects in forked children by itself
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def get_many(self, keys):
+        return [json.loads(raw) if raw is not None else None
+                for raw in self.client.mget([self.prefix + key for key in keys])]
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def add(self, key, value, ttl):
+        """Set ``key`` only if it doesn't exist; returns whether it was set"""
+        return bool(self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)), nx=True))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class SqliteStore:
+    """Shared tier for the workers of one host: a SQLite table in a tmpfs file.
+
+    Each process (and thread) opens its own connection, so the store is safe
+    to create before forking. Expired rows are removed now and then on write.
+    """
+
+    PURGE_EVERY = 1000  # writes
+
+    def __init__(self, path=DEFAULT_SHM_PATH, prefix='', timeout=1.0):
+        self.path = path
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS cache_entry '
+                                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')  # It's a cache; losing it on power loss is fine
+        return connection
+
+    @property
+    def connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key):
+        row = self.connection.execute('SELECT value FROM cache_entry WHERE key = ? AND expires_at > ?',
+                                      (self.prefix + key, time.time())).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl):
+        self.connection.execute('INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)',
+                                (self.prefix + key, json.dumps(value), time.time() + ttl))
+        self._written()
+
+    def add(self, key, value, ttl):
+        """Set ``key`` only if it doesn't exist (or has expired); returns whether it was set"""
+        now = time.time()
+        cursor = self.connection.execute(
+            'INSERT INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+            'WHERE cache_entry.expires_at <= ?',
+            (self.prefix + key, json.dumps(value), now + ttl, now))
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self.connection.execute('DELETE FROM cache_entry WHERE key = ?', (self.prefix + key,))
+
+    def incr(self, key):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Counters never expire (like an INCR'd Redis key without a TTL)
+            connection.execute(
+                "INSERT INTO cache_entry (key, value, expires_at) VALUES (?, '1', 9e18) "
+                'ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1',
+                (self.prefix + key,))
+            value, = connection.execute('SELECT value FROM cache_entry WHERE key = ?', (self.prefix + key,)).fetchone()
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return int(value)
+
+    def _written(self):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.connection.execute('DELETE FROM cache_entry WHERE expires_at <= ?', (time.time(),))
+
+
+def shared_store(url, prefix='cd:'):
+    """The shared tier for ``CACHE_URL``, or None when it is empty"""
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme
+    if scheme in ('redis', 'rediss', 'unix'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the 'redis' package is not installed")
+        return RedisStore(redis.Redis.from_url(url), prefix)
+    if scheme == 'shm':
+        return SqliteStore(urlsplit(url).path or DEFAULT_SHM_PATH, prefix)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {scheme}")
+
+
+def invalidate_shared(*tags, url=None):
+    """Bump ``tags`` in the shared tier, for scripts that change data outside the app.
+
+    Without a shared tier (``CACHE_URL`` unset) workers can't be reached and
+    their entries expire by TTL.
+    """
+    store = shared_store(os.environ.get('CACHE_URL') if url is None else url)
+    if store is not None:
+        for tag in tags:
+            store.incr(tag_key(tag))
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared store, with tag invalidation"""
+
+    def __init__(self, app=None, on_lookup=None):
+        self.on_lookup = on_lookup  # Called with (key prefix, 'local_hit'/'shared_hit'/'miss'), for metrics
+        self.shared = None
+        self.local = LocalLRU()
+        self.default_ttl = 300
+        self.version_ttl = 0
+        self.lock_timeout = 10.0
+        self._versions = {}  # tag -> (generation, read at)
+        self._versions_lock = threading.Lock()
+        self.flights = SingleFlight()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_URL', None)
+        app.config.setdefault('CACHE_LOCAL_SIZE', 2048)
+        app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+        app.config.setdefault('CACHE_VERSION_TTL', 0)
+        app.config.setdefault('CACHE_LOCK_TIMEOUT', 10.0)
+        self.shared = shared_store(app.config['CACHE_URL'])
+        self.local = LocalLRU(app.config['CACHE_LOCAL_SIZE'])
+        self.default_ttl = app.config['CACHE_DEFAULT_TTL']
+        self.version_ttl = app.config['CACHE_VERSION_TTL']
+        self.lock_timeout = app.config['CACHE_LOCK_TIMEOUT']
+        app.extensions['tiered_cache'] = self
+
+    # Tags
+
+    def tag_versions(self, tags):
+        """Current generation of each tag"""
+        now = time.monotonic()
+        versions, stale = {}, []
+        with self._versions_lock:
+            for tag in tags:
+                entry = self._versions.get(tag)
+                if entry is not None and (self.shared is None or now - entry[1] < self.version_ttl):
+                    versions[tag] = entry[0]
+                else:
+                    stale.append(tag)
+        if stale:
+            if self.shared is not None:
+                fetched = [int(value or 0) for value in self.shared.get_many([tag_key(tag) for tag in stale])]
+            else:
+                fetched = [0] * len(stale)
+            with self._versions_lock:
+                for tag, version in zip(stale, fetched):
+                    self._versions[tag] = (version, now)
+                    versions[tag] = version
+        return [versions[tag] for tag in tags]
+
+    def invalidate(self, *tags):
+        """Orphan every entry cached under any of ``tags``, in every worker"""
+        for tag in tags:
+            if self.shared is not None:
+                version = self.shared.incr(tag_key(tag))
+            else:
+                with self._versions_lock:
+                    version = self._versions.get(tag, (0, 0))[0] + 1
+            with self._versions_lock:
+                self._versions[tag] = (version, time.monotonic())
+
+    # Entries
+
+    def versioned_key(self, key, tags=()):
+        """The storage key for ``key`` under the current tag generations, or None if they can't be read"""
+        try:
+            versions = self.tag_versions(tags)
+        except Exception:
+            # Without the generations a stale entry can't be told apart; act as a miss
+            log.warning("Shared cache unavailable", extra={'key': key}, exc_info=True)
+            return None
+        return f"v{KEY_VERSION}:{key}:{'.'.join(str(version) for version in versions)}"
+
+    def _record(self, key, result):
+        if self.on_lookup is not None:
+            self.on_lookup(key.split(':', 1)[0], result)
+
+    def _lookup(self, versioned_key, ttl):
+        value = self.local.get(versioned_key)
+        if value is not MISSING:
+            return value, 'local_hit'
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(versioned_key)
+            except Exception:
+                log.warning("Shared cache read failed", extra={'key': versioned_key}, exc_info=True)
+                entry = None
+            if entry is not None:
+                # Stored wrapped, so a cached None is told apart from a miss
+                self.local.set(versioned_key, entry[0], ttl)
+                return entry[0], 'shared_hit'
+        return MISSING, 'miss'
+
+    def _store(self, versioned_key, value, ttl):
+        self.local.set(versioned_key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(versioned_key, [value], ttl)
+            except Exception:
+                log.warning("Shared cache write failed", extra={'key': versioned_key}, exc_info=True)
+
+    def get(self, key, tags=(), default=None, ttl=None):
+        """The cached value for ``key`` under the current ``tags`` generations, or ``default``"""
+        versioned_key = self.versioned_key(key, tags)
+        if versioned_key is None:
+            return default
+        value, result = self._lookup(versioned_key, ttl or self.default_ttl)
+        self._record(key, result)
+        return default if value is MISSING else value
+
+    def set(self, key, value, tags=(), ttl=None):
+        versioned_key = self.versioned_key(key, tags)
+        if versioned_key is not None:
+            self._store(versioned_key, value, ttl or self.default_ttl)
+        return value
+
+    def get_or_set(self, key, loader, tags=(), ttl=None, shared_only=False):
+        """The cached value for ``key``, calling ``loader`` once across threads and workers on a miss.
+
+        ``shared_only`` entries are only cached with a shared tier: use it for
+        data a user expects to change as soon as they change it, since without
+        a shared tier an invalidation can't reach the other workers.
+        """
+        if shared_only and self.shared is None:
+            return self.flights.do(key, loader)
+        ttl = ttl or self.default_ttl
+        versioned_key = self.versioned_key(key, tags)
+        if versioned_key is None:
+            return self.flights.do(key, loader)
+        value, result = self._lookup(versioned_key, ttl)
+        self._record(key, result)
+        if value is not MISSING:
+            return value
+
+        return self.flights.do(versioned_key, lambda: self._load(versioned_key, loader, ttl))
+
+    def _load(self, versioned_key, loader, ttl):
+        # Another call may have stored it between this one's lookup and its flight
+        value, _ = self._lookup(versioned_key, ttl)
+        if value is not MISSING:
+            return value
+        lock_key = f"lock:{versioned_key}"
+        locked = False
+        if self.shared is not None:
+            try:
+                locked = self.shared.add(lock_key, os.getpid(), self.lock_timeout)
+                busy = not locked
+            except Exception:
+                # Compute it here rather than wait on a store that isn't answering
+                log.warning("Shared cache lock failed", extra={'key': versioned_key}, exc_info=True)
+                busy = False
+            if busy:
+                value = self._wait_for(versioned_key, lock_key, ttl)
+                if value is not MISSING:
+                    return value
+        try:
+            value = loader()
+            self._store(versioned_key, value, ttl)
+            return value
+        finally:
+            if locked:
+                self._unlock(lock_key)
+
+    def _unlock(self, lock_key):
+        try:
+            self.shared.delete(lock_key)
+        except Exception:
+            # It expires after lock_timeout anyway
+            log.warning("Shared cache unlock failed", extra={'key': lock_key}, exc_info=True)
+
+    def _wait_for(self, versioned_key, lock_key, ttl):
+        """Wait for a value another worker is computing; MISSING if it doesn't show up"""
+        return wait_for_result(lambda: self._lookup(versioned_key, ttl)[0],
+                               lambda: self.shared.get(lock_key) is not None, self.lock_timeout)
+
+    def clear_local(self):
+        self.local.clear()
+        with self._versions_lock:
+            self._versions.clear()
+
+    def stats(self):
+        return {'local_size': len(self.local), 'shared': type(self.shared).__name__ if self.shared else None}
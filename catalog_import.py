@@ -0,0 +1,234 @@
+"""
+Idempotent bulk ingestion of course catalogue feeds.
+
+Feeds are CSV, JSON (a list, or an object with a ``courses`` list) or JSONL.
+Every course is identified by its natural key, ``catalog_key``: taken from a
+``catalog_key``, ``key`` or ``external_id`` field when the provider has one,
+and otherwise derived from the course name. Running the same feed twice
+leaves the table as it was.
+
+Rows are validated in one streaming pass and handled in batches. For each
+batch the stored versions are fetched with a single ``IN`` query and
+compared field by field, and only new or changed courses are written, with
+one multi-row upsert (``INSERT ... ON DUPLICATE KEY UPDATE`` on MySQL,
+``INSERT ... ON CONFLICT DO UPDATE`` on SQLite and PostgreSQL). Because
+unchanged courses are never written, ``last_updated`` only moves when a
+course really changed, and caches keyed on it stay valid.
+"""
+
+import json
+import math
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from certificate_import import ImportReport, ROW_ERRORS, iter_rows, guard_rows, _clean
+from read_models import normalize_difficulty, popularity_score
+
+DEFAULT_BATCH_SIZE = 1000
+REQUIRED_FIELDS = ('name', 'domain', 'duration', 'difficulty')
+TEXT_FIELDS = {'name': 200, 'domain': 50, 'difficulty': 20, 'prerequisites': 200,
+               'description': None, 'instructor': 100, 'url': 255}
+INTEGER_FIELDS = ('duration', 'students_count')
+FLOAT_FIELDS = ('rating', 'price')
+CATALOG_FIELDS = tuple(TEXT_FIELDS) + INTEGER_FIELDS + FLOAT_FIELDS
+KEY_ALIASES = ('catalog_key', 'key', 'external_id')
+
+
+def catalog_key_for(name):
+    """Natural key for a course without a provider-supplied key"""
+    return name.strip().lower()[:255]
+
+
+class CatalogReport(ImportReport):
+    def __init__(self):
+        ImportReport.__init__(self)
+        self.updated = 0
+        self.unchanged = 0
+
+    def to_dict(self):
+        report = ImportReport.to_dict(self)
+        report.update(updated=self.updated, unchanged=self.unchanged)
+        return report
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.json'):
+        return 'json'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_feed(stream, file_format):
+    """Yield ``(line_number, row_dict, error)``; JSON documents are numbered by item"""
+    if file_format != 'json':
+        yield from iter_rows(stream, file_format)
+        return
+    try:
+        document = json.load(stream)
+    except ValueError as e:
+        yield 1, None, f'Invalid JSON: {e}'
+        return
+    if isinstance(document, dict):
+        document = document.get('courses')
+    if not isinstance(document, list):
+        yield 1, None, 'Expected a list of courses or an object with a "courses" list'
+        return
+    for index, row in enumerate(document, start=1):
+        if isinstance(row, dict):
+            yield index, row, None
+        else:
+            yield index, None, 'Expected a JSON object'
+
+
+def _number(field, value):
+    """A finite float from a feed value, or ValueError; NaN would never compare equal to what is stored"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'Invalid {field}: {value}')
+    if not math.isfinite(number):
+        raise ValueError(f'Invalid {field}: {value}')
+    return number
+
+
+def _validate(row):
+    """Turn a raw feed row into a course record, or raise ValueError"""
+    record = {}
+    for field, max_length in TEXT_FIELDS.items():
+        value = _clean(row.get(field))
+        if value is not None:
+            value = str(value)
+            if max_length and len(value) > max_length:
+                raise ValueError(f'{field} longer than {max_length} characters')
+        record[field] = value
+    for field in INTEGER_FIELDS:
+        value = _clean(row.get(field))
+        if value is not None:
+            value = int(_number(field, value))
+            if not -2**31 <= value < 2**31:  # What an INT column holds
+                raise ValueError(f'{field} out of range: {value}')
+        record[field] = value
+    for field in FLOAT_FIELDS:
+        value = _clean(row.get(field))
+        if value is not None:
+            value = _number(field, value)
+        record[field] = value
+
+    record['difficulty'] = normalize_difficulty(record['difficulty'])
+
+    missing = [field for field in REQUIRED_FIELDS if record[field] is None]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+
+    key = next((_clean(row.get(alias)) for alias in KEY_ALIASES if _clean(row.get(alias)) is not None), None)
+    record['catalog_key'] = str(key).strip().lower()[:255] if key is not None else catalog_key_for(record['name'])
+    return record
+
+
+def _same(stored, new):
+    if isinstance(stored, float) or isinstance(new, float):
+        if stored is None or new is None:
+            return stored is new
+        # MySQL FLOAT columns are single precision
+        return math.isclose(stored, new, rel_tol=1e-6, abs_tol=1e-9)
+    return stored == new
+
+
+def _upsert_statement(connection, course_table):
+    dialect = connection.dialect.name
+    updated_fields = CATALOG_FIELDS + ('popularity_score', 'last_updated')
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(course_table)
+        return statement.on_duplicate_key_update(
+            {field: statement.inserted[field] for field in updated_fields}
+        )
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(course_table)
+        return statement.on_conflict_do_update(
+            index_elements=[course_table.c.catalog_key],
+            set_={field: statement.excluded[field] for field in updated_fields}
+        )
+    raise ValueError(f'Catalog upserts are not supported on {dialect}')
+
+
+def _flush(engine, course_table, batch, report):
+    """Write the new and changed courses of one batch in a single upsert"""
+    # Later rows for the same key win, as they would with row-by-row upserts
+    by_key = {}
+    for line_number, record in batch:
+        if record['catalog_key'] in by_key:
+            report.unchanged += 1  # superseded, never written
+        by_key[record['catalog_key']] = (line_number, record)
+
+    columns = [course_table.c.catalog_key] + [course_table.c[field] for field in CATALOG_FIELDS]
+    with engine.connect() as connection:
+        stored = {
+            row.catalog_key: row
+            for row in connection.execute(select(*columns).where(course_table.c.catalog_key.in_(list(by_key))))
+        }
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for key, (line_number, record) in by_key.items():
+        existing = stored.get(key)
+        row = dict(record, created_at=now, last_updated=now,
+                   popularity_score=popularity_score(record['rating'], record['students_count']))
+        if existing is None:
+            inserts.append(row)
+        elif any(not _same(existing._mapping[field], record[field]) for field in CATALOG_FIELDS):
+            updates.append(row)
+        else:
+            report.unchanged += 1
+
+    changed = inserts + updates
+    if not changed:
+        return
+    with engine.begin() as connection:
+        connection.execute(_upsert_statement(connection, course_table), changed)
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+
+def upsert_courses(engine, course_table, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert courses from ``(line_number, row_dict, error)`` tuples; returns a :class:`CatalogReport`"""
+    report = CatalogReport()
+    batch = []
+    for line_number, row, error in guard_rows(rows, report):
+        report.total += 1
+        if error:
+            report.add_error(line_number, error)
+            continue
+        try:
+            record = _validate(row)
+        except ValueError as e:
+            report.add_error(line_number, str(e))
+            continue
+        except ROW_ERRORS as e:
+            report.add_error(line_number, f'Invalid row: {e.__class__.__name__}: {e}')
+            continue
+        batch.append((line_number, record))
+        if len(batch) >= batch_size:
+            _flush(engine, course_table, batch, report)
+            batch = []
+
+    if batch:
+        _flush(engine, course_table, batch, report)
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def import_catalog(engine, course_table, stream, file_format, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert the courses in a feed read from a binary stream"""
+    return upsert_courses(engine, course_table, iter_feed(stream, file_format), batch_size)
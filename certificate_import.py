@@ -0,0 +1,294 @@
+"""
+Bulk import of certificate completions from CSV or JSONL files.
+
+Rows are parsed and validated in a single streaming pass, course names are
+resolved with one lookup against the catalogue, and valid rows are written
+with executemany inside one transaction per batch. A bad row is reported
+with its line number and never aborts the rest of the import. A file that
+cannot be read to the end (not UTF-8, malformed CSV) stops the import with
+``file_error`` set on the report; rows before that point are kept.
+
+Recognised columns: ``course_id`` or ``course_name``, ``completion_date``,
+``performance_score`` and ``feedback``; the CLI additionally accepts
+``user_id``, ``username`` or ``email`` to say who completed the course.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# What a malformed value can raise while a row is validated; reported against the row
+ROW_ERRORS = (TypeError, AttributeError, OverflowError, OSError, ValueError)
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%m/%d/%Y')
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.file_error = None  # Set when the file itself could not be read to the end
+        self.user_ids = set()  # Users who got at least one certificate
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'file_error': self.file_error,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format):
+    """Yield ``(line_number, row_dict, error)`` from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, 'Expected a JSON object'
+                continue
+            yield line_number, row, None
+    elif file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # line_num counts the header, matching the line shown in a spreadsheet
+            yield reader.line_num, {k.strip().lower(): v for k, v in row.items() if k}, None
+    else:
+        raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def guard_rows(rows, report):
+    """Yield from ``rows`` until the file stops being readable, recording why in ``report.file_error``"""
+    try:
+        yield from rows
+    except UnicodeDecodeError as e:
+        report.file_error = f'The file is not UTF-8 encoded text ({e.reason}); stopped after {report.total} rows'
+    except csv.Error as e:
+        report.file_error = f'Malformed CSV: {e}; stopped after {report.total} rows'
+
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _parse_date(value):
+    if value is None:
+        return datetime.utcnow()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.utcfromtimestamp(value)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError(f'completion_date out of range: {value}')
+    if not isinstance(value, str):
+        raise ValueError(f'Invalid completion_date: {value!r}')
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised completion_date: {value}')
+
+
+def _load_courses(connection, course_table):
+    """Resolve the whole catalogue in one query"""
+    by_name = {}
+    ids = set()
+    for course_id, name in connection.execute(select(course_table.c.id, course_table.c.name)):
+        ids.add(course_id)
+        by_name.setdefault(name.strip().lower(), course_id)
+    return by_name, ids
+
+
+def _validate(row, courses_by_name, course_ids, user_id):
+    """Turn a raw row into an insertable record, or raise ValueError"""
+    course_id = _clean(row.get('course_id'))
+    if course_id is not None:
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid course_id: {course_id}')
+        if course_id not in course_ids:
+            raise ValueError(f'Unknown course_id: {course_id}')
+    else:
+        course_name = _clean(row.get('course_name') or row.get('course'))
+        if course_name is None:
+            raise ValueError('course_id or course_name is required')
+        course_id = courses_by_name.get(str(course_name).lower())
+        if course_id is None:
+            raise ValueError(f'Unknown course: {course_name}')
+
+    score = _clean(row.get('performance_score'))
+    if score is not None:
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid performance_score: {score}')
+        if not 0 <= score <= 100:
+            raise ValueError(f'performance_score out of range: {score}')
+
+    return {
+        'user_id': user_id,
+        'course_id': course_id,
+        'completion_date': _parse_date(_clean(row.get('completion_date'))),
+        'performance_score': score,
+        'feedback': _clean(row.get('feedback')),
+        'image_path': None,
+    }
+
+
+def _resolve_users(connection, user_table, pending):
+    """Fill in user_id for a batch of rows that name their user, with one query"""
+    usernames = {row['username'] for _, row, _ in pending if row.get('username')}
+    emails = {row['email'] for _, row, _ in pending if row.get('email')}
+    ids = {row['user_id'] for _, row, _ in pending if row.get('user_id')}
+    by_username, by_email, known_ids = {}, {}, set()
+    if usernames or emails or ids:
+        query = select(user_table.c.id, user_table.c.username, user_table.c.email).where(
+            user_table.c.username.in_(list(usernames)) |
+            user_table.c.email.in_(list(emails)) |
+            user_table.c.id.in_(list(ids))
+        )
+        for user_id, username, email in connection.execute(query):
+            by_username[username] = user_id
+            by_email[email] = user_id
+            known_ids.add(user_id)
+
+    for _, row, record in pending:
+        if row.get('user_id'):
+            record['user_id'] = row['user_id'] if row['user_id'] in known_ids else None
+        elif row.get('username'):
+            record['user_id'] = by_username.get(row['username'])
+        elif row.get('email'):
+            record['user_id'] = by_email.get(row['email'])
+
+
+def _normalise_user_fields(row):
+    user_id = _clean(row.get('user_id'))
+    if user_id is not None:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid user_id: {user_id}')
+    return {
+        'user_id': user_id,
+        'username': _clean(row.get('username')),
+        'email': _clean(row.get('email')),
+    }
+
+
+def _flush(engine, tables, batch, report, resolve_users):
+    """Insert one batch in its own transaction, isolating failures per row"""
+    certificate_table, user_table = tables
+    if resolve_users:
+        with engine.connect() as connection:
+            _resolve_users(connection, user_table, batch)
+        resolved = []
+        for line_number, user_fields, record in batch:
+            if record['user_id'] is None:
+                who = user_fields.get('username') or user_fields.get('email') or user_fields.get('user_id')
+                report.add_error(line_number, f'Unknown user: {who}')
+            else:
+                resolved.append((line_number, user_fields, record))
+        batch = resolved
+    if not batch:
+        return
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(certificate_table.insert(), [record for _, _, record in batch])
+        report.inserted += len(batch)
+        report.user_ids.update(record['user_id'] for _, _, record in batch)
+    except Exception:
+        # Something slipped past validation; retry row by row to find it
+        for line_number, _, record in batch:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(certificate_table.insert(), record)
+                report.inserted += 1
+                report.user_ids.add(record['user_id'])
+            except Exception as e:
+                report.add_error(line_number, f'Database error: {e.__class__.__name__}: {str(e).splitlines()[0]}')
+
+
+def import_certificates(engine, tables, stream, file_format, user_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Import certificates from a binary stream.
+
+    ``tables`` is ``(certificate_table, course_table, user_table)``. When
+    ``user_id`` is given every row is attributed to that user; otherwise each
+    row must identify its user. Returns an :class:`ImportReport`.
+    """
+    certificate_table, course_table, user_table = tables
+    report = ImportReport()
+    with engine.connect() as connection:
+        courses_by_name, course_ids = _load_courses(connection, course_table)
+
+    resolve_users = user_id is None
+    batch = []
+    for line_number, row, error in guard_rows(iter_rows(stream, file_format), report):
+        report.total += 1
+        if error:
+            report.add_error(line_number, error)
+            continue
+        try:
+            user_fields = _normalise_user_fields(row) if resolve_users else {}
+            if resolve_users and not any(user_fields.values()):
+                raise ValueError('user_id, username or email is required')
+            record = _validate(row, courses_by_name, course_ids, user_id)
+        except ValueError as e:
+            report.add_error(line_number, str(e))
+            continue
+        except ROW_ERRORS as e:
+            report.add_error(line_number, f'Invalid row: {e.__class__.__name__}: {e}')
+            continue
+        batch.append((line_number, user_fields, record))
+        if len(batch) >= batch_size:
+            _flush(engine, (certificate_table, user_table), batch, report, resolve_users)
+            batch = []
+
+    if batch:
+        _flush(engine, (certificate_table, user_table), batch, report, resolve_users)
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
@@ -1,51 +1,87 @@
-import os
+#!/usr/bin/env python
+"""
+Check that course URLs still work.
+
+Every distinct course URL not checked within --max-age-hours is requested
+concurrently (HEAD, falling back to GET) and the outcome is saved in the
+course_link_check table. Broken links are listed at the end.
+
+Usage::
+
+    python check_urls.py [--all] [--max-age-hours 168] [--concurrency 50]
+                         [--per-host 4] [--host-delay 0.2] [--timeout 10]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from datetime import timedelta
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import func
+from app01 import app, db, Course, CourseLinkCheck
+from link_checker import (check_course_links, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST,
+                          DEFAULT_HOST_DELAY, DEFAULT_TIMEOUT, DEFAULT_MAX_AGE)
 
 # Load environment variables
 load_dotenv()
 
-def check_course_urls():
+def check_course_urls(args):
     try:
-        # Get database URL from environment
-        database_url = os.environ.get('DATABASE_URL')
-        if not database_url:
-            raise ValueError("DATABASE_URL not found in environment variables")
-            
-        # Create SQLAlchemy engine
-        engine = create_engine(database_url)
-        
-        # Connect to the database
-        with engine.connect() as connection:
-            # Query course URLs
-            result = connection.execute(text("SELECT name, url FROM course"))
-            courses = result.fetchall()
-            
-            print("\nCourse URLs:")
-            print("-" * 50)
-            for course in courses:
-                print(f"Course: {course[0]}")
-                print(f"URL: {course[1]}")
-                print("-" * 50)
-            
-            # Count courses with and without URLs
-            result = connection.execute(text("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN url IS NOT NULL THEN 1 ELSE 0 END) as with_url,
-                    SUM(CASE WHEN url IS NULL THEN 1 ELSE 0 END) as without_url
-                FROM course
-            """))
-            stats = result.fetchone()
-            
+        with app.app_context():
+            started = time.perf_counter()
+            results = asyncio.run(check_course_links(
+                db.engine, Course.__table__, CourseLinkCheck.__table__,
+                max_age=timedelta(hours=args.max_age_hours),
+                recheck_all=args.all,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                host_delay=args.host_delay,
+                timeout=args.timeout
+            ))
+            elapsed = time.perf_counter() - started
+            broken = sum(1 for result in results if not result.ok)
+            print(f"Checked {len(results)} URLs in {elapsed:.1f}s "
+                  f"({len(results) / max(elapsed, 1e-9):.1f} URLs/sec), {broken} broken")
+
+            # Summary over every stored result, including ones skipped as fresh
+            total = Course.query.count()
+            with_url = Course.query.filter(Course.url.isnot(None)).count()
             print("\nURL Statistics:")
-            print(f"Total courses: {stats[0]}")
-            print(f"Courses with URL: {stats[1]}")
-            print(f"Courses without URL: {stats[2]}")
-            
+            print(f"Total courses: {total}")
+            print(f"Courses with URL: {with_url}")
+            print(f"Courses without URL: {total - with_url}")
+
+            failing = (db.session.query(Course.name, CourseLinkCheck.url, CourseLinkCheck.status_code, CourseLinkCheck.error)
+                       .join(CourseLinkCheck, CourseLinkCheck.url == func.trim(Course.url))
+                       .filter(CourseLinkCheck.ok.is_(False))
+                       .order_by(Course.name)
+                       .all())
+            if failing:
+                print("\nBroken links:")
+                print("-" * 50)
+                for name, url, status_code, error in failing:
+                    print(f"Course: {name}")
+                    print(f"URL: {url} ({status_code or error})")
+                    print("-" * 50)
+            return True
+
     except Exception as e:
         print(f"Error checking course URLs: {str(e)}")
-        raise
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description='Check course URLs and record the results')
+    parser.add_argument('--all', action='store_true', help='Recheck every URL, not only stale ones')
+    parser.add_argument('--max-age-hours', type=float, default=DEFAULT_MAX_AGE.total_seconds() / 3600,
+                        help='Recheck URLs whose last check is older than this')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Requests in flight overall')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help='Requests in flight per host')
+    parser.add_argument('--host-delay', type=float, default=DEFAULT_HOST_DELAY,
+                        help='Minimum seconds between requests to the same host')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Seconds allowed per request')
+    return check_course_urls(parser.parse_args())
 
 if __name__ == "__main__":
-    check_course_urls() 
\ No newline at end of file
+    if not main():
+        sys.exit(1)
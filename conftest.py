@@ -0,0 +1,95 @@
+"""
+Shared pytest fixtures.
+
+The application reads its configuration from the environment when app01 is
+imported, so the test settings are put in place first: a throwaway SQLite
+database (or TEST_DATABASE_URL), a temporary upload folder, no shared cache
+and no replicas, and a cheap password hash so logging in stays fast.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_test_dir = tempfile.mkdtemp(prefix='certdash-tests-')
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///' + os.path.join(_test_dir, 'test.db')
+os.environ['UPLOAD_FOLDER'] = os.path.join(_test_dir, 'uploads')
+os.environ['CACHE_URL'] = ''
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['ADMISSION_BACKEND_URL'] = ''
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+TEST_PASSWORD = 'correct horse battery staple'
+
+# test_app.py and test_courses.py check a MySQL development database (with
+# server pool options), so they only run against one
+if os.environ['DATABASE_URL'].startswith('sqlite'):
+    collect_ignore = ['test_app.py', 'test_courses.py']
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_test_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def app():
+    import app01
+    app01.app.config['TESTING'] = True
+    with app01.app.app_context():
+        app01.db.create_all()
+    yield app01.app
+    app01.background.shutdown(wait=True)
+    with app01.app.app_context():
+        app01.db.session.remove()
+        app01.db.drop_all()
+    app01.cache.local.clear()
+    app01.identity_cache.clear()
+    shutil.rmtree(app01.app.config['UPLOAD_FOLDER'], ignore_errors=True)
+    os.makedirs(app01.app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+
+@pytest.fixture
+def make_user(app):
+    import app01
+
+    def make_user(username):
+        with app.app_context():
+            user = app01.User(username=username, email=f'{username}@example.com')
+            user.set_password(TEST_PASSWORD)
+            app01.db.session.add(user)
+            app01.db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def login(app, make_user):
+    """Returns a test client logged in as a new user with the given name"""
+    def login(username='alice'):
+        make_user(username)
+        client = app.test_client()
+        response = client.post('/login', data={'username': username, 'password': TEST_PASSWORD})
+        assert response.status_code == 302
+        return client
+    return login
+
+
+@pytest.fixture
+def courses(app):
+    """A small catalog covering every domain and difficulty; returns the course ids"""
+    import app01
+    with app.app_context():
+        rows = [
+            app01.Course(name=f'{domain} {difficulty} {n}', domain=domain, duration=10 + n,
+                         difficulty=difficulty, rating=4.0 + n / 10, students_count=1000 * (n + 1),
+                         description=f'A {difficulty.lower()} course on {domain.lower()}')
+            for domain in ('Data Analysis', 'Machine Learning', 'Full-Stack Development')
+            for difficulty in ('Beginner', 'Intermediate', 'Advanced')
+            for n in range(2)
+        ]
+        app01.db.session.add_all(rows)
+        app01.db.session.commit()
+        return [course.id for course in rows]
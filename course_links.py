@@ -0,0 +1,129 @@
+"""
+Set-based bulk updates of course URLs.
+
+A ``{course name: url}`` mapping is loaded into a temporary staging table
+with one batched insert and applied with a single joined ``UPDATE``. The
+database does the matching, so the cost no longer grows with one round trip
+per course. Only courses whose URL actually differs are written, and those
+get a fresh ``last_updated``.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+STAGING_TABLE = 'course_url_staging'
+MAX_REPORTED_UNMATCHED = 20
+
+
+class LinkUpdateReport:
+    def __init__(self):
+        self.staged = 0
+        self.matched = 0
+        self.changed = 0
+        self.unmatched = 0
+        self.unmatched_names = []
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        return {
+            'staged': self.staged,
+            'matched': self.matched,
+            'changed': self.changed,
+            'unchanged': self.matched - self.changed,
+            'unmatched': self.unmatched,
+            'unmatched_names': self.unmatched_names,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+
+def load_mapping(stream, file_format):
+    """Read a name -> url mapping from a CSV (``name,url``) or JSON object/list"""
+    if file_format == 'json':
+        document = json.load(stream)
+        if isinstance(document, dict):
+            return dict(document)
+        return {row['name']: row['url'] for row in document}
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    return {row['name']: row['url'] for row in reader if row.get('name')}
+
+
+def _drop_staging(connection):
+    if connection.dialect.name == 'mysql':
+        connection.execute(text(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE}"))
+    else:
+        connection.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+
+
+def _update_statement(dialect):
+    if dialect == 'mysql':
+        return f"""
+            UPDATE course c JOIN {STAGING_TABLE} s ON c.name = s.name
+            SET c.url = s.url, c.last_updated = :now
+            WHERE NOT (c.url <=> s.url)
+        """
+    # Correlated form: supported by every SQLite version, and by PostgreSQL.
+    # The comparison is null-safe, so a mapping that clears a URL applies too.
+    distinct = 'IS NOT' if dialect == 'sqlite' else 'IS DISTINCT FROM'
+    return f"""
+        UPDATE course
+        SET url = (SELECT s.url FROM {STAGING_TABLE} s WHERE s.name = course.name),
+            last_updated = :now
+        WHERE EXISTS (
+            SELECT 1 FROM {STAGING_TABLE} s
+            WHERE s.name = course.name AND course.url {distinct} s.url
+        )
+    """
+
+
+def apply_course_urls(engine, mapping):
+    """Set ``course.url`` for every course named in ``mapping`` in one transaction"""
+    report = LinkUpdateReport()
+    started = time.perf_counter()
+    rows = [{'name': name.strip(), 'url': url.strip() if url else None}
+            for name, url in mapping.items() if name and name.strip()]
+    # Later entries win if a name appears twice after trimming
+    rows = list({row['name']: row for row in rows}.values())
+    report.staged = len(rows)
+    if not rows:
+        return report
+
+    with engine.begin() as connection:
+        _drop_staging(connection)
+        connection.execute(text(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} (name VARCHAR(200) PRIMARY KEY, url VARCHAR(255))"
+        ))
+        try:
+            connection.execute(text(f"INSERT INTO {STAGING_TABLE} (name, url) VALUES (:name, :url)"), rows)
+
+            report.matched = connection.execute(text(
+                f"SELECT COUNT(*) FROM course c JOIN {STAGING_TABLE} s ON c.name = s.name"
+            )).scalar()
+            unmatched = connection.execute(text(
+                f"SELECT s.name FROM {STAGING_TABLE} s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM course c WHERE c.name = s.name) ORDER BY s.name"
+            )).scalars().all()
+            report.unmatched = len(unmatched)
+            report.unmatched_names = unmatched[:MAX_REPORTED_UNMATCHED]
+
+            result = connection.execute(text(_update_statement(connection.dialect.name)),
+                                        {'now': datetime.utcnow()})
+            report.changed = result.rowcount
+        finally:
+            _drop_staging(connection)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def print_report(report):
+    print(f"Staged {report.staged} course links: {report.matched} matched, {report.changed} changed, "
+          f"{report.matched - report.changed} already up to date, {report.unmatched} unmatched "
+          f"({report.elapsed:.2f}s)")
+    if report.unmatched_names:
+        more = report.unmatched - len(report.unmatched_names)
+        print("No course named: " + ', '.join(report.unmatched_names) + (f" and {more} more" if more > 0 else ''))
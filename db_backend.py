@@ -0,0 +1,151 @@
+"""
+Dialect-neutral helpers for the database layer.
+
+The application runs on MySQL in production, and on SQLite for laptops,
+CI and the performance suites. Anything that depends on the backend lives
+here rather than being hand-rolled in each script:
+
+* :func:`engine_options` adapts pool settings to the URL (a SQLite file has
+  no server-side connection limit to size a pool for);
+* every SQLite connection is opened in WAL mode with the pragmas in
+  ``SQLITE_PRAGMAS``, so readers don't block behind a writer;
+* :func:`parse_url` replaces the string splitting the scripts used, and
+  :func:`has_column` / :func:`has_table` use the SQLAlchemy inspector
+  instead of ``SHOW COLUMNS`` or ``information_schema``;
+* :func:`ensure_database` creates the MySQL database or SQLite directory;
+* :func:`get_async_engine` opens the same database through an asyncio
+  driver (aiomysql, aiosqlite) for the async read API.
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+
+# Applied to every SQLite connection. WAL lets readers proceed while a write
+# is in progress; NORMAL sync is durable in WAL mode except on power loss;
+# busy_timeout makes writers wait for the lock instead of failing at once.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+    'cache_size': -32000,  # KiB, i.e. 32 MB per connection
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+POOL_SIZE_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+# Async driver for each sync one, keyed by backend name
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        set_sqlite_pragmas(dbapi_connection)
+
+
+def set_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    finally:
+        cursor.close()
+
+
+def parse_url(url):
+    return make_url(url)
+
+
+def is_sqlite(url):
+    return parse_url(url).get_backend_name() == 'sqlite'
+
+
+def engine_options(url, options=None):
+    """Engine keyword arguments for ``url``, dropping ones its dialect can't use"""
+    options = dict(options or {})
+    if is_sqlite(url):
+        for option in POOL_SIZE_OPTIONS:
+            options.pop(option, None)
+        if parse_url(url).database in (None, '', ':memory:'):
+            # Each pooled connection would get its own empty in-memory database
+            options.pop('poolclass', None)
+        # Connections are shared by worker threads, one at a time
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args.setdefault('check_same_thread', False)
+        options['connect_args'] = connect_args
+    return options
+
+
+def get_engine(url=None, **options):
+    """Engine for ``url`` (default: DATABASE_URL) with backend-appropriate options"""
+    url = url or os.environ.get('DATABASE_URL')
+    if not url:
+        raise ValueError("DATABASE_URL not found in environment variables")
+    return create_engine(url, **engine_options(url, options))
+
+
+def async_url(url):
+    """``url`` with its driver swapped for the asyncio one (e.g. mysql+aiomysql)"""
+    parsed = parse_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_async_engine(url=None, **options):
+    """AsyncEngine for ``url`` (default: DATABASE_URL) through its asyncio driver"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    url = url or os.environ.get('DATABASE_URL')
+    if not url:
+        raise ValueError("DATABASE_URL not found in environment variables")
+    if is_sqlite(url):
+        # SQLAlchemy defaults aiosqlite file databases to NullPool, i.e. a new
+        # connection (and thread) per checkout; keep them pooled instead
+        options.setdefault('poolclass', AsyncAdaptedQueuePool)
+    else:
+        options = engine_options(url, options)
+    engine = create_async_engine(async_url(url), **options)
+    if is_sqlite(url):
+        # aiosqlite connections aren't sqlite3.Connection, so the global hook skips them
+        event.listen(engine.sync_engine, 'connect', lambda dbapi_connection, record: set_sqlite_pragmas(dbapi_connection))
+    return engine
+
+
+def has_table(engine, table):
+    return inspect(engine).has_table(table)
+
+
+def has_column(engine, table, column):
+    return any(c['name'] == column for c in inspect(engine).get_columns(table))
+
+
+def ensure_database(url):
+    """Create the target database (MySQL) or its directory (SQLite) if missing"""
+    parsed = parse_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        if parsed.database and parsed.database != ':memory:':
+            directory = os.path.dirname(os.path.abspath(parsed.database))
+            os.makedirs(directory, exist_ok=True)
+        return
+    if parsed.get_backend_name() == 'mysql' and parsed.database:
+        server = create_engine(parsed.set(database=None), **engine_options(url))
+        try:
+            with server.begin() as connection:
+                connection.execute(text(
+                    f"CREATE DATABASE IF NOT EXISTS `{parsed.database}` "
+                    f"CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+                ))
+        finally:
+            server.dispose()
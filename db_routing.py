@@ -0,0 +1,142 @@
+"""
+Read-replica routing for the Flask-SQLAlchemy session.
+
+Views decorated with :meth:`ReplicaRouter.read_only` send their SELECTs to
+one of the engines listed in ``SQLALCHEMY_REPLICA_URLS``. Everything else
+goes to the primary, and so does anything inside a read-only view that
+flushes, runs DML, or executes within :meth:`ReplicaRouter.primary`.
+
+To hide replication lag from the person who made a change, a request that
+writes opens a read-your-writes window (``READ_YOUR_WRITES_SECONDS``). It
+is stored in the user's session cookie, so it holds whichever worker serves
+the next request. While it is open, that user's reads stay on the primary.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, event, orm
+
+from db_backend import engine_options
+
+RYW_SESSION_KEY = '_read_primary_until'
+
+
+def _remember_write(session, flush_context):
+    if has_request_context():
+        g._replica_wrote = True
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.router = getattr(db, 'replica_router', None)
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.router is not None and not self._flushing and not getattr(clause, 'is_dml', False):
+            engine = self.router.read_engine()
+            if engine is not None:
+                return engine
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension whose session consults a :class:`ReplicaRouter`"""
+
+    replica_router = None
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter:
+    def __init__(self, app=None, db=None):
+        self.app = None
+        self.urls = []
+        self.window = 0
+        self._engines = None
+        self._cycle = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.dispose()
+        self.app = app
+        self.urls = [url for url in app.config.get('SQLALCHEMY_REPLICA_URLS', []) if url]
+        self.window = app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+        self._engines = None  # Created from the new settings on first use
+        db.replica_router = self
+        if not event.contains(db.session, 'after_flush', _remember_write):
+            event.listen(db.session, 'after_flush', _remember_write)
+        app.after_request(self._open_write_window)
+
+    @property
+    def enabled(self):
+        return bool(self.urls)
+
+    def _get_engines(self):
+        with self._lock:
+            if self._engines is None:
+                self._engines = [create_engine(url, **engine_options(url, self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))) for url in self.urls]
+                self._cycle = itertools.cycle(self._engines)
+            return self._cycle
+
+    def dispose(self):
+        """Close pooled replica connections (before forking, or in a new worker)"""
+        with self._lock:
+            for engine in self._engines or ():
+                engine.dispose()
+
+    def read_engine(self):
+        """The replica engine for the current request, or None for the primary"""
+        if not self.enabled or not has_request_context():
+            return None
+        if not g.get('_replica_ok') or g.get('_replica_forced_primary') or g.get('_replica_wrote'):
+            return None
+        if session.get(RYW_SESSION_KEY, 0) > time.time():
+            return None
+        engine = g.get('_replica_engine')
+        if engine is None:
+            # Stick to one replica per request for a consistent view
+            cycle = self._get_engines()
+            with self._lock:
+                engine = next(cycle)
+            g._replica_engine = engine
+        return engine
+
+    def read_only(self, view):
+        """Mark a view as safe to serve from a replica"""
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            g._replica_ok = True
+            return view(*args, **kwargs)
+        return wrapped
+
+    def note_write(self):
+        """Open the read-your-writes window for a write made outside the session (e.g. on db.engine)"""
+        if has_request_context():
+            g._replica_wrote = True
+
+    @contextmanager
+    def primary(self):
+        """Force the enclosed queries onto the primary"""
+        if not has_request_context():
+            yield
+            return
+        previous = g.get('_replica_forced_primary', False)
+        g._replica_forced_primary = True
+        try:
+            yield
+        finally:
+            g._replica_forced_primary = previous
+
+    def _open_write_window(self, response):
+        if self.enabled and g.get('_replica_wrote') and self.window:
+            session[RYW_SESSION_KEY] = time.time() + self.window
+        return response
@@ -0,0 +1,236 @@
+"""
+Per-user event streams for live dashboard updates.
+
+Writers publish small deltas once a change is committed (a certificate added
+or removed, a user's new statistics, recommendations computed in the
+background), and ``GET /api/events`` in async_api.py streams them to the
+user's open dashboards as server-sent events, so the page patches what it
+shows instead of re-fetching everything.
+
+Events go through the shared store (the cache's shared tier), since the
+process that handles a write is rarely the one holding the user's stream.
+Each event takes the next number of a global sequence and is kept under
+``event:<number>`` for ``retention`` seconds. One poller thread per process
+watches the sequence and hands new events to that process's subscribers,
+so an idle stream costs an asyncio queue and nothing else. The numbers
+double as SSE event ids: a client that reconnects sends the last one it saw
+and gets what it missed, or a ``reset`` event telling it to re-fetch when
+that is no longer available. Without a shared store nothing is published
+and the stream is not offered.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'events:seq'
+RESET = 'reset'  # Tells the client to re-fetch its state in full
+MISSING_GRACE = 2.0  # seconds to wait for an event that was numbered but not written yet
+
+
+def event_key(event_id):
+    return f"event:{event_id}"
+
+
+class Event(namedtuple('Event', 'id user_id type data')):
+    __slots__ = ()
+
+    def encode(self):
+        """The event in the text/event-stream format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One stream's queue of events, filled from the poller thread.
+
+    ``since`` is the last event id published when it was created; earlier
+    events are only available through :meth:`EventBus.replay`.
+    """
+
+    def __init__(self, user_id, loop, max_queued):
+        self.user_id = user_id
+        self.loop = loop
+        self.since = None
+        self.queue = asyncio.Queue(max_queued)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The loop is closed; the stream is gone
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client isn't keeping up; replace the backlog with a reset
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(Event(event.id, self.user_id, RESET, None))
+
+    async def get(self, timeout):
+        """The next event, or None if there is none within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self, app=None, store=None, on_publish=None):
+        self.store = store
+        self.on_publish = on_publish  # Called with the event type, for metrics
+        self.retention = 300.0
+        self.poll_interval = 0.5
+        self.replay_limit = 500
+        self.max_queued = 100
+        self._subscriptions = {}  # user id -> set of Subscription
+        self._lock = threading.Lock()
+        self._poller_pid = None
+        self._cursor = None  # Last event id handed to subscribers (poller thread only)
+        self._missing_since = None
+        if app is not None:
+            self.init_app(app, store)
+
+    def init_app(self, app, store=None):
+        app.config.setdefault('EVENTS_RETENTION', 300.0)
+        app.config.setdefault('EVENTS_POLL_INTERVAL', 0.5)
+        app.config.setdefault('EVENTS_REPLAY_LIMIT', 500)
+        app.config.setdefault('EVENTS_MAX_QUEUED', 100)
+        if store is not None:
+            self.store = store
+        self.retention = app.config['EVENTS_RETENTION']
+        self.poll_interval = app.config['EVENTS_POLL_INTERVAL']
+        self.replay_limit = app.config['EVENTS_REPLAY_LIMIT']
+        self.max_queued = app.config['EVENTS_MAX_QUEUED']
+        app.extensions['event_bus'] = self
+
+    @property
+    def enabled(self):
+        return self.store is not None
+
+    # Publishing
+
+    def publish(self, user_id, type, data=None):
+        """Send an event to ``user_id``'s streams; returns its id, or None if it wasn't sent.
+
+        Call it after the change is committed, so a client that re-fetches on
+        the event sees it. Failures are logged, never raised: the client
+        catches up on its next full load.
+        """
+        if self.store is None:
+            return None
+        try:
+            event_id = self.store.incr(SEQUENCE_KEY)
+            self.store.set(event_key(event_id), [user_id, type, data], self.retention)
+        except Exception:
+            log.warning("Publishing event failed", extra={'user_id': user_id, 'event': type}, exc_info=True)
+            return None
+        if self.on_publish is not None:
+            self.on_publish(type)
+        return event_id
+
+    def latest(self):
+        return int(self.store.get(SEQUENCE_KEY) or 0)
+
+    def replay(self, user_id, after):
+        """``user_id``'s events since id ``after``, or None if some may no longer be available"""
+        latest = self.latest()
+        if after > latest or latest - after > self.replay_limit:
+            return None  # The store was flushed, or the client was away too long
+        ids = range(after + 1, latest + 1)
+        events = []
+        for event_id, entry in zip(ids, self.store.get_many([event_key(event_id) for event_id in ids])):
+            if entry is None:
+                return None  # Expired, or not written yet; either way the client can't rely on what it has
+            if entry[0] == user_id:
+                events.append(Event(event_id, *entry))
+        return events
+
+    # Subscribing (blocking calls; run them off the event loop)
+
+    def subscribe(self, user_id, loop):
+        """Start receiving ``user_id``'s events on ``loop``; pair with :meth:`unsubscribe`"""
+        subscription = Subscription(user_id, loop, self.max_queued)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        try:
+            # Read after registering, so no event numbered later can be missed
+            subscription.since = self.latest()
+        except Exception:
+            self.unsubscribe(subscription)
+            raise
+        self._ensure_poller()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    # Polling
+
+    def _ensure_poller(self):
+        if self._poller_pid == os.getpid():
+            return
+        with self._lock:
+            if self._poller_pid != os.getpid():
+                # Started per process: a forked child doesn't inherit the parent's thread
+                self._cursor = None
+                threading.Thread(target=self._poll_forever, name='event-poller', daemon=True).start()
+                self._poller_pid = os.getpid()
+
+    def _poll_forever(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception:
+                log.warning("Polling events failed", exc_info=True)
+
+    def poll(self):
+        """Hand every event published since the last poll to its subscribers"""
+        with self._lock:
+            if not self._subscriptions:
+                self._cursor = None  # Nobody to deliver to; start over from the next subscriber
+                return
+            if self._cursor is None:
+                since = [s.since for subscriptions in self._subscriptions.values() for s in subscriptions
+                         if s.since is not None]
+                if not since:
+                    return
+                self._cursor = min(since)
+        latest = self.latest()
+        while self._cursor < latest:
+            ids = range(self._cursor + 1, min(latest, self._cursor + self.replay_limit) + 1)
+            for event_id, entry in zip(ids, self.store.get_many([event_key(event_id) for event_id in ids])):
+                if entry is None:
+                    # Numbered but not written yet, or its publisher died in between
+                    now = time.monotonic()
+                    if self._missing_since is None:
+                        self._missing_since = now
+                    if now - self._missing_since < MISSING_GRACE:
+                        return
+                else:
+                    self._missing_since = None
+                    self._dispatch(Event(event_id, *entry))
+                self._cursor = event_id
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
@@ -0,0 +1,79 @@
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py
+
+The master preloads the application (cached catalog, report fonts,
+compiled templates) and forks workers that share it copy-on-write. Each worker gets fresh database pools after the fork and
+is warmed up before it accepts connections. Workers are recycled after
+``max_requests`` requests (plus jitter, so they don't all restart at once)
+to bound memory growth. Metrics from all workers are aggregated through
+``PROMETHEUS_MULTIPROC_DIR`` (see observability.py).
+
+Every setting can be overridden from the environment. Each worker holds up
+to pool_size + max_overflow database connections, so keep
+``workers * (pool_size + max_overflow)`` within the server's connection limit.
+"""
+
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Workers write their metrics here so /metrics reports all of them. It has to
+# exist before prometheus_client is imported, i.e. before the app is preloaded.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'certificate-dashboard-metrics'))
+os.makedirs(metrics_dir, exist_ok=True)
+# Samples left by a previous run would be added to this one's
+for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+    os.remove(path)
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker; requests mostly wait on the database, PDF rendering holds the GIL
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+preload_app = True
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+
+def pre_fork(server, worker):
+    # Move the preloaded objects out of the collector's generations, so
+    # collections in the workers don't write to (and un-share) their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app01 import reset_after_fork
+    from wsgi import app
+    reset_after_fork(app)
+
+
+def post_worker_init(worker):
+    # Runs before the worker starts accepting connections
+    from app01 import warm_up
+    from wsgi import app
+    warm_up(app)
+
+
+def worker_exit(server, worker):
+    from app01 import background
+    background.shutdown(wait=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
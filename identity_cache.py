@@ -0,0 +1,126 @@
+"""
+Identity cache for the flask_login user loader.
+
+Authenticated requests only need the user's id and a couple of display
+fields, so instead of loading a full ``User`` row on every request the
+loader keeps small :class:`CachedUser` records in a bounded LRU with a TTL.
+Entries are dropped whenever the underlying user row is updated or deleted.
+
+The cache is per process. An optional ``shared`` store (any object with
+``get(key)``, ``set(key, value, ttl)`` and ``delete(key)``) can sit behind
+it so that workers reuse each other's lookups. ``on_lookup`` is called with
+True or False for each local hit or miss (used for metrics).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedUser:
+    """Lightweight stand-in for ``User`` that satisfies flask_login"""
+
+    __slots__ = ('id', 'username', 'email')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def get_id(self):
+        return str(self.id)
+
+    def to_tuple(self):
+        return (self.id, self.username, self.email)
+
+    def __eq__(self, other):
+        return isinstance(other, CachedUser) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.username}>"
+
+
+class IdentityCache:
+    def __init__(self, ttl=60, max_entries=10000, shared=None, on_lookup=None):
+        self.ttl = ttl
+        self.on_lookup = on_lookup
+        self.max_entries = max_entries
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, shared=None):
+        app.config.setdefault('IDENTITY_CACHE_TTL', 60)
+        app.config.setdefault('IDENTITY_CACHE_SIZE', 10000)
+        self.ttl = app.config['IDENTITY_CACHE_TTL']
+        self.max_entries = app.config['IDENTITY_CACHE_SIZE']
+        self.shared = shared
+        self.clear()
+
+    def _shared_key(self, user_id):
+        return f"identity:{user_id}"
+
+    def get_or_load(self, user_id, loader):
+        """Return the cached record for ``user_id``, calling ``loader`` on a miss"""
+        user = self.peek(user_id)
+        if user is not None:
+            return user
+
+        if self.shared is not None:
+            cached = self.shared.get(self._shared_key(user_id))
+            if cached is not None:
+                user = CachedUser(*cached)
+
+        if user is None:
+            user = loader(user_id)
+            if user is not None and self.shared is not None:
+                self.shared.set(self._shared_key(user_id), user.to_tuple(), self.ttl)
+
+        self.put(user_id, user)
+        return user
+
+    def peek(self, user_id):
+        """The record cached in this process, or None; never loads"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+        if self.on_lookup is not None:
+            self.on_lookup(hit)
+        return entry[1] if hit else None
+
+    def put(self, user_id, user):
+        """Record the outcome of a miss; ``user`` is None for an unknown id"""
+        with self._lock:
+            self.misses += 1
+            if user is not None:
+                self._entries[user_id] = (time.monotonic() + self.ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,91 @@
+"""
+Thumbnail generation for certificate images.
+
+Each stored upload gets a set of size-bucketed variants. Variants are
+orientation-corrected (EXIF rotation applied), stripped of metadata and
+encoded as WebP when Pillow supports it, falling back to JPEG/PNG.
+"""
+
+import logging
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from upload_storage import shard_path
+
+log = logging.getLogger(__name__)
+
+# Variant name -> longest edge in pixels
+THUMBNAIL_SIZES = {
+    'sm': 160,
+    'md': 480,
+    'lg': 1024,
+}
+VARIANT_ROOT = 'variants'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def webp_supported():
+    return bool(features.check('webp'))
+
+
+def _output_format(image):
+    if webp_supported():
+        return 'WEBP', '.webp'
+    if image.mode in ('RGBA', 'LA', 'P'):
+        return 'PNG', '.png'
+    return 'JPEG', '.jpg'
+
+
+def _prepare(image):
+    """Apply EXIF orientation and drop everything but the pixels"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    # A fresh image carries no EXIF, ICC or text chunks from the original
+    clean = Image.new(image.mode, image.size)
+    clean.paste(image)
+    return clean
+
+
+def build_variants(source_path, upload_folder, digest):
+    """Write thumbnails for a stored upload.
+
+    Returns a dict of variant name -> path relative to the upload folder, or
+    an empty dict when the file is not an image Pillow can read.
+    """
+    try:
+        with Image.open(source_path) as original:
+            original.load()
+            image = _prepare(original)
+    except (UnidentifiedImageError, OSError) as e:
+        log.warning("Skipping thumbnails", extra={'path': source_path, 'error': str(e)})
+        return {}
+
+    image_format, extension = _output_format(image)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = {}
+    for name, edge in THUMBNAIL_SIZES.items():
+        relative_path = '/'.join([VARIANT_ROOT, name, shard_path(digest, extension)])
+        target = os.path.join(upload_folder, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        variant = image.copy()
+        # Never upscale: small originals keep their size in larger buckets
+        variant.thumbnail((edge, edge), Image.LANCZOS)
+
+        temp_target = f"{target}.tmp"
+        if image_format == 'WEBP':
+            variant.save(temp_target, 'WEBP', quality=WEBP_QUALITY, method=4)
+        elif image_format == 'JPEG':
+            variant.save(temp_target, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            variant.save(temp_target, 'PNG', optimize=True)
+        os.replace(temp_target, target)
+        variants[name] = relative_path
+
+    return variants
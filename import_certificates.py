@@ -0,0 +1,57 @@
+import sys
+import argparse
+from dotenv import load_dotenv
+from app01 import app, db, cache, User, Course, UserCertificate
+from cache import user_tag
+from certificate_import import import_certificates, detect_format, DEFAULT_BATCH_SIZE
+
+# Load environment variables
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import certificates from a CSV or JSONL file')
+    parser.add_argument('path', help='CSV or JSONL file to import')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (defaults to the file extension)')
+    parser.add_argument('--user', help='Username to attribute every row to; otherwise rows need user_id, username or email')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per insert transaction')
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_id = None
+        if args.user:
+            user = User.query.filter_by(username=args.user).first()
+            if not user:
+                print(f"User '{args.user}' not found")
+                return False
+            user_id = user.id
+
+        try:
+            with open(args.path, 'rb') as f:
+                report = import_certificates(
+                    db.engine,
+                    (UserCertificate.__table__, Course.__table__, User.__table__),
+                    f,
+                    args.format or detect_format(args.path),
+                    user_id=user_id,
+                    batch_size=args.batch_size
+                )
+        except Exception as e:
+            print(f"Error importing certificates: {e}")
+            return False
+
+    # Running workers recompute these users' statistics (needs CACHE_URL to reach them)
+    cache.invalidate(*[user_tag(user_id) for user_id in report.user_ids])
+
+    rate = report.total / report.elapsed if report.elapsed else 0
+    print(f"Imported {report.inserted} of {report.total} rows in {report.elapsed:.2f}s ({rate:.0f} rows/s)")
+    if report.file_error:
+        print(f"  {report.file_error}")
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['error']}")
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more errors")
+    return report.failed == 0 and not report.file_error
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,211 @@
+"""
+Concurrent health checks for course URLs.
+
+URLs are checked from one asyncio event loop over a shared aiohttp session:
+
+* at most ``concurrency`` requests are in flight overall, and at most
+  ``per_host`` to any one host, with connections kept alive and reused;
+* requests to the same host start at least ``host_delay`` seconds apart, so
+  a catalogue full of links to one provider doesn't hammer it;
+* each URL gets a ``HEAD`` first, with a ``GET`` fallback for servers that
+  reject or mishandle ``HEAD``; each request is bounded by ``timeout``.
+
+:func:`check_links` only needs a list of URLs, so it can be pointed at a
+local stand-in server. :func:`check_course_links` adds the database side:
+results go to ``course_link_check`` with the time of the check, and URLs
+checked within ``max_age`` are skipped on the next run.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import aiohttp
+from sqlalchemy import select
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_PER_HOST = 4
+DEFAULT_HOST_DELAY = 0.2  # seconds between requests to one host
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_AGE = timedelta(days=7)
+WRITE_BATCH_SIZE = 200
+USER_AGENT = 'CertificateDashboard-LinkChecker/1.0'
+# Answers to HEAD that say more about the server than about the link
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 429, 500, 501, 502, 503}
+
+
+class LinkResult:
+    __slots__ = ('url', 'status_code', 'ok', 'error', 'final_url', 'elapsed_ms', 'checked_at')
+
+    def __init__(self, url, status_code=None, error=None, final_url=None, elapsed_ms=None):
+        self.url = url
+        self.status_code = status_code
+        self.ok = status_code is not None and status_code < 400
+        self.error = error[:255] if error else None
+        self.final_url = final_url[:255] if final_url else None
+        self.elapsed_ms = elapsed_ms
+        self.checked_at = datetime.utcnow()
+
+    def to_row(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class HostThrottle:
+    """Per-host concurrency and spacing between request starts"""
+
+    def __init__(self, per_host, delay):
+        self.per_host = per_host
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._last_start = {}
+
+    def _for(self, host):
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+            self._locks[host] = asyncio.Lock()
+        return self._semaphores[host], self._locks[host]
+
+    async def __call__(self, host, request):
+        semaphore, lock = self._for(host)
+        async with semaphore:
+            if self.delay:
+                async with lock:
+                    wait = self._last_start.get(host, 0) + self.delay - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._last_start[host] = time.monotonic()
+            return await request()
+
+
+async def _request(session, method, url):
+    async with session.request(method, url, allow_redirects=True) as response:
+        return response.status, str(response.url)
+
+
+async def check_url(session, throttle, url):
+    """HEAD, then GET if HEAD fails or is refused; never raises"""
+    started = time.perf_counter()
+    try:
+        return await _check(session, throttle, url, started)
+    except Exception as e:
+        # A URL that doesn't parse, or anything else unexpected, fails this URL rather than the run
+        return LinkResult(url, error=_describe(e), elapsed_ms=_ms(started))
+
+
+async def _check(session, throttle, url, started):
+    host = urlsplit(url).netloc.lower()
+    if not host:
+        return LinkResult(url, error='Invalid URL')
+
+    try:
+        status, final_url = await throttle(host, lambda: _request(session, 'HEAD', url))
+        if status not in HEAD_FALLBACK_STATUSES:
+            return LinkResult(url, status, final_url=final_url, elapsed_ms=_ms(started))
+    except asyncio.TimeoutError:
+        # A host too slow to answer HEAD won't answer GET in time either
+        return LinkResult(url, error='Timed out', elapsed_ms=_ms(started))
+    except aiohttp.ClientError:
+        pass
+
+    try:
+        status, final_url = await throttle(host, lambda: _request(session, 'GET', url))
+        return LinkResult(url, status, final_url=final_url, elapsed_ms=_ms(started))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return LinkResult(url, error=_describe(e), elapsed_ms=_ms(started))
+
+
+def _ms(started):
+    return int((time.perf_counter() - started) * 1000)
+
+
+def _describe(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return 'Timed out'
+    return f"{error.__class__.__name__}: {error}"
+
+
+async def check_links(urls, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                      host_delay=DEFAULT_HOST_DELAY, timeout=DEFAULT_TIMEOUT, on_result=None):
+    """Check every URL and return the list of :class:`LinkResult`.
+
+    ``on_result`` is awaited with each result as soon as it is available.
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, 5))
+    throttle = HostThrottle(per_host, host_delay)
+    global_limit = asyncio.Semaphore(concurrency)
+    results = []
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={'User-Agent': USER_AGENT}) as session:
+        async def run(url):
+            async with global_limit:
+                result = await check_url(session, throttle, url)
+            results.append(result)
+            if on_result is not None:
+                await on_result(result)
+
+        await asyncio.gather(*(run(url) for url in dict.fromkeys(urls)))
+    return results
+
+
+def stale_urls(engine, course_table, check_table, max_age=DEFAULT_MAX_AGE, recheck_all=False):
+    """Distinct course URLs never checked, or last checked before ``max_age`` ago"""
+    query = select(course_table.c.url).where(course_table.c.url.isnot(None)).distinct()
+    with engine.connect() as connection:
+        urls = [url.strip() for url in connection.execute(query).scalars() if url and url.strip()]
+        if recheck_all:
+            return urls
+        cutoff = datetime.utcnow() - max_age
+        fresh = set(connection.execute(
+            select(check_table.c.url).where(check_table.c.checked_at >= cutoff)
+        ).scalars())
+    return [url for url in urls if url not in fresh]
+
+
+def _upsert_statement(connection, check_table):
+    dialect = connection.dialect.name
+    fields = [name for name in LinkResult.__slots__ if name != 'url']
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(check_table)
+        return statement.on_duplicate_key_update({field: statement.inserted[field] for field in fields})
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f'Link check results are not supported on {dialect}')
+    statement = insert(check_table)
+    return statement.on_conflict_do_update(
+        index_elements=[check_table.c.url],
+        set_={field: statement.excluded[field] for field in fields}
+    )
+
+
+def save_results(engine, check_table, results):
+    if not results:
+        return
+    with engine.begin() as connection:
+        connection.execute(_upsert_statement(connection, check_table), [result.to_row() for result in results])
+
+
+async def check_course_links(engine, course_table, check_table, max_age=DEFAULT_MAX_AGE,
+                             recheck_all=False, **options):
+    """Check stale course URLs, saving results in batches as they arrive"""
+    loop = asyncio.get_running_loop()
+    urls = await loop.run_in_executor(None, stale_urls, engine, course_table, check_table, max_age, recheck_all)
+    pending = []
+
+    async def collect(result):
+        pending.append(result)
+        if len(pending) >= WRITE_BATCH_SIZE:
+            batch = pending[:]
+            del pending[:]
+            await loop.run_in_executor(None, save_results, engine, check_table, batch)
+
+    results = await check_links(urls, on_result=collect, **options)
+    await loop.run_in_executor(None, save_results, engine, check_table, pending)
+    return results
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""
+Versioned, online schema migrations.
+
+Migrations live in ``migrations/`` as ``NNNN_description.py`` files, each
+defining ``upgrade(ops)`` and optionally ``PHASE``:
+
+* ``'expand'`` (default): additive changes that old code tolerates, i.e. new
+  tables, nullable columns and indexes, plus chunked backfills.
+* ``'contract'``: changes that only the new code tolerates, such as dropping
+  or tightening the old columns. These are held back until ``--contract``
+  is passed, which is meant to happen after the release that switches reads
+  over has been deployed.
+
+Applied versions are recorded in ``schema_migrations``. Every operation is
+idempotent, so an interrupted run can simply be started again. Backfills
+update rows in primary-key ranges, one short transaction per batch with a
+pause in between, and never hold long locks on large tables. On MySQL,
+column and index changes are requested with ``ALGORITHM=INPLACE, LOCK=NONE``
+so they run without blocking reads or writes.
+
+Usage::
+
+    python migrate.py status
+    python migrate.py up [--contract] [--batch-size 1000] [--pause 0.05]
+    python migrate.py stamp          # mark everything applied (fresh schema)
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import importlib.util
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from db_backend import get_engine
+
+# Load environment variables
+load_dotenv()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAUSE = 0.05  # seconds between backfill batches
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        spec = importlib.util.spec_from_file_location(f"migrations.m{version}", path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.phase = getattr(self.module, 'PHASE', 'expand')
+
+    def __repr__(self):
+        return f"{self.version}_{self.name} ({self.phase})"
+
+
+class MigrationOps:
+    """Idempotent, lock-friendly schema operations handed to ``upgrade()``"""
+
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size
+        self.pause = pause
+
+    # Introspection
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, index):
+        return any(i['name'] == index for i in inspect(self.engine).get_indexes(table))
+
+    def _online(self):
+        return ', ALGORITHM=INPLACE, LOCK=NONE' if self.dialect == 'mysql' else ''
+
+    def execute(self, sql, params=None):
+        with self.engine.begin() as connection:
+            return connection.execute(text(sql), params or {})
+
+    # Expand operations
+    def create_table(self, table):
+        """Create a SQLAlchemy ``Table`` if it does not exist yet"""
+        if not self.has_table(table.name):
+            table.create(self.engine)
+            print(f"  created table {table.name}")
+
+    def add_column(self, table, column, definition):
+        if self.has_column(table, column):
+            return
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}{self._online()}")
+        print(f"  added column {table}.{column}")
+
+    def create_index(self, table, index, columns, unique=False):
+        if self.has_index(table, index):
+            return
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        if self.dialect == 'mysql':
+            self.execute(f"ALTER TABLE {table} ADD {kind} {index} ({', '.join(columns)}){self._online()}")
+        else:
+            self.execute(f"CREATE {kind} {index} ON {table} ({', '.join(columns)})")
+        print(f"  created index {index} on {table}")
+
+    def modify_column(self, table, column, definition):
+        """Change a column's type in place (MySQL only; SQLite is typeless here)"""
+        if self.dialect != 'mysql':
+            return
+        self.execute(f"ALTER TABLE {table} MODIFY COLUMN {column} {definition}{self._online()}")
+        print(f"  modified column {table}.{column}")
+
+    def backfill(self, table, assignments, where, params=None, key='id'):
+        """Run ``UPDATE table SET assignments WHERE where`` in primary-key batches.
+
+        ``where`` must select only rows that still need the backfill (e.g.
+        ``new_col IS NULL``) so re-running after an interruption is safe.
+        """
+        with self.engine.connect() as connection:
+            low, high = connection.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+        if low is None:
+            return 0
+
+        updated = 0
+        started = time.perf_counter()
+        for start in range(low, high + 1, self.batch_size):
+            with self.engine.begin() as connection:
+                result = connection.execute(
+                    text(f"UPDATE {table} SET {assignments} "
+                         f"WHERE {key} >= :_start AND {key} < :_end AND ({where})"),
+                    dict(params or {}, _start=start, _end=start + self.batch_size)
+                )
+                updated += result.rowcount
+            if self.pause:
+                time.sleep(self.pause)
+        print(f"  backfilled {updated} rows in {table} in {time.perf_counter() - started:.1f}s")
+        return updated
+
+    # Contract operations
+    def drop_column(self, table, column):
+        if not self.has_column(table, column):
+            return
+        self.execute(f"ALTER TABLE {table} DROP COLUMN {column}{self._online()}")
+        print(f"  dropped column {table}.{column}")
+
+
+def discover_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def ensure_version_table(engine):
+    with engine.begin() as connection:
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(16) PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                applied_at DATETIME NOT NULL
+            )
+        """))
+
+
+def applied_versions(engine):
+    ensure_version_table(engine)
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def record_version(engine, migration):
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+            {'version': migration.version, 'name': migration.name, 'applied_at': datetime.utcnow()}
+        )
+
+
+def upgrade(engine, contract=False, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+    """Apply pending migrations in order; returns the number applied"""
+    done = applied_versions(engine)
+    ops = MigrationOps(engine, batch_size=batch_size, pause=pause)
+    applied = 0
+    for migration in discover_migrations():
+        if migration.version in done:
+            continue
+        if migration.phase == 'contract' and not contract:
+            print(f"Stopping before contract migration {migration}; re-run with --contract once "
+                  f"the code that no longer needs the old schema is deployed")
+            break
+        print(f"Applying {migration}...")
+        migration.module.upgrade(ops)
+        record_version(engine, migration)
+        applied += 1
+    return applied
+
+
+def stamp(engine):
+    """Record every known migration as applied, e.g. after db.create_all()"""
+    done = applied_versions(engine)
+    for migration in discover_migrations():
+        if migration.version not in done:
+            record_version(engine, migration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('command', choices=['status', 'up', 'stamp'])
+    parser.add_argument('--contract', action='store_true', help='Also apply contract-phase migrations')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per backfill transaction')
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help='Seconds to sleep between backfill batches')
+    args = parser.parse_args()
+
+    try:
+        engine = get_engine()
+        if args.command == 'status':
+            done = applied_versions(engine)
+            for migration in discover_migrations():
+                state = 'applied' if migration.version in done else 'pending'
+                print(f"{state:8} {migration}")
+        elif args.command == 'up':
+            applied = upgrade(engine, contract=args.contract, batch_size=args.batch_size, pause=args.pause)
+            print(f"Applied {applied} migration(s)")
+        else:
+            stamp(engine)
+            print("All migrations marked as applied")
+        return True
+    except Exception as e:
+        print(f"Error running migrations: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,88 @@
+import os
+import sys
+import shutil
+from dotenv import load_dotenv
+from app01 import app, db, UserCertificate, UploadBlob, UPLOAD_URL_PREFIX, upload_relative_path, add_upload_reference, process_certificate_image
+from upload_storage import hash_file, shard_path, file_extension, discard
+
+# Load environment variables
+load_dotenv()
+
+BATCH_SIZE = 500
+
+def migrate_uploads():
+    """Move flat uuid_filename uploads into content-addressed, sharded storage"""
+    try:
+        with app.app_context():
+            upload_folder = app.config['UPLOAD_FOLDER']
+            moved = deduplicated = missing = 0
+            last_id = 0
+
+            while True:
+                certificates = (UserCertificate.query
+                                .filter(UserCertificate.id > last_id)
+                                .filter(UserCertificate.image_path.isnot(None))
+                                .order_by(UserCertificate.id)
+                                .limit(BATCH_SIZE)
+                                .all())
+                if not certificates:
+                    break
+
+                legacy_files = []
+                for cert in certificates:
+                    last_id = cert.id
+                    relative_path = upload_relative_path(cert.image_path)
+                    if '/' in relative_path:
+                        # Already sharded by a previous run
+                        continue
+
+                    source = os.path.join(upload_folder, relative_path)
+                    if not os.path.exists(source):
+                        print(f"Certificate {cert.id}: file {source} not found, skipping")
+                        missing += 1
+                        continue
+
+                    digest = hash_file(source)
+                    existing_path = UploadBlob.query.with_entities(UploadBlob.path).filter_by(digest=digest).scalar()
+                    target = existing_path or shard_path(digest, file_extension(relative_path))
+                    target_file = os.path.join(upload_folder, *target.split('/'))
+                    if os.path.exists(target_file):
+                        deduplicated += 1
+                    else:
+                        # Link (or copy) rather than move, so the legacy file survives
+                        # until the database points at its new home
+                        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+                        try:
+                            os.link(source, target_file)
+                        except OSError:
+                            shutil.copy2(source, target_file)
+                        moved += 1
+
+                    target = add_upload_reference(digest, target, os.path.getsize(target_file))
+                    db.session.flush()
+                    cert.image_path = '/'.join([UPLOAD_URL_PREFIX, target])
+                    legacy_files.append(source)
+
+                # Commit per batch so an interrupted run keeps its progress
+                db.session.commit()
+                for source in legacy_files:
+                    discard(source)
+                print(f"Processed certificates up to id {last_id}")
+
+            print(f"Upload migration complete: {moved} moved, {deduplicated} deduplicated, {missing} missing")
+
+            # Generate thumbnails for any stored upload that does not have them yet
+            pending = [digest for (digest,) in UploadBlob.query.with_entities(UploadBlob.digest).filter(UploadBlob.variants.is_(None))]
+            for digest in pending:
+                process_certificate_image(digest)
+            print(f"Generated thumbnails for {len(pending)} uploads")
+            return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error migrating uploads: {e}")
+        return False
+
+if __name__ == "__main__":
+    if not migrate_uploads():
+        sys.exit(1)
@@ -0,0 +1,21 @@
+"""Catalogue fields added to course after the first release (was migrate_course_table.py)"""
+
+
+def upgrade(ops):
+    if not ops.has_table('course'):
+        return
+
+    ops.add_column('course', 'url', 'VARCHAR(255)')
+    ops.add_column('course', 'description', 'TEXT')
+    ops.add_column('course', 'rating', 'FLOAT DEFAULT 0.0')
+    ops.add_column('course', 'students_count', 'INT DEFAULT 0')
+    ops.add_column('course', 'price', 'FLOAT DEFAULT 0.0')
+    ops.add_column('course', 'instructor', 'VARCHAR(100)')
+
+    # Added nullable and backfilled in batches instead of with a
+    # CURRENT_TIMESTAMP default, which would force a full table rebuild
+    ops.add_column('course', 'last_updated', 'DATETIME')
+    ops.backfill('course', 'last_updated = created_at', 'last_updated IS NULL')
+
+    # VARCHAR(50) -> VARCHAR(200) keeps the two-byte length prefix, so MySQL does it in place
+    ops.modify_column('course', 'name', 'VARCHAR(200) NOT NULL')
@@ -0,0 +1,8 @@
+"""Room for longer password hashes (was migrate_password_hash.py)"""
+
+
+def upgrade(ops):
+    if not ops.has_table('user'):
+        return
+
+    ops.modify_column('user', 'password_hash', 'VARCHAR(255) NOT NULL')
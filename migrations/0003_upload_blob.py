@@ -0,0 +1,20 @@
+"""Content-addressed upload storage with reference counts and thumbnail variants"""
+
+from sqlalchemy import MetaData, Table, Column, String, Integer, Text, DateTime
+
+metadata = MetaData()
+
+upload_blob = Table(
+    'upload_blob', metadata,
+    Column('digest', String(64), primary_key=True),
+    Column('path', String(255), unique=True, nullable=False),
+    Column('size', Integer, nullable=False),
+    Column('ref_count', Integer, nullable=False, default=0),
+    Column('variants', Text),
+    Column('created_at', DateTime),
+)
+
+
+def upgrade(ops):
+    ops.create_table(upload_blob)
+    ops.add_column('upload_blob', 'variants', 'TEXT')
@@ -0,0 +1,31 @@
+"""Natural key for courses, so catalogue feeds can be upserted instead of duplicated"""
+
+COPIES_TABLE = 'course_catalog_key_copies'
+
+
+def upgrade(ops):
+    if not ops.has_table('course'):
+        return
+
+    ops.add_column('course', 'catalog_key', 'VARCHAR(255)')
+    ops.backfill('course', 'catalog_key = LOWER(TRIM(name))', 'catalog_key IS NULL')
+
+    # Earlier add_courses.py runs inserted the same course several times. Keep
+    # the oldest row on the plain key and give the copies their own, rather
+    # than deleting rows that certificates may point at. A suffixed copy is the
+    # only row on its key, so re-running only picks up copies not done yet.
+    # The copies are found in one pass and staged, so each batch only looks
+    # up its own ids instead of grouping the whole table again.
+    ops.execute(f'DROP TABLE IF EXISTS {COPIES_TABLE}')
+    ops.execute(f'CREATE TABLE {COPIES_TABLE} (id INTEGER PRIMARY KEY)')
+    ops.execute(
+        f'INSERT INTO {COPIES_TABLE} (id) '
+        'SELECT course.id FROM course JOIN '
+        '(SELECT catalog_key, MIN(id) AS keep_id FROM course GROUP BY catalog_key) AS keepers '
+        'ON course.catalog_key = keepers.catalog_key WHERE course.id <> keepers.keep_id'
+    )
+    suffixed = "CONCAT(catalog_key, '#', id)" if ops.dialect == 'mysql' else "catalog_key || '#' || id"
+    ops.backfill('course', f'catalog_key = {suffixed}', f'id IN (SELECT id FROM {COPIES_TABLE})')
+    ops.execute(f'DROP TABLE {COPIES_TABLE}')
+
+    ops.create_index('course', 'uq_course_catalog_key', ['catalog_key'], unique=True)
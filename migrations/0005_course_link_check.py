@@ -0,0 +1,21 @@
+"""Results of course URL health checks"""
+
+from sqlalchemy import MetaData, Table, Column, String, Integer, Boolean, DateTime, Index
+
+metadata = MetaData()
+
+course_link_check = Table(
+    'course_link_check', metadata,
+    Column('url', String(255), primary_key=True),
+    Column('status_code', Integer),
+    Column('ok', Boolean, nullable=False, default=False),
+    Column('error', String(255)),
+    Column('final_url', String(255)),
+    Column('elapsed_ms', Integer),
+    Column('checked_at', DateTime, nullable=False),
+    Index('ix_course_link_check_checked_at', 'checked_at'),
+)
+
+
+def upgrade(ops):
+    ops.create_table(course_link_check)
@@ -0,0 +1,20 @@
+"""Stored ranking score for courses, indexed per domain/difficulty bucket"""
+
+
+def upgrade(ops):
+    if not ops.has_table('course'):
+        return
+
+    ops.add_column('course', 'popularity_score', 'FLOAT')
+    # Same formula as read_models.popularity_score; 100000.0 keeps SQLite from integer division
+    ops.backfill(
+        'course',
+        'popularity_score = COALESCE(rating, 0) * 0.7 + COALESCE(students_count, 0) / 100000.0 * 0.3',
+        'popularity_score IS NULL'
+    )
+    ops.create_index('course', 'ix_course_bucket_score', ['domain', 'difficulty', 'popularity_score'])
+    ops.create_index('course', 'ix_course_popularity_score', ['popularity_score'])
+
+    # Serves the "not already completed" anti-join in recommendation queries
+    if ops.has_table('user_certificate'):
+        ops.create_index('user_certificate', 'ix_user_certificate_user_course', ['user_id', 'course_id'])
@@ -0,0 +1,18 @@
+"""Store the known difficulty levels in one spelling, as recommendation buckets match it exactly"""
+
+LEVELS = ('Beginner', 'Intermediate', 'Advanced')
+
+
+def upgrade(ops):
+    if not ops.has_table('course'):
+        return
+
+    # MySQL's default collation ignores case, so compare the bytes there
+    stored = 'BINARY difficulty' if ops.dialect == 'mysql' else 'difficulty'
+    for level in LEVELS:
+        ops.backfill(
+            'course',
+            'difficulty = :level',
+            f'LOWER(TRIM(difficulty)) = :lowered AND {stored} <> :level',
+            {'level': level, 'lowered': level.lower()}
+        )
@@ -0,0 +1,324 @@
+"""
+Structured logging, Prometheus metrics and timing spans.
+
+Logging
+    :func:`configure_logging` sends every record through a bounded queue to a
+    writer thread, so request threads never block on stdout. Records are
+    JSON lines (``LOG_FORMAT=text`` for development) carrying the request
+    id, endpoint and any ``extra`` fields. ``LOG_SAMPLE_RATE`` keeps only
+    that fraction of DEBUG/INFO records; warnings and errors are never
+    sampled. When the queue is full, records are dropped and counted.
+
+Metrics
+    :class:`Observability` serves ``/metrics`` in the Prometheus text format:
+
+    * ``http_request_duration_seconds``: latency per endpoint, method and status
+    * ``http_request_db_seconds`` / ``http_request_queries``: database time and
+      statement count per request, from the query profiler
+    * ``db_pool_checkout_seconds``: time to get a pooled connection
+      (:class:`TimedQueuePool`), including opening a new one
+    * ``cache_lookups_total``: hits and misses per cache (``local_hit``,
+      ``shared_hit`` or ``miss`` for the tiered cache, per key prefix)
+    * ``admission_decisions_total``: admission control outcomes
+    * ``singleflight_calls_total``: single-flight computations run (``leader``)
+      and requests that shared one (``waiter``, ``shared_waiter``)
+    * ``events_published_total``: live dashboard events published, per type
+    * ``event_streams_open``: server-sent event streams currently open
+    * ``span_duration_seconds``: code paths wrapped in :func:`span`
+
+    Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` (set in gunicorn.conf.py)
+    makes every worker write its samples to files there, and ``/metrics``
+    aggregates all workers whichever one serves the scrape.
+"""
+
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import Response, abort, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency',
+                            ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Time spent in the database per request',
+                            ['endpoint'], buckets=DB_BUCKETS)
+REQUEST_QUERIES = Histogram('http_request_queries', 'SQL statements per request',
+                            ['endpoint'], buckets=QUERY_COUNT_BUCKETS)
+POOL_CHECKOUT_WAIT = Histogram('db_pool_checkout_seconds', 'Time to get a connection from the pool',
+                               buckets=DB_BUCKETS)
+CACHE_LOOKUPS = Counter('cache_lookups_total', 'Cache lookups', ['cache', 'result'])
+ADMISSION_DECISIONS = Counter('admission_decisions_total', 'Admission control outcomes', ['limit', 'outcome'])
+SINGLE_FLIGHT_CALLS = Counter('singleflight_calls_total', 'Single-flight calls by role', ['flight', 'role'])
+EVENTS_PUBLISHED = Counter('events_published_total', 'Live dashboard events published', ['type'])
+EVENT_STREAMS = Gauge('event_streams_open', 'Open server-sent event streams', multiprocess_mode='livesum')
+SPAN_DURATION = Histogram('span_duration_seconds', 'Duration of instrumented code paths',
+                          ['span'], buckets=LATENCY_BUCKETS)
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log records dropped because the log queue was full')
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        logging.Formatter.__init__(self, '%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = logging.Formatter.format(self, record)
+        fields = ' '.join(f"{key}={value}" for key, value in _extra_fields(record).items())
+        return f"{line} [{fields}]" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every WARNING and above, and a ``rate`` fraction of the rest"""
+
+    def __init__(self, rate):
+        logging.Filter.__init__(self)
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the request they were logged from (runs before queueing)"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.endpoint = request.endpoint
+        return True
+
+
+class BackgroundLogHandler(QueueHandler):
+    """Queue records for a writer thread instead of writing them inline.
+
+    The writer is started on first use in each process, so a handler set up
+    in a pre-fork master works in its workers too.
+    """
+
+    def __init__(self, target, max_queued=10000):
+        QueueHandler.__init__(self, queue.Queue(max_queued))
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # A forked child has the parent's queue but not its writer thread
+                self.queue = queue.Queue(self.queue.maxsize)
+                self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Render the message and traceback now; the writer thread formats the rest
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def close(self):
+        # Drains the queue; logging.shutdown() calls this at exit
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+        QueueHandler.close(self)
+
+
+# Loggers whose INFO output is noise in the application log. SQLAlchemy names
+# a pool's logger after its class, so TimedQueuePool logs under this module.
+QUIET_LOGGERS = ('matplotlib', 'PIL', f'{__name__}.TimedQueuePool')
+
+
+def configure_logging(level='INFO', fmt='json', sample_rate=1.0, stream=None):
+    """Route the root logger through a :class:`BackgroundLogHandler`"""
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    handler = BackgroundLogHandler(target)
+    handler.addFilter(SamplingFilter(sample_rate))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, BackgroundLogHandler)]:
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+    return handler
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return QueuePool._do_get(self)
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+@contextmanager
+def span(name, **fields):
+    """Time a block into ``span_duration_seconds`` and log it at DEBUG"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_DURATION.labels(name).observe(elapsed)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("span finished", extra=dict(fields, span=name, duration_ms=round(elapsed * 1000, 2)))
+
+
+def cache_lookup(cache, result):
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def admission_decision(limit, outcome):
+    ADMISSION_DECISIONS.labels(limit, outcome).inc()
+
+
+def flight_call(flight, role):
+    SINGLE_FLIGHT_CALLS.labels(flight, role).inc()
+
+
+def event_published(event_type):
+    EVENTS_PUBLISHED.labels(event_type).inc()
+
+
+class Observability:
+    """Request ids, per-route latency and database metrics, and the /metrics endpoint"""
+
+    def __init__(self, app=None, profiler=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app, profiler)
+
+    def init_app(self, app, profiler=None):
+        self.app = app
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        if not app.config['METRICS_ENABLED']:
+            return
+        if profiler is not None:
+            profiler.observe(self._record_queries)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def _start(self):
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g._observed_start = time.perf_counter()
+
+    def _observe(self, status):
+        started = g.pop('_observed_start', None)
+        if started is not None and self.app.config['METRICS_ENABLED']:
+            REQUEST_LATENCY.labels(request.endpoint or 'unmatched', request.method, str(status)).observe(
+                time.perf_counter() - started)
+
+    def _finish(self, response):
+        self._observe(response.status_code)
+        response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    def _teardown(self, exc=None):
+        # Only still pending when the view raised and no response was produced
+        if '_observed_start' in g:
+            self._observe(500)
+
+    def _record_queries(self, endpoint, stats):
+        endpoint = endpoint or 'unmatched'
+        REQUEST_DB_TIME.labels(endpoint).observe(stats.total_time)
+        REQUEST_QUERIES.labels(endpoint).observe(stats.count)
+
+    def check_token(self):
+        """Abort with 401 unless the request carries METRICS_TOKEN (when one is set)"""
+        token = self.app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(401)
+
+    def protected(self, fallback=None):
+        """Decorator guarding another metrics view with METRICS_TOKEN, like /metrics.
+
+        Without a token configured, the view is guarded by ``fallback`` (a
+        decorator such as ``login_required``) instead, or refused with 401.
+        """
+        def decorator(view):
+            guarded = fallback(view) if fallback is not None else None
+
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if self.app.config['METRICS_TOKEN']:
+                    self.check_token()
+                    return view(*args, **kwargs)
+                if guarded is None:
+                    abort(401)
+                return guarded(*args, **kwargs)
+            return wrapped
+        return decorator
+
+    def metrics_view(self):
+        self.check_token()
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
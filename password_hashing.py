@@ -0,0 +1,82 @@
+"""
+Password hashing on a bounded worker pool with configurable cost.
+
+PBKDF2 is deliberately expensive. Running it in a small dedicated pool caps
+how many CPU cores login and registration can occupy at once, so a burst of
+sign-ins queues up here instead of starving every other request. (hashlib
+releases the GIL while it iterates, so the pool threads run in parallel.)
+An admitted job waits in that queue for a free worker. When the queue is
+full, callers wait up to ``queue_timeout`` seconds for room
+(``PASSWORD_HASH_QUEUE_TIMEOUT``; by default not at all) and then get
+:class:`HashingBusy` rather than waiting without limit.
+
+Hashes made with parameters that differ from the configured ones are
+reported by :meth:`PasswordHasher.needs_rehash`, so they can be upgraded
+transparently the next time the user logs in.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+
+def normalize_method(method):
+    """Spell out implicit PBKDF2 iterations so methods compare reliably"""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2' and len(parts) == 2:
+        parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ':'.join(parts)
+
+
+class PasswordHasher:
+    def __init__(self, app=None, method='pbkdf2:sha256', salt_length=16, max_workers=4,
+                 max_pending=64, queue_timeout=0.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', self.method))
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH', self.salt_length)
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_QUEUE', self.max_pending)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', self.queue_timeout)
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy('Password hashing queue is full')
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with different parameters"""
+        try:
+            method, salt, _ = pwhash.split('$', 2)
+        except ValueError:
+            return True
+        return normalize_method(method) != self.method or len(salt) != self.salt_length
@@ -0,0 +1,43 @@
+"""
+State loaded once in the pre-fork master and shared by every worker.
+
+With ``preload_app`` (see ``gunicorn.conf.py``) the master imports the app
+and calls ``app01.preload_shared_state`` before forking. Whatever it loads
+is inherited by the workers copy-on-write instead of being rebuilt by each
+one on its first requests:
+
+* the catalog payloads for ``/api/courses``, in the local tier of the
+  cache (see cache.py), so every worker starts with them;
+* :func:`preload_fonts`: ReportLab font metrics and the matplotlib font
+  cache used by the PDF report and its charts;
+* :func:`compile_templates`: every Jinja template, compiled.
+
+Nothing here opens connections or starts threads that would have to
+survive a fork; the caller closes the database pool before forking.
+"""
+
+import io
+
+REPORT_FONTS = ('Helvetica', 'Helvetica-Bold')
+
+
+def preload_fonts():
+    """Load the fonts the PDF report uses, so the first report doesn't pay for it"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.lib.styles import getSampleStyleSheet
+    import matplotlib.pyplot as plt
+
+    for font in REPORT_FONTS:
+        pdfmetrics.getFont(font)
+    getSampleStyleSheet()
+
+    # Rendering a small chart builds matplotlib's font cache and text layout state
+    plt.figure(figsize=(1, 1))
+    plt.title('warm-up')
+    plt.savefig(io.BytesIO(), format='png')
+    plt.close()
+
+
+def compile_templates(app):
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
@@ -0,0 +1,191 @@
+"""
+Per-request SQL profiling with N+1 detection.
+
+Hooks into SQLAlchemy's cursor events and, for every request, records the
+number of statements, the total time spent in the database, and a count per
+normalised statement fingerprint (literals and IN-lists replaced by ``?``).
+A fingerprint executed ``SQL_N_PLUS_ONE_THRESHOLD`` or more times in a
+single request is reported as a likely N+1 pattern.
+
+Routes can be given a query budget through ``SQL_QUERY_BUDGETS``
+(endpoint -> max statements). With ``SQL_PROFILER_STRICT`` enabled, which
+is meant for test runs, exceeding a budget or tripping the N+1 detector
+raises :class:`QueryBudgetExceeded` instead of only logging a warning.
+:func:`query_budget` applies the same checks to an arbitrary block of code.
+
+Callbacks registered with :meth:`QueryProfiler.observe` get every request's
+stats (e.g. for metrics); requests are profiled whenever there is one, even
+with ``SQL_PROFILER_ENABLED`` off.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*[?%]s?\s*,?)+\)", re.IGNORECASE)
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_WHITESPACE = re.compile(r"\s+")
+
+_local = threading.local()
+log = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    """Reduce a SQL statement to its shape, independent of parameter values"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _BIND_PARAM.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    def __init__(self, label=None):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+        self.fingerprint_time = defaultdict(float)
+
+    def record(self, statement, elapsed):
+        shape = fingerprint(statement)
+        self.count += 1
+        self.total_time += elapsed
+        self.fingerprints[shape] += 1
+        self.fingerprint_time[shape] += elapsed
+
+    def repeated(self, threshold):
+        """Statement shapes run at least ``threshold`` times (likely N+1)"""
+        return [(shape, count) for shape, count in self.fingerprints.most_common() if count >= threshold]
+
+
+def _collectors():
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors()
+    if not collectors:
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+def _check(stats, budget, threshold):
+    problems = []
+    if budget is not None and stats.count > budget:
+        problems.append(f"{stats.count} queries exceeds budget of {budget}")
+    for shape, count in stats.repeated(threshold):
+        problems.append(f"possible N+1: {count}x {shape[:200]}")
+    return problems
+
+
+@contextmanager
+def query_budget(max_queries=None, n_plus_one_threshold=5, label='block'):
+    """Fail with QueryBudgetExceeded if the block runs too many (or repeated) queries"""
+    stats = QueryStats(label)
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+    problems = _check(stats, max_queries, n_plus_one_threshold)
+    if problems:
+        raise QueryBudgetExceeded(f"{label}: " + '; '.join(problems))
+
+
+class QueryProfiler:
+    def __init__(self, app=None):
+        self.app = app
+        self.totals = defaultdict(lambda: {'requests': 0, 'queries': 0, 'db_time': 0.0, 'n_plus_one': 0})
+        self.observers = []
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('SQL_PROFILER_ENABLED', False)
+        app.config.setdefault('SQL_PROFILER_STRICT', False)
+        app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        app.config.setdefault('SQL_QUERY_BUDGETS', {})
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+
+    def observe(self, callback):
+        """Call ``callback(endpoint, stats)`` after every profiled request"""
+        if callback not in self.observers:
+            self.observers.append(callback)
+
+    def _start(self):
+        if self.app.config['SQL_PROFILER_ENABLED'] or self.observers:
+            stats = QueryStats(request.endpoint)
+            _local.request_stats = stats
+            _collectors().append(stats)
+
+    def _discard(self, exc=None):
+        stats = getattr(_local, 'request_stats', None)
+        if stats is not None:
+            _local.request_stats = None
+            if stats in _collectors():
+                _collectors().remove(stats)
+
+    def _finish(self, response):
+        stats = getattr(_local, 'request_stats', None)
+        if stats is None:
+            return response
+        self._discard()
+        for callback in self.observers:
+            callback(request.endpoint, stats)
+        if not self.app.config['SQL_PROFILER_ENABLED']:
+            return response
+
+        threshold = self.app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        budget = self.app.config['SQL_QUERY_BUDGETS'].get(request.endpoint)
+        problems = _check(stats, budget, threshold)
+        with self._lock:
+            totals = self.totals[request.endpoint]
+            totals['requests'] += 1
+            totals['queries'] += stats.count
+            totals['db_time'] += stats.total_time
+            totals['n_plus_one'] += len(stats.repeated(threshold))
+
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-DB-Time-Ms'] = f"{stats.total_time * 1000:.1f}"
+        if problems:
+            message = f"SQL profile for {request.method} {request.path} ({request.endpoint}): " + '; '.join(problems)
+            if self.app.config['SQL_PROFILER_STRICT']:
+                raise QueryBudgetExceeded(message)
+            log.warning(message)
+        return response
+
+    def report(self):
+        with self._lock:
+            return {endpoint: dict(values) for endpoint, values in self.totals.items()}
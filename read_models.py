@@ -0,0 +1,99 @@
+"""
+Lightweight read models for the course catalogue.
+
+Hot read paths don't need change tracking or identity maps, so they select
+only the columns they use and wrap each row in a ``__slots__`` record
+instead of hydrating ``Course`` objects. ``description`` (TEXT) is left out
+of list queries; :func:`with_descriptions` fetches it afterwards with a
+single ``IN`` query for just the courses that end up in a response.
+
+The query builders take the ``course`` Table rather than a session, so the
+same statements work with a synchronous session and with an async one.
+"""
+
+from sqlalchemy import select
+
+SUMMARY_FIELDS = ('id', 'name', 'domain', 'duration', 'difficulty', 'prerequisites',
+                  'instructor', 'rating', 'students_count', 'url')
+# Field order of course payloads, as the API has always returned them
+PAYLOAD_FIELDS = ('id', 'name', 'domain', 'duration', 'difficulty', 'prerequisites',
+                  'description', 'instructor', 'rating', 'url')
+
+DIFFICULTY_LEVELS = {level.lower(): level for level in ('Beginner', 'Intermediate', 'Advanced')}
+
+
+class CourseRecord:
+    __slots__ = SUMMARY_FIELDS + ('description',)
+
+    def __init__(self, row, description=None):
+        for field, value in zip(SUMMARY_FIELDS, row):
+            setattr(self, field, value)
+        self.description = description
+
+    def __repr__(self):
+        return f"<CourseRecord {self.id} {self.name!r}>"
+
+
+def summary_query(course_table, *criteria):
+    """SELECT of the summary columns, optionally filtered"""
+    query = select(*[course_table.c[field] for field in SUMMARY_FIELDS])
+    if criteria:
+        query = query.where(*criteria)
+    return query
+
+
+def description_query(course_table, course_ids):
+    return select(course_table.c.id, course_table.c.description).where(course_table.c.id.in_(list(course_ids)))
+
+
+def to_records(rows):
+    return [CourseRecord(row) for row in rows]
+
+
+def record_rows(records):
+    """Plain lists of the summary fields, e.g. for caching; :func:`to_records` reads them back"""
+    return [[getattr(record, field) for field in SUMMARY_FIELDS] for record in records]
+
+
+def apply_descriptions(records, rows):
+    descriptions = {course_id: description for course_id, description in rows}
+    for record in records:
+        record.description = descriptions.get(record.id)
+    return records
+
+
+def load_courses(session, course_table, *criteria):
+    """Course records matching ``criteria``, without descriptions"""
+    return to_records(session.execute(summary_query(course_table, *criteria)))
+
+
+def with_descriptions(session, course_table, records):
+    """Fill in ``description`` for ``records`` with one query"""
+    ids = {record.id for record in records}
+    if ids:
+        apply_descriptions(records, session.execute(description_query(course_table, ids)))
+    return records
+
+
+def popularity_score(rating, students_count):
+    """Ranking score stored in ``course.popularity_score``"""
+    return (rating or 0) * 0.7 + ((students_count or 0) / 100000) * 0.3
+
+
+def popularity(course):
+    return popularity_score(course.rating, course.students_count)
+
+
+def normalize_difficulty(difficulty):
+    """Known levels in their stored spelling ('Beginner', ...), so bucket lookups can use the index"""
+    if difficulty is None:
+        return None
+    return DIFFICULTY_LEVELS.get(difficulty.strip().lower(), difficulty)
+
+
+def serialize_course(course, include_description=True):
+    """Response payload for a course record (or ORM object)"""
+    payload = {field: getattr(course, field) for field in PAYLOAD_FIELDS}
+    if not include_description:
+        del payload['description']
+    return payload
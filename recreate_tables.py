@@ -2,6 +2,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from app01 import app, db
+from migrate import stamp
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +17,9 @@ def recreate_tables():
             print("Creating all tables...")
             db.create_all()
             
+            # The fresh schema already contains every migration
+            stamp(db.engine)
+            
             print("Tables recreated successfully!")
             return True
             
@@ -0,0 +1,179 @@
+"""
+Single-flight execution for expensive computations.
+
+When many requests need the same result at once (a featured course's
+recommendations, a double-clicked report download), only the first one
+computes it; the others wait and get its result, or its exception. Nothing
+is kept once the computation finishes, so a request that arrives afterwards
+starts a fresh one. Use the cache (see cache.py) to keep results.
+
+:class:`SingleFlight` coalesces the threads of a process. Called with
+``shared=True`` and given a shared store (the cache's shared tier), it also
+coalesces workers: the first worker takes a lock key in the store and
+publishes its result there for ``result_ttl`` seconds, and the other workers
+poll for it instead of computing. Shared results must be JSON-serializable.
+:class:`AsyncSingleFlight` does the in-process part for coroutines.
+
+Results are handed to every waiter as is, so treat them as read-only.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+log = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def wait_for_result(fetch, lock_held, timeout):
+    """Poll ``fetch`` until it returns something other than MISSING.
+
+    Gives up after ``timeout`` seconds, or once ``lock_held`` says whoever was
+    computing it has finished without leaving a result; returns MISSING then.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+        value = fetch()
+        if value is not MISSING:
+            return value
+        try:
+            held = lock_held()
+        except Exception:
+            return MISSING
+        if not held:
+            # Released since the fetch above; the result may have been written just before
+            return fetch()
+    return MISSING
+
+
+class SingleFlight:
+    def __init__(self, store=None, result_ttl=5.0, lock_timeout=30.0, on_call=None):
+        self.store = store
+        self.result_ttl = result_ttl
+        self.lock_timeout = lock_timeout  # Also how long other workers wait for a result
+        self.on_call = on_call  # Called with (key prefix, 'leader'/'waiter'/'shared_waiter'), for metrics
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _record(self, key, role):
+        if self.on_call is not None:
+            self.on_call(key.split(':', 1)[0], role)
+
+    def do(self, key, fn, shared=False, timeout=None):
+        """Return ``fn()``, or the result of the call for ``key`` already in flight.
+
+        ``timeout`` bounds how long a waiting thread blocks (None: as long as
+        the call takes); it gets ``concurrent.futures.TimeoutError`` after that.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            self._record(key, 'waiter')
+            return call.result(timeout)
+
+        try:
+            if shared and self.store is not None:
+                result = self._do_shared(key, fn)
+            else:
+                self._record(key, 'leader')
+                result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def _do_shared(self, key, fn):
+        # The lock holds a token naming this flight's result, so waiters never
+        # pick up a result an earlier flight left behind
+        lock_key, token = f"flight:{key}", uuid.uuid4().hex
+        try:
+            locked = self.store.add(lock_key, token, self.lock_timeout)
+            leader_token = token if locked else self.store.get(lock_key)
+        except Exception:
+            log.warning("Shared single-flight lock failed", extra={'key': key}, exc_info=True)
+            locked, leader_token = None, None  # Compute it here rather than wait on a store that isn't answering
+        if not locked and leader_token is not None:
+            result_key = f"flight-result:{key}:{leader_token}"
+            result = wait_for_result(lambda: self._published(result_key),
+                                     lambda: self.store.get(lock_key) == leader_token, self.lock_timeout)
+            if result is not MISSING:
+                self._record(key, 'shared_waiter')
+                return result
+
+        self._record(key, 'leader')
+        try:
+            result = fn()
+            if locked:
+                # Published before the lock is released, so waiters find it
+                try:
+                    self.store.set(f"flight-result:{key}:{token}", [result], self.result_ttl)
+                except Exception:
+                    log.warning("Shared single-flight publish failed", extra={'key': key}, exc_info=True)
+            return result
+        finally:
+            if locked:
+                try:
+                    self.store.delete(lock_key)
+                except Exception:
+                    log.warning("Shared single-flight unlock failed", extra={'key': key}, exc_info=True)
+
+    def _published(self, result_key):
+        try:
+            entry = self.store.get(result_key)
+        except Exception:
+            return MISSING
+        # Stored wrapped, so a None result is told apart from no result
+        return entry[0] if entry is not None else MISSING
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """In-process single flight for coroutine functions.
+
+    The computation runs as its own task, so a caller that is cancelled (its
+    client went away) doesn't cancel it for the others. ``fn`` must therefore
+    not use resources owned by the calling request, such as its connection.
+    """
+
+    def __init__(self, on_call=None):
+        self.on_call = on_call
+        self._calls = {}
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finished(key, done))
+            role = 'leader'
+        else:
+            role = 'waiter'
+        if self.on_call is not None:
+            self.on_call(key.split(':', 1)[0], role)
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved, in case every caller was cancelled
+
+    def in_flight(self):
+        return len(self._calls)
@@ -0,0 +1,45 @@
+// Live dashboard updates: the user's changes as server-sent events from /api/events
+// (served by async_api.py). Pages register a handler per event type and patch what
+// they show; a 'reset' event means the page should re-fetch everything.
+const DashboardEvents = (() => {
+    const handlers = {};
+    let source = null;
+
+    function on(type, handler) {
+        if (!handlers[type]) {
+            handlers[type] = [];
+            if (source) {
+                listen(type);
+            }
+        }
+        handlers[type].push(handler);
+    }
+
+    function listen(type) {
+        source.addEventListener(type, event => {
+            const data = JSON.parse(event.data);
+            handlers[type].forEach(handler => handler(data));
+        });
+    }
+
+    function connect(url = '/api/events') {
+        if (source || !window.EventSource) {
+            return;
+        }
+        // The browser reconnects by itself and the server replays what was missed
+        source = new EventSource(url);
+        Object.keys(handlers).forEach(listen);
+        source.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED) {
+                console.warn('Live updates are not available; data is refreshed after each change instead');
+            }
+        });
+    }
+
+    // Whether changes currently arrive on their own; if not, re-fetch after making one
+    function isLive() {
+        return source !== null && source.readyState === EventSource.OPEN;
+    }
+
+    return { on, connect, isLive };
+})();
@@ -13,22 +13,9 @@ document.getElementById('certificateForm')?.addEventListener('submit', async (e)
         });
         
         if (response.ok) {
-            // Get recommendations
-            const recommendationsResponse = await fetch('/api/recommendations', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    course_name: formData.get('course_name'),
-                    domain: formData.get('domain'),
-                    duration: parseInt(formData.get('duration')),
-                    difficulty: formData.get('difficulty'),
-                    performance_score: parseInt(formData.get('performance_score'))
-                })
-            });
-            
-            const recommendations = await recommendationsResponse.json();
+            // Recommendations are computed after the upload; fetch them for the new certificate
+            const result = await response.json();
+            const recommendations = await fetchCertificateRecommendations(result.recommendations_url);
             displayRecommendations(recommendations);
             
             // Reset form
@@ -45,6 +32,22 @@ document.getElementById('certificateForm')?.addEventListener('submit', async (e)
     }
 });
 
+// Fetch the recommendations computed for a newly uploaded certificate
+async function fetchCertificateRecommendations(url, attempts = 5) {
+    for (let i = 0; i < attempts; i++) {
+        const response = await fetch(`${url}?wait=5`);
+        if (response.status === 202) {
+            continue;
+        }
+        if (!response.ok) {
+            throw new Error('Failed to fetch recommendations');
+        }
+        const result = await response.json();
+        return result.recommendations;
+    }
+    return [];
+}
+
 // Display recommendations
 function displayRecommendations(recommendations) {
     const recommendationsDiv = document.getElementById('recommendations');
@@ -67,6 +70,9 @@ function displayRecommendations(recommendations) {
     });
 }
 
+// The user's certificates, as shown in the table and progress chart
+let userCertificates = [];
+
 // Dashboard charts and statistics
 async function loadDashboardData() {
     try {
@@ -87,44 +93,50 @@ async function loadDashboardData() {
 async function loadCertificates(userId) {
     try {
         const response = await fetch(`/api/certificates/${userId}`);
-        const certificates = await response.json();
+        userCertificates = await response.json();
+        showCertificates();
+    } catch (error) {
+        console.error('Error loading certificates:', error);
+        createProgressChart([]);
+    }
+}
+
+// Show the current certificates in the table and progress chart
+function showCertificates() {
+    const certificatesTable = document.getElementById('certificatesTable');
+    certificatesTable.innerHTML = '';
+    createProgressChart(userCertificates);
+    
+    if (userCertificates.length === 0) {
+        certificatesTable.innerHTML = '<tr><td colspan="7" class="text-center">No certificates found</td></tr>';
+        return;
+    }
+    
+    userCertificates.forEach(cert => {
+        const row = document.createElement('tr');
         
-        const certificatesTable = document.getElementById('certificatesTable');
-        certificatesTable.innerHTML = '';
+        // Format date
+        const date = new Date(cert.completion_date);
+        const formattedDate = date.toLocaleDateString();
         
-        if (certificates.length === 0) {
-            certificatesTable.innerHTML = '<tr><td colspan="7" class="text-center">No certificates found</td></tr>';
-            return;
+        // Create certificate image cell
+        let imageCell = '<td>No image</td>';
+        if (cert.image_url) {
+            imageCell = `<td><a href="${cert.image_url}" target="_blank"><img src="${cert.thumbnail_url}" alt="Certificate" loading="lazy" width="48"> View Certificate</a></td>`;
         }
         
-        certificates.forEach(cert => {
-            const row = document.createElement('tr');
-            
-            // Format date
-            const date = new Date(cert.completion_date);
-            const formattedDate = date.toLocaleDateString();
-            
-            // Create certificate image cell
-            let imageCell = '<td>No image</td>';
-            if (cert.image_path) {
-                imageCell = `<td><a href="/static/${cert.image_path}" target="_blank">View Certificate</a></td>`;
-            }
-            
-            row.innerHTML = `
-                <td>${cert.course_name}</td>
-                <td>${cert.domain}</td>
-                <td>${cert.duration} hours</td>
-                <td>${cert.difficulty}</td>
-                <td>${cert.performance_score || 'N/A'}</td>
-                ${imageCell}
-                <td>${formattedDate}</td>
-            `;
-            
-            certificatesTable.appendChild(row);
-        });
-    } catch (error) {
-        console.error('Error loading certificates:', error);
-    }
+        row.innerHTML = `
+            <td>${cert.course_name}</td>
+            <td>${cert.domain}</td>
+            <td>${cert.duration} hours</td>
+            <td>${cert.difficulty}</td>
+            <td>${cert.performance_score || 'N/A'}</td>
+            ${imageCell}
+            <td>${formattedDate}</td>
+        `;
+        
+        certificatesTable.appendChild(row);
+    });
 }
 
 // Update statistics
@@ -164,81 +176,80 @@ function createCharts(stats) {
     };
     
     Plotly.newPlot('difficultyChart', difficultyData, difficultyLayout);
+}
+
+// Progress Chart - cumulative completions per month
+function createProgressChart(certificates) {
+    // Group certificates by month
+    const monthlyData = {};
     
-    // Progress Chart - Using actual certificate data
-    // Get certificates data for the progress chart
-    const userId = document.body.dataset.userId || 1;
-    fetch(`/api/certificates/${userId}`)
-        .then(response => response.json())
-        .then(certificates => {
-            // Group certificates by month
-            const monthlyData = {};
-            
-            certificates.forEach(cert => {
-                const date = new Date(cert.completion_date);
-                const monthYear = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
-                
-                if (!monthlyData[monthYear]) {
-                    monthlyData[monthYear] = 0;
-                }
-                monthlyData[monthYear]++;
-            });
-            
-            // Sort months chronologically
-            const sortedMonths = Object.keys(monthlyData).sort();
-            
-            // Calculate cumulative progress
-            let cumulative = 0;
-            const cumulativeData = sortedMonths.map(month => {
-                cumulative += monthlyData[month];
-                return cumulative;
-            });
-            
-            // Format month labels for display
-            const monthLabels = sortedMonths.map(month => {
-                const [year, monthNum] = month.split('-');
-                const date = new Date(year, monthNum - 1);
-                return date.toLocaleDateString('default', { month: 'short', year: 'numeric' });
-            });
-            
-            const progressData = [{
-                x: monthLabels,
-                y: cumulativeData,
-                type: 'scatter',
-                mode: 'lines+markers',
-                name: 'Courses Completed'
-            }];
-            
-            const progressLayout = {
-                title: 'Course Completion Progress',
-                xaxis: { title: 'Month' },
-                yaxis: { title: 'Total Courses Completed' }
-            };
-            
-            Plotly.newPlot('progressChart', progressData, progressLayout);
-        })
-        .catch(error => {
-            console.error('Error loading certificate data for progress chart:', error);
-            
-            // Fallback to empty progress chart if data loading fails
-            const progressData = [{
-                x: [],
-                y: [],
-                type: 'scatter',
-                mode: 'lines+markers'
-            }];
-            
-            const progressLayout = {
-                title: 'Course Completion Progress',
-                xaxis: { title: 'Month' },
-                yaxis: { title: 'Total Courses Completed' }
-            };
-            
-            Plotly.newPlot('progressChart', progressData, progressLayout);
-        });
+    certificates.forEach(cert => {
+        const date = new Date(cert.completion_date);
+        const monthYear = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
+        
+        if (!monthlyData[monthYear]) {
+            monthlyData[monthYear] = 0;
+        }
+        monthlyData[monthYear]++;
+    });
+    
+    // Sort months chronologically
+    const sortedMonths = Object.keys(monthlyData).sort();
+    
+    // Calculate cumulative progress
+    let cumulative = 0;
+    const cumulativeData = sortedMonths.map(month => {
+        cumulative += monthlyData[month];
+        return cumulative;
+    });
+    
+    // Format month labels for display
+    const monthLabels = sortedMonths.map(month => {
+        const [year, monthNum] = month.split('-');
+        const date = new Date(year, monthNum - 1);
+        return date.toLocaleDateString('default', { month: 'short', year: 'numeric' });
+    });
+    
+    const progressData = [{
+        x: monthLabels,
+        y: cumulativeData,
+        type: 'scatter',
+        mode: 'lines+markers',
+        name: 'Courses Completed'
+    }];
+    
+    const progressLayout = {
+        title: 'Course Completion Progress',
+        xaxis: { title: 'Month' },
+        yaxis: { title: 'Total Courses Completed' }
+    };
+    
+    Plotly.newPlot('progressChart', progressData, progressLayout);
+}
+
+// Apply changes pushed by the server (see dashboard_events.js) instead of re-fetching
+function subscribeToDashboardUpdates() {
+    if (typeof DashboardEvents === 'undefined') {
+        return;
+    }
+    DashboardEvents.on('certificate_added', certificate => {
+        userCertificates = userCertificates.filter(cert => cert.id !== certificate.id).concat([certificate]);
+        showCertificates();
+    });
+    DashboardEvents.on('certificate_removed', removed => {
+        userCertificates = userCertificates.filter(cert => cert.id !== removed.id);
+        showCertificates();
+    });
+    DashboardEvents.on('statistics', stats => {
+        updateStatistics(stats);
+        createCharts(stats);
+    });
+    DashboardEvents.on('reset', loadDashboardData);
+    DashboardEvents.connect();
 }
 
 // Load dashboard data when on dashboard page
 if (window.location.pathname === '/dashboard') {
     loadDashboardData();
-} 
\ No newline at end of file
+    subscribeToDashboardUpdates();
+} 
@@ -34,34 +34,7 @@ function fetchRecommendedCourses() {
     })
     .then(data => {
         console.log("Received recommendations data:", data);
-        const recommendationsContainer = document.getElementById('recommended-courses');
-        
-        if (data && data.length > 0) {
-            recommendationsContainer.innerHTML = data.map(course => `
-                <div class="col-md-4 mb-3">
-                    <div class="card h-100">
-                        <div class="card-body">
-                            <h6 class="card-title">${course.name}</h6>
-                            <p class="card-text">
-                                <small class="text-muted">
-                                    Domain: ${course.domain}<br>
-                                    Difficulty: ${course.difficulty}<br>
-                                    Duration: ${course.duration} hours
-                                </small>
-                            </p>
-                            <p class="card-text">${course.description || 'No description available'}</p>
-                            ${course.url ? `<a href="${course.url}" target="_blank" class="btn btn-sm btn-primary mt-2">View Course</a>` : ''}
-                        </div>
-                    </div>
-                </div>
-            `).join('');
-        } else {
-            recommendationsContainer.innerHTML = `
-                <div class="col-12 text-center">
-                    <p class="text-muted">No recommendations available at this time.</p>
-                </div>
-            `;
-        }
+        displayRecommendedCourses(data);
     })
     .catch(error => {
         console.error('Error fetching recommendations:', error);
@@ -72,4 +45,36 @@ function fetchRecommendedCourses() {
             </div>
         `;
     });
-} 
\ No newline at end of file
+}
+
+// Render course cards into the recommendations section (also used for live updates)
+function displayRecommendedCourses(data) {
+    const recommendationsContainer = document.getElementById('recommended-courses');
+    
+    if (data && data.length > 0) {
+        recommendationsContainer.innerHTML = data.map(course => `
+            <div class="col-md-4 mb-3">
+                <div class="card h-100">
+                    <div class="card-body">
+                        <h6 class="card-title">${course.name}</h6>
+                        <p class="card-text">
+                            <small class="text-muted">
+                                Domain: ${course.domain}<br>
+                                Difficulty: ${course.difficulty}<br>
+                                Duration: ${course.duration} hours
+                            </small>
+                        </p>
+                        <p class="card-text">${course.description || 'No description available'}</p>
+                        ${course.url ? `<a href="${course.url}" target="_blank" class="btn btn-sm btn-primary mt-2">View Course</a>` : ''}
+                    </div>
+                </div>
+            </div>
+        `).join('');
+    } else {
+        recommendationsContainer.innerHTML = `
+            <div class="col-12 text-center">
+                <p class="text-muted">No recommendations available at this time.</p>
+            </div>
+        `;
+    }
+}
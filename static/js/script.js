@@ -12,6 +12,22 @@ async function fetchRecommendations(courseId) {
     }
 }
 
+// Function to fetch the recommendations computed for a newly uploaded certificate
+async function fetchCertificateRecommendations(url, attempts = 5) {
+    for (let i = 0; i < attempts; i++) {
+        const response = await fetch(`${url}?wait=5`);
+        if (response.status === 202) {
+            continue;
+        }
+        if (!response.ok) {
+            throw new Error(`Failed to fetch recommendations: ${response.status}`);
+        }
+        const result = await response.json();
+        return result.recommendations;
+    }
+    return [];
+}
+
 // Function to display recommendations
 function displayRecommendations(recommendations) {
     const recommendationsList = document.getElementById('recommendationsList');
@@ -123,10 +139,14 @@ async function handleFormSubmit(event) {
         
         console.log("Upload successful:", result);
         
-        // Display recommendations if available
-        if (result.recommendations) {
-            console.log("Displaying recommendations:", result.recommendations);
-            displayRecommendations(result.recommendations);
+        // Recommendations are computed after the upload; fetch them separately
+        if (result.recommendations_url) {
+            fetchCertificateRecommendations(result.recommendations_url)
+                .then(recommendations => {
+                    console.log("Displaying recommendations:", recommendations);
+                    displayRecommendations(recommendations);
+                })
+                .catch(error => console.error('Error fetching recommendations:', error));
         }
         
         // Show success message
@@ -135,8 +155,8 @@ async function handleFormSubmit(event) {
         // Reset form
         form.reset();
         
-        // Refresh dashboard data if we're on the dashboard page
-        if (window.location.pathname === '/dashboard') {
+        // Refresh dashboard data if we're on the dashboard page, unless the change is pushed to it
+        if (window.location.pathname === '/dashboard' && !dashboardIsLive()) {
             console.log("Refreshing dashboard data after certificate upload");
             fetchUserStatistics();
             fetchCertificates();
@@ -206,8 +226,8 @@ async function loadCertificates(userId) {
             
             // Create certificate image cell
             let imageCell = '<td>No image</td>';
-            if (cert.image_path) {
-                imageCell = `<td><a href="/static/${cert.image_path}" target="_blank">View Certificate</a></td>`;
+            if (cert.image_url) {
+                imageCell = `<td><a href="${cert.image_url}" target="_blank"><img src="${cert.thumbnail_url}" alt="Certificate" loading="lazy" width="48"> View Certificate</a></td>`;
             }
             
             row.innerHTML = `
@@ -358,13 +378,12 @@ async function deleteCertificate(certificateId) {
         }
 
         // Remove the certificate from the UI
-        const certificateElement = document.querySelector(`[data-certificate-id="${certificateId}"]`);
-        if (certificateElement) {
-            certificateElement.remove();
-        }
+        removeCertificate(certificateId);
 
-        // Update statistics
-        await fetchUserStatistics();
+        // Update statistics, unless the new ones are pushed to the page
+        if (!dashboardIsLive()) {
+            await fetchUserStatistics();
+        }
 
         // Show success message
         showNotification('Certificate deleted successfully', 'success');
@@ -413,46 +432,8 @@ async function fetchUserStatistics() {
         const data = await response.json();
         console.log('Statistics data:', data);
         
-        // Update statistics cards
-        const totalCoursesElement = document.getElementById('totalCourses');
-        const averageScoreElement = document.getElementById('averageScore');
-        
-        if (totalCoursesElement) {
-            totalCoursesElement.textContent = data.total_courses || 0;
-            console.log("Updated total courses:", data.total_courses || 0);
-        } else {
-            console.error("Total courses element not found");
-        }
-        
-        if (averageScoreElement) {
-            averageScoreElement.textContent = `${(data.average_score || 0).toFixed(1)}%`;
-            console.log("Updated average score:", data.average_score || 0);
-        } else {
-            console.error("Average score element not found");
-        }
-        
-        // Create charts
-        if (data.domains && Object.keys(data.domains).length > 0) {
-            createDomainChart(data.domains);
-        } else {
-            console.log("No domain data available");
-        }
-        
-        if (data.difficulty_levels && Object.keys(data.difficulty_levels).length > 0) {
-            createDifficultyChart(data.difficulty_levels);
-        } else {
-            console.log("No difficulty level data available");
-        }
-        
-        // Create progress chart with certificates data
-        if (data.certificates && data.certificates.length > 0) {
-            createProgressChart(data.certificates);
-            document.getElementById('no-progress-data').style.display = 'none';
-            document.getElementById('progress-chart').style.display = 'block';
-        } else {
-            document.getElementById('no-progress-data').style.display = 'block';
-            document.getElementById('progress-chart').style.display = 'none';
-        }
+        showStatistics(data);
+        showProgress(data.certificates);
         
     } catch (error) {
         console.error('Error fetching statistics:', error);
@@ -471,6 +452,52 @@ async function fetchUserStatistics() {
     }
 }
 
+// Show statistics in the cards and charts
+function showStatistics(data) {
+    // Update statistics cards
+    const totalCoursesElement = document.getElementById('totalCourses');
+    const averageScoreElement = document.getElementById('averageScore');
+    
+    if (totalCoursesElement) {
+        totalCoursesElement.textContent = data.total_courses || 0;
+        console.log("Updated total courses:", data.total_courses || 0);
+    } else {
+        console.error("Total courses element not found");
+    }
+    
+    if (averageScoreElement) {
+        averageScoreElement.textContent = `${(data.average_score || 0).toFixed(1)}%`;
+        console.log("Updated average score:", data.average_score || 0);
+    } else {
+        console.error("Average score element not found");
+    }
+    
+    // Create charts
+    if (data.domains && Object.keys(data.domains).length > 0) {
+        createDomainChart(data.domains);
+    } else {
+        console.log("No domain data available");
+    }
+    
+    if (data.difficulty_levels && Object.keys(data.difficulty_levels).length > 0) {
+        createDifficultyChart(data.difficulty_levels);
+    } else {
+        console.log("No difficulty level data available");
+    }
+}
+
+// Show the progress chart, or a note when there are no certificates yet
+function showProgress(certificates) {
+    if (certificates && certificates.length > 0) {
+        createProgressChart(certificates);
+        document.getElementById('no-progress-data').style.display = 'none';
+        document.getElementById('progress-chart').style.display = 'block';
+    } else {
+        document.getElementById('no-progress-data').style.display = 'block';
+        document.getElementById('progress-chart').style.display = 'none';
+    }
+}
+
 // Create domain distribution chart
 function createDomainChart(data) {
     console.log("Creating domain chart with data:", data);
@@ -480,6 +507,8 @@ function createDomainChart(data) {
         return;
     }
     
+    // Replace the chart drawn from earlier data, if any
+    Chart.getChart(ctx)?.destroy();
     new Chart(ctx, {
         type: 'pie',
         data: {
@@ -515,6 +544,8 @@ function createDifficultyChart(data) {
         return;
     }
     
+    // Replace the chart drawn from earlier data, if any
+    Chart.getChart(ctx)?.destroy();
     new Chart(ctx, {
         type: 'bar',
         data: {
@@ -543,6 +574,7 @@ function createDifficultyChart(data) {
 function createProgressChart(certificates) {
     const ctx = document.getElementById('progress-chart');
     if (!ctx) return;
+    Chart.getChart(ctx)?.destroy();
     
     // Sort certificates by completion date
     certificates.sort((a, b) => new Date(a.completion_date) - new Date(b.completion_date));
@@ -607,6 +639,62 @@ function createProgressChart(certificates) {
     });
 }
 
+// The user's certificates, as shown in the table
+let dashboardCertificates = [];
+
+const NO_CERTIFICATES_ROW = `
+    <tr>
+        <td colspan="6" class="text-center">No certificates found</td>
+    </tr>
+`;
+
+// Table row for a certificate
+function certificateRow(cert) {
+    const row = document.createElement('tr');
+    row.setAttribute('data-certificate-id', cert.id);
+    row.innerHTML = `
+        <td>${cert.course_name}</td>
+        <td>${cert.domain}</td>
+        <td>${cert.difficulty}</td>
+        <td>${cert.performance_score ? `${cert.performance_score}%` : 'N/A'}</td>
+        <td>${new Date(cert.completion_date).toLocaleDateString()}</td>
+        <td>
+            <button class="btn btn-sm btn-danger" onclick="deleteCertificate(${cert.id})">
+                <i class="fas fa-trash"></i> Delete
+            </button>
+        </td>
+    `;
+    return row;
+}
+
+// Add a certificate to the table (from a live update)
+function addCertificate(certificate) {
+    const tbody = document.getElementById('certificatesTableBody');
+    if (!tbody || dashboardCertificates.some(cert => cert.id === certificate.id)) {
+        return;
+    }
+    if (dashboardCertificates.length === 0) {
+        tbody.innerHTML = '';
+    }
+    dashboardCertificates.push(certificate);
+    tbody.appendChild(certificateRow(certificate));
+    showProgress(dashboardCertificates);
+}
+
+// Remove a certificate from the table
+function removeCertificate(certificateId) {
+    const certificateElement = document.querySelector(`[data-certificate-id="${certificateId}"]`);
+    if (certificateElement) {
+        certificateElement.remove();
+    }
+    dashboardCertificates = dashboardCertificates.filter(cert => cert.id !== certificateId);
+    const tbody = document.getElementById('certificatesTableBody');
+    if (tbody && dashboardCertificates.length === 0) {
+        tbody.innerHTML = NO_CERTIFICATES_ROW;
+    }
+    showProgress(dashboardCertificates);
+}
+
 // Fetch and display certificates
 async function fetchCertificates() {
     try {
@@ -622,8 +710,8 @@ async function fetchCertificates() {
             throw new Error(`Failed to fetch certificates: ${response.status}`);
         }
         
-        const certificates = await response.json();
-        console.log('Certificates data:', certificates);
+        dashboardCertificates = await response.json();
+        console.log('Certificates data:', dashboardCertificates);
         
         const tbody = document.getElementById('certificatesTableBody');
         if (!tbody) {
@@ -633,32 +721,12 @@ async function fetchCertificates() {
         
         tbody.innerHTML = '';
         
-        if (certificates.length === 0) {
-            tbody.innerHTML = `
-                <tr>
-                    <td colspan="6" class="text-center">No certificates found</td>
-                </tr>
-            `;
+        if (dashboardCertificates.length === 0) {
+            tbody.innerHTML = NO_CERTIFICATES_ROW;
             return;
         }
         
-        certificates.forEach(cert => {
-            const row = document.createElement('tr');
-            row.setAttribute('data-certificate-id', cert.id);
-            row.innerHTML = `
-                <td>${cert.course_name}</td>
-                <td>${cert.domain}</td>
-                <td>${cert.difficulty}</td>
-                <td>${cert.performance_score ? `${cert.performance_score}%` : 'N/A'}</td>
-                <td>${new Date(cert.completion_date).toLocaleDateString()}</td>
-                <td>
-                    <button class="btn btn-sm btn-danger" onclick="deleteCertificate(${cert.id})">
-                        <i class="fas fa-trash"></i> Delete
-                    </button>
-                </td>
-            `;
-            tbody.appendChild(row);
-        });
+        dashboardCertificates.forEach(cert => tbody.appendChild(certificateRow(cert)));
         
     } catch (error) {
         console.error('Error fetching certificates:', error);
@@ -745,34 +813,7 @@ function fetchRecommendedCourses() {
         })
         .then(data => {
             console.log("Received recommendations data:", data);
-            const recommendationsContainer = document.getElementById('recommended-courses');
-            
-            if (data && data.length > 0) {
-                recommendationsContainer.innerHTML = data.map(course => `
-                    <div class="col-md-4 mb-3">
-                        <div class="card h-100">
-                            <div class="card-body">
-                                <h6 class="card-title">${course.name}</h6>
-                                <p class="card-text">
-                                    <small class="text-muted">
-                                        Domain: ${course.domain}<br>
-                                        Difficulty: ${course.difficulty}<br>
-                                        Duration: ${course.duration} hours
-                                    </small>
-                                </p>
-                                <p class="card-text">${course.description || 'No description available'}</p>
-                                ${course.url ? `<a href="${course.url}" target="_blank" class="btn btn-sm btn-primary mt-2">View Course</a>` : ''}
-                            </div>
-                        </div>
-                    </div>
-                `).join('');
-            } else {
-                recommendationsContainer.innerHTML = `
-                    <div class="col-12 text-center">
-                        <p class="text-muted">No recommendations available at this time.</p>
-                    </div>
-                `;
-            }
+            displayRecommendedCourses(data);
         })
         .catch(error => {
             console.error('Error fetching recommendations:', error);
@@ -785,6 +826,60 @@ function fetchRecommendedCourses() {
         });
 }
 
+// Render course cards into the recommendations section
+function displayRecommendedCourses(data) {
+    const recommendationsContainer = document.getElementById('recommended-courses');
+    
+    if (data && data.length > 0) {
+        recommendationsContainer.innerHTML = data.map(course => `
+            <div class="col-md-4 mb-3">
+                <div class="card h-100">
+                    <div class="card-body">
+                        <h6 class="card-title">${course.name}</h6>
+                        <p class="card-text">
+                            <small class="text-muted">
+                                Domain: ${course.domain}<br>
+                                Difficulty: ${course.difficulty}<br>
+                                Duration: ${course.duration} hours
+                            </small>
+                        </p>
+                        <p class="card-text">${course.description || 'No description available'}</p>
+                        ${course.url ? `<a href="${course.url}" target="_blank" class="btn btn-sm btn-primary mt-2">View Course</a>` : ''}
+                    </div>
+                </div>
+            </div>
+        `).join('');
+    } else {
+        recommendationsContainer.innerHTML = `
+            <div class="col-12 text-center">
+                <p class="text-muted">No recommendations available at this time.</p>
+            </div>
+        `;
+    }
+}
+
+// Whether dashboard changes are pushed to this page (see dashboard_events.js)
+function dashboardIsLive() {
+    return typeof DashboardEvents !== 'undefined' && DashboardEvents.isLive();
+}
+
+// Apply changes pushed by the server instead of re-fetching everything
+function subscribeToDashboardUpdates() {
+    if (typeof DashboardEvents === 'undefined') {
+        return;
+    }
+    DashboardEvents.on('certificate_added', addCertificate);
+    DashboardEvents.on('certificate_removed', removed => removeCertificate(removed.id));
+    DashboardEvents.on('statistics', showStatistics);
+    DashboardEvents.on('recommendations', data => displayRecommendedCourses(data.recommendations));
+    DashboardEvents.on('reset', () => {
+        fetchUserStatistics();
+        fetchCertificates();
+        fetchRecommendedCourses();
+    });
+    DashboardEvents.connect();
+}
+
 // Initialize the page
 document.addEventListener('DOMContentLoaded', function() {
     console.log("DOM loaded, initializing...");
@@ -809,6 +904,7 @@ document.addEventListener('DOMContentLoaded', function() {
             fetchUserStatistics();
             fetchCertificates();
             fetchRecommendedCourses();
+            subscribeToDashboardUpdates();
         } else {
             console.error('User ID not found');
         }
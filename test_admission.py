@@ -0,0 +1,124 @@
+import threading
+
+from flask import Flask
+from flask_login import LoginManager
+
+from admission import AdmissionController, EndpointLimits, TokenBucket
+from test_upload_storage import png_bytes, upload
+
+
+def controller(**limits):
+    app = Flask(__name__)
+    app.config['ADMISSION_LIMITS'] = {'report': limits}
+    LoginManager(app).user_loader(lambda user_id: None)
+    return app, AdmissionController(app)
+
+
+def test_token_bucket_allows_bursts_then_asks_to_wait():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.take('alice') == 0
+    assert bucket.take('alice') == 0
+    assert 0 < bucket.take('alice') <= 1
+    assert bucket.take('bob') == 0
+
+
+def test_busy_rejections_do_not_spend_tokens():
+    _, admission = controller(concurrency=1, rate=0.001, burst=2)
+    assert admission.acquire('report', 'alice') is None
+    assert admission.acquire('report', 'alice')[0] == 503
+    admission.release('report')
+    assert admission.acquire('report', 'alice') is None  # The 503 didn't use up the second token
+    admission.release('report')
+    assert admission.acquire('report', 'alice')[0] == 429
+
+
+def test_rate_rejections_give_back_the_slot():
+    _, admission = controller(concurrency=1, rate=0.001, burst=1)
+    assert admission.acquire('report', 'alice') is None
+    admission.release('report')
+    assert admission.acquire('report', 'alice')[0] == 429
+    assert admission.limits['report'].concurrency.in_flight == 0
+    assert admission.metrics()['report']['rejected_rate_limit'] == 1
+
+
+def test_limited_view_answers_with_retry_after():
+    app, admission = controller(concurrency=1)
+    in_flight = []
+
+    @app.route('/report')
+    @admission.limit('report')
+    def report():
+        in_flight.append(admission.limits['report'].concurrency.in_flight)
+        admission.release_early('report')
+        in_flight.append(admission.limits['report'].concurrency.in_flight)
+        return 'ok'
+
+    assert app.test_client().get('/report').status_code == 200
+    assert in_flight == [1, 0]
+    assert admission.limits['report'].concurrency.in_flight == 0  # Not released twice
+
+    admission.limits['report'].concurrency.try_acquire()
+    response = app.test_client().get('/report')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_admission_metrics_need_the_metrics_token(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scraper-token')
+    client = app.test_client()
+    assert client.get('/api/admission/metrics').status_code == 401
+    response = client.get('/api/admission/metrics', headers={'Authorization': 'Bearer scraper-token'})
+    assert response.status_code == 200
+    assert 'recommendations' in response.get_json()
+
+
+def test_admission_metrics_need_a_login_without_a_token(app, login):
+    response = app.test_client().get('/api/admission/metrics')
+    assert response.status_code == 302 and '/login' in response.headers['Location']
+    assert login().get('/api/admission/metrics').status_code == 200
+
+
+def test_decision_counters_are_exact_under_contention():
+    _, admission = controller(concurrency=1000)
+
+    def admit():
+        for _ in range(500):
+            admission.acquire('report', 'alice')
+            admission.release('report')
+    threads = [threading.Thread(target=admit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admission.metrics()['report']['admitted'] == 4000
+
+
+def test_waiting_for_recommendations_does_not_hold_a_slot(app, login, courses, monkeypatch):
+    import app01
+    monkeypatch.setitem(app01.admission.limits, 'recommendations', EndpointLimits('recommendations', concurrency=1))
+    release = threading.Event()
+    compute = app01.recommendations_for_course
+
+    def slow_recommendations(course_id):
+        release.wait(5)
+        return compute(course_id)
+    monkeypatch.setattr(app01, 'recommendations_for_course', slow_recommendations)
+
+    waiting_client = login('alice')
+    certificate_id = upload(waiting_client, courses[0], png_bytes()).get_json()['certificate_id']
+    responses = []
+    waiter = threading.Thread(target=lambda: responses.append(
+        waiting_client.get(f'/api/certificates/{certificate_id}/recommendations?wait=5')))
+    waiter.start()
+    try:
+        other = login('bob')
+        for _ in range(50):
+            if app01.admission.limits['recommendations'].concurrency.in_flight == 0 and waiter.is_alive():
+                break
+            threading.Event().wait(0.02)
+        assert other.get(f'/api/recommendations/{courses[0]}').status_code == 200
+    finally:
+        release.set()
+        waiter.join()
+    assert responses[0].status_code == 200
+    assert app01.admission.limits['recommendations'].concurrency.in_flight == 0
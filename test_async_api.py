@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def async_api(app):
+    import async_api
+    return async_api
+
+
+@pytest.fixture
+def call(async_api):
+    """Runs ``requests(client)`` against the ASGI app, as the user with the given id (if any)"""
+    def call(requests, user_id=None):
+        cookies = {}
+        if user_id is not None:
+            cookie_name = async_api.flask_app.config['SESSION_COOKIE_NAME']
+            cookies[cookie_name] = async_api.session_serializer.dumps({'_user_id': str(user_id)})
+
+        async def run():
+            await async_api.startup()
+            try:
+                transport = httpx.ASGITransport(app=async_api.app)
+                async with httpx.AsyncClient(transport=transport, base_url='http://test', cookies=cookies) as client:
+                    return await requests(client)
+            finally:
+                await async_api.shutdown()
+        return asyncio.run(run())
+    return call
+
+
+def test_requests_without_a_session_are_rejected(call, courses):
+    async def requests(client):
+        return await client.get('/api/courses')
+    assert call(requests).status_code == 401
+
+
+def test_catalog_matches_the_flask_endpoint(app, call, make_user, courses):
+    user_id = make_user('alice')
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    async def requests(client):
+        return [await client.get('/api/courses'), await client.get('/api/courses?include=description')]
+    summary, described = call(requests, user_id)
+    assert summary.json() == client.get('/api/courses').get_json()
+    assert described.json() == client.get('/api/courses?include=description').get_json()
+    assert all('description' in course for course in described.json())
+
+
+def test_statistics_are_only_served_to_their_owner(call, make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+
+    async def requests(client):
+        return await client.get(f'/api/statistics/{alice}'), await client.get(f'/api/statistics/{bob}')
+    own, other = call(requests, alice)
+    assert own.status_code == 200 and own.json()['total_courses'] == 0
+    assert other.status_code == 403
+
+
+def test_recommendations_carry_an_etag(call, make_user, courses):
+    user_id = make_user('alice')
+
+    async def requests(client):
+        first = await client.get(f'/api/recommendations/{courses[0]}')
+        again = await client.get(f'/api/recommendations/{courses[0]}', headers={'If-None-Match': first.headers['ETag']})
+        missing = await client.get('/api/recommendations/999999')
+        return first, again, missing
+    first, again, missing = call(requests, user_id)
+    assert first.status_code == 200 and first.json()
+    assert again.status_code == 304 and again.headers['ETag'] == first.headers['ETag']
+    assert missing.status_code == 404
+
+
+def test_event_stream_needs_a_shared_store(call, make_user):
+    user_id = make_user('alice')
+
+    async def requests(client):
+        return await client.get('/api/events')
+    assert call(requests, user_id).status_code == 503
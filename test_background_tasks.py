@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+from flask import Flask, current_app
+
+from background_tasks import BackgroundWorker, TaskResults
+from test_upload_storage import png_bytes, upload
+
+
+def test_jobs_run_inside_an_application_context():
+    app = Flask(__name__)
+    app.config['BACKGROUND_WORKERS'] = 1
+    worker = BackgroundWorker(app)
+    try:
+        assert worker.submit(lambda: current_app.name).result(timeout=5) == app.name
+    finally:
+        worker.shutdown()
+
+
+def test_failed_jobs_raise_from_their_future():
+    worker = BackgroundWorker(Flask(__name__))
+
+    def fail():
+        raise RuntimeError('boom')
+    try:
+        with pytest.raises(RuntimeError):
+            worker.submit(fail).result(timeout=5)
+    finally:
+        worker.shutdown()
+
+
+def test_task_results_keep_only_the_newest_entries():
+    results = TaskResults(max_entries=2)
+    futures = [Future() for _ in range(3)]
+    for key, future in enumerate(futures):
+        results.put(key, future)
+    assert results.get(0) is None
+    assert results.get(1) is futures[1]
+    assert results.get(2) is futures[2]
+
+
+def test_recommendations_are_fetched_from_the_follow_up_endpoint(app, login, courses, monkeypatch):
+    import app01
+    client = login()
+    release = threading.Event()
+    compute = app01.recommendations_for_course
+
+    def slow_recommendations(course_id):
+        release.wait(5)
+        return compute(course_id)
+    monkeypatch.setattr(app01, 'recommendations_for_course', slow_recommendations)
+
+    certificate_id = upload(client, courses[0], png_bytes()).get_json()['certificate_id']
+    pending = client.get(f'/api/certificates/{certificate_id}/recommendations')
+    assert pending.status_code == 202
+    assert pending.headers['Retry-After'] == '1'
+
+    release.set()
+    ready = client.get(f'/api/certificates/{certificate_id}/recommendations?wait=5')
+    assert ready.status_code == 200
+    assert ready.get_json()['status'] == 'ready'
+    assert isinstance(ready.get_json()['recommendations'], list)
+
+
+def test_recommendations_of_another_users_certificate_are_refused(app, login, courses):
+    certificate_id = upload(login('alice'), courses[0], png_bytes()).get_json()['certificate_id']
+    response = login('bob').get(f'/api/certificates/{certificate_id}/recommendations')
+    assert response.status_code == 403
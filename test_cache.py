@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from cache import LocalLRU, SqliteStore, TieredCache, MISSING, CATALOG_TAG, shared_store, invalidate_shared, user_tag
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    """A TieredCache per call, like one per worker; ``shared=True`` gives them one shm store"""
+    def make_cache(shared=False, **config):
+        app = Flask(__name__)
+        app.config['CACHE_URL'] = f"shm://{tmp_path / 'cache.sqlite'}" if shared else None
+        app.config.update(config)
+        return TieredCache(app)
+    return make_cache
+
+
+def test_local_lru_evicts_the_least_recently_used():
+    lru = LocalLRU(max_entries=2)
+    lru.set('a', 1, 60)
+    lru.set('b', 2, 60)
+    lru.get('a')
+    lru.set('c', 3, 60)
+    assert lru.get('b') is MISSING
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+
+
+def test_local_lru_entries_expire():
+    lru = LocalLRU()
+    lru.set('a', 1, 0.01)
+    time.sleep(0.02)
+    assert lru.get('a') is MISSING
+
+
+def test_sqlite_store_add_and_incr(tmp_path):
+    store = SqliteStore(str(tmp_path / 'store.sqlite'), prefix='t:')
+    assert store.add('lock', 1, 60) is True
+    assert store.add('lock', 2, 60) is False
+    assert store.get('lock') == 1
+    assert [store.incr('counter') for _ in range(3)] == [1, 2, 3]
+    store.set('short', 'value', 0.01)
+    time.sleep(0.02)
+    assert store.get('short') is None
+    assert store.add('short', 'again', 60) is True
+
+
+def test_shared_store_depends_on_the_url(tmp_path):
+    assert shared_store('') is None
+    assert isinstance(shared_store(f"shm://{tmp_path / 'cache.sqlite'}"), SqliteStore)
+    with pytest.raises(ValueError):
+        shared_store('memcached://localhost')
+
+
+def test_get_or_set_loads_once(make_cache):
+    cache = make_cache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {'courses': 3}
+    assert cache.get_or_set('catalog', load, tags=[CATALOG_TAG]) == {'courses': 3}
+    assert cache.get_or_set('catalog', load, tags=[CATALOG_TAG]) == {'courses': 3}
+    assert len(calls) == 1
+
+
+def test_concurrent_misses_share_one_load(make_cache):
+    cache = make_cache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set('slow', load))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+
+
+def test_invalidating_a_tag_orphans_its_entries(make_cache):
+    cache = make_cache()
+    cache.set('statistics:1', 'old', tags=[user_tag(1)])
+    cache.set('statistics:2', 'kept', tags=[user_tag(2)])
+    cache.invalidate(user_tag(1))
+    assert cache.get('statistics:1', tags=[user_tag(1)]) is None
+    assert cache.get('statistics:2', tags=[user_tag(2)]) == 'kept'
+
+
+def test_workers_share_entries_and_invalidations(make_cache, tmp_path):
+    first, second = make_cache(shared=True), make_cache(shared=True)
+    first.set('catalog', ['course'], tags=[CATALOG_TAG])
+    assert second.get('catalog', tags=[CATALOG_TAG]) == ['course']
+
+    second.invalidate(CATALOG_TAG)
+    assert first.get('catalog', tags=[CATALOG_TAG]) is None
+
+    # Scripts bump tags without a running app
+    first.set('catalog', ['course', 'another'], tags=[CATALOG_TAG])
+    invalidate_shared(CATALOG_TAG, url=f"shm://{tmp_path / 'cache.sqlite'}")
+    assert first.get('catalog', tags=[CATALOG_TAG]) is None
+
+
+def test_shared_only_entries_need_a_shared_tier(make_cache):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+    local_only = make_cache()
+    assert [local_only.get_or_set('statistics:1', load, shared_only=True) for _ in range(2)] == [1, 2]
+
+    shared = make_cache(shared=True)
+    assert [shared.get_or_set('statistics:1', load, shared_only=True) for _ in range(2)] == [3, 3]
+
+
+def test_cached_none_is_a_hit(make_cache):
+    first, second = make_cache(shared=True), make_cache(shared=True)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return None
+    assert first.get_or_set('empty', load) is None
+    assert second.get_or_set('empty', load) is None
+    assert len(calls) == 1
@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+
+from catalog_import import import_catalog, catalog_key_for, detect_format
+
+
+@pytest.fixture
+def run_import(app):
+    import app01
+
+    def run_import(content, file_format='jsonl'):
+        with app.app_context():
+            return import_catalog(app01.db.engine, app01.Course.__table__, io.BytesIO(content), file_format,
+                                  batch_size=2)
+    return run_import
+
+
+def course(name, **fields):
+    return dict({'name': name, 'domain': 'Data Analysis', 'duration': 10, 'difficulty': 'Beginner',
+                 'rating': 4.5, 'students_count': 100}, **fields)
+
+
+def jsonl(*rows):
+    return '\n'.join(json.dumps(row) for row in rows).encode()
+
+
+def test_detect_format_and_keys():
+    assert detect_format('feed.json') == 'json'
+    assert detect_format('feed.ndjson') == 'jsonl'
+    assert catalog_key_for('  SQL Basics ') == 'sql basics'
+
+
+def test_running_a_feed_twice_changes_nothing(run_import):
+    feed = jsonl(course('SQL Basics'), course('Pandas', key='P-1'), course('Statistics', rating=4.0))
+    first = run_import(feed)
+    assert (first.inserted, first.updated, first.unchanged) == (3, 0, 0)
+
+    second = run_import(feed)
+    assert (second.inserted, second.updated, second.unchanged) == (0, 0, 3)
+
+    third = run_import(jsonl(course('Statistics', rating=4.2)))
+    assert (third.inserted, third.updated) == (0, 1)
+
+
+def test_non_finite_and_overflowing_numbers_are_row_errors(run_import):
+    # json.dumps writes NaN and Infinity, which json.loads accepts
+    feed = jsonl(
+        course('Infinite duration', duration='inf'),
+        course('NaN rating', rating=float('nan')),
+        course('Infinite rating', rating=float('inf')),
+        course('Huge students', students_count=1e300),
+        course('Listed price', price=[10]),
+        course('Fine'),
+    )
+    report = run_import(feed)
+    assert report.inserted == 1
+    assert [error['line'] for error in report.errors] == [1, 2, 3, 4, 5]
+
+    # Rejected rows aren't stored, so they can't show up as changed on the next run
+    assert run_import(feed).unchanged == 1
+
+
+def test_undecodable_feed_stops_with_a_file_error(run_import):
+    report = run_import(b'name,domain,duration,difficulty\n\xff\xfe,Data Analysis,10,Beginner\n', 'csv')
+    assert 'UTF-8' in report.file_error
+    assert report.inserted == 0
+
+
+def test_known_difficulty_levels_are_normalized(app, run_import):
+    import app01
+    report = run_import(jsonl(course('SQL Basics', difficulty=' intermediate '), course('Pandas', difficulty='Expert')))
+    assert report.inserted == 2
+    with app.app_context():
+        assert dict(app01.db.session.query(app01.Course.name, app01.Course.difficulty)) == \
+            {'SQL Basics': 'Intermediate', 'Pandas': 'Expert'}
+    assert run_import(jsonl(course('SQL Basics', difficulty='Intermediate'))).unchanged == 1
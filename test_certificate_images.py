@@ -0,0 +1,43 @@
+import os
+
+from test_upload_storage import png_bytes, upload
+
+
+def test_payload_has_checked_urls_but_no_stored_path(app, login, courses):
+    import app01
+    client = login()
+    upload(client, courses[0], png_bytes())
+    with app.app_context():
+        user_id = app01.User.query.filter_by(username='alice').one().id
+
+    [payload] = client.get(f'/api/certificates/{user_id}').get_json()
+    assert 'image_path' not in payload
+    assert payload['image_url'].startswith(f"/certificates/{payload['id']}/image/original/")
+
+    response = client.get(payload['image_url'])
+    assert response.status_code == 200
+    assert response.data == png_bytes()
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_images_are_only_served_to_their_owner(app, login, courses):
+    import app01
+    certificate_id = upload(login('alice'), courses[0], png_bytes()).get_json()['certificate_id']
+    with app.app_context():
+        filename = os.path.basename(app01.UserCertificate.query.get(certificate_id).image_path)
+
+    url = f'/certificates/{certificate_id}/image/original/{filename}'
+    assert login('bob').get(url).status_code == 403
+    assert app.test_client().get(url).status_code == 302  # To the login page
+
+
+def test_static_route_refuses_an_upload_folder_under_static(app, monkeypatch, tmp_path):
+    (tmp_path / 'uploads' / '3f').mkdir(parents=True)
+    (tmp_path / 'uploads' / '3f' / 'certificate.png').write_bytes(png_bytes())
+    (tmp_path / 'site.css').write_text('body {}')
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+
+    client = app.test_client()
+    assert client.get('/static/uploads/3f/certificate.png').status_code == 404
+    assert client.get('/static/site.css').status_code == 200
@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+
+from certificate_import import import_certificates, detect_format
+
+
+@pytest.fixture
+def run_import(app, courses):
+    import app01
+
+    def run_import(content, file_format='jsonl', user_id=None, batch_size=2):
+        with app.app_context():
+            tables = (app01.UserCertificate.__table__, app01.Course.__table__, app01.User.__table__)
+            return import_certificates(app01.db.engine, tables, io.BytesIO(content), file_format,
+                                       user_id=user_id, batch_size=batch_size)
+    return run_import
+
+
+def jsonl(*rows):
+    return '\n'.join(json.dumps(row) for row in rows).encode()
+
+
+def test_detect_format():
+    assert detect_format('certificates.JSONL') == 'jsonl'
+    assert detect_format('certificates.csv') == 'csv'
+    assert detect_format('certificates.txt') == 'csv'
+
+
+def test_csv_rows_resolve_course_names_and_users(run_import, make_user, courses):
+    make_user('alice')
+    content = (b'username,course_name,completion_date,performance_score\n'
+               b'alice,Data Analysis Beginner 0,2024-01-31,88\n'
+               b'nobody,Data Analysis Beginner 0,2024-01-31,88\n'
+               b'alice,No Such Course,2024-01-31,88\n')
+    report = run_import(content, 'csv')
+    assert (report.total, report.inserted, report.failed) == (3, 1, 2)
+    assert sorted(error['line'] for error in report.errors) == [3, 4]
+
+
+def test_malformed_rows_are_reported_without_aborting(run_import, make_user, courses):
+    user_id = make_user('alice')
+    content = jsonl(
+        {'course_id': courses[0], 'completion_date': '2024-02-01'},
+        {'course_id': courses[0], 'completion_date': [1]},
+        {'course_id': courses[0], 'completion_date': 1e20},
+        {'course_id': {'id': 1}},
+        {'course_id': courses[0], 'performance_score': [90]},
+        {'course_id': courses[0], 'performance_score': 101},
+        {'course_id': courses[1], 'completion_date': 1700000000},
+    ) + b'\nnot json\n[1, 2]\n'
+
+    report = run_import(content, user_id=user_id)
+
+    assert report.inserted == 2
+    assert [error['line'] for error in report.errors] == [2, 3, 4, 5, 6, 8, 9]
+    assert report.file_error is None
+
+
+def test_undecodable_file_stops_with_a_file_error(run_import, make_user, courses):
+    user_id = make_user('alice')
+    content = jsonl(*[{'course_id': courses[0]}] * 3) + b'\n{"course_id": "\xff\xfe"}\n'
+
+    report = run_import(content, user_id=user_id, batch_size=1000)
+
+    assert 'UTF-8' in report.file_error
+    assert report.to_dict()['file_error'] == report.file_error
+
+
+def test_bulk_import_endpoint_reports_bad_rows(login, courses):
+    client = login()
+    content = jsonl({'course_id': courses[0]}, {'course_id': courses[0], 'completion_date': [1]})
+    response = client.post('/api/certificates/import', data={'file': (io.BytesIO(content), 'certificates.jsonl')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['inserted'] == 1
+    assert response.get_json()['failed'] == 1
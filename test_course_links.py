@@ -0,0 +1,43 @@
+import io
+
+from course_links import apply_course_urls, load_mapping
+
+
+def urls(app):
+    import app01
+    with app.app_context():
+        return {course.name: course.url for course in app01.Course.query.order_by(app01.Course.id)}
+
+
+def test_load_mapping_from_csv_and_json():
+    assert load_mapping(io.BytesIO(b'name,url\nSQL,https://a.example\n,ignored\n'), 'csv') == {'SQL': 'https://a.example'}
+    assert load_mapping(io.BytesIO(b'{"SQL": "https://a.example"}'), 'json') == {'SQL': 'https://a.example'}
+    assert load_mapping(io.BytesIO(b'[{"name": "SQL", "url": "https://a.example"}]'), 'json') == \
+        {'SQL': 'https://a.example'}
+
+
+def test_only_changed_urls_are_written(app, courses):
+    import app01
+    names = list(urls(app))
+    mapping = {names[0]: 'https://courses.example/0', f' {names[1]} ': 'https://courses.example/1 ',
+               'No such course': 'https://courses.example/x'}
+
+    with app.app_context():
+        report = apply_course_urls(app01.db.engine, mapping)
+    assert (report.staged, report.matched, report.changed, report.unmatched) == (3, 2, 2, 1)
+    assert report.unmatched_names == ['No such course']
+    assert urls(app)[names[1]] == 'https://courses.example/1'
+
+    with app.app_context():
+        again = apply_course_urls(app01.db.engine, mapping)
+    assert (again.matched, again.changed) == (2, 0)
+
+
+def test_empty_urls_clear_the_link(app, courses):
+    import app01
+    names = list(urls(app))
+    with app.app_context():
+        apply_course_urls(app01.db.engine, {names[0]: 'https://courses.example/0'})
+        report = apply_course_urls(app01.db.engine, {names[0]: '', names[1]: None})
+    assert (report.matched, report.changed) == (2, 1)  # The second one had no URL to clear
+    assert urls(app)[names[0]] is None
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from db_backend import engine_options, get_engine, get_async_engine, async_url, ensure_database, has_table
+
+POOL = {'pool_size': 10, 'max_overflow': 20, 'pool_recycle': 3600}
+
+
+def test_engine_options_fit_the_backend():
+    assert engine_options('mysql+pymysql://u:p@localhost/db', POOL) == POOL
+    sqlite = engine_options('sqlite:///app.db', POOL)
+    assert 'pool_size' not in sqlite and 'max_overflow' not in sqlite
+    assert sqlite['pool_recycle'] == 3600
+    assert sqlite['connect_args'] == {'check_same_thread': False}
+
+
+def test_async_url_swaps_the_driver():
+    assert str(async_url('mysql+pymysql://u:p@localhost/db')).startswith('mysql+aiomysql://')
+    assert str(async_url('sqlite:///app.db')) == 'sqlite+aiosqlite:///app.db'
+    with pytest.raises(ValueError):
+        async_url('oracle://localhost/db')
+
+
+def test_sqlite_connections_use_wal(tmp_path):
+    url = f"sqlite:///{tmp_path / 'nested' / 'app.db'}"
+    ensure_database(url)
+    engine = get_engine(url, **POOL)
+    with engine.begin() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        connection.execute(text('CREATE TABLE note (id INTEGER PRIMARY KEY)'))
+    assert has_table(engine, 'note')
+
+
+def test_async_sqlite_connections_use_wal(tmp_path):
+    pytest.importorskip('aiosqlite')
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+
+    async def journal_mode():
+        engine = get_async_engine(url)
+        try:
+            async with engine.connect() as connection:
+                return (await connection.execute(text('PRAGMA journal_mode'))).scalar()
+        finally:
+            await engine.dispose()
+    assert asyncio.run(journal_mode()) == 'wal'
@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+from db_routing import RoutingSQLAlchemy, ReplicaRouter, RYW_SESSION_KEY
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """A small app whose primary and replica databases hold different rows"""
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ('primary', 'replica')}
+    for name, url in urls.items():
+        with create_engine(url).begin() as connection:
+            connection.execute(text("CREATE TABLE note (id INTEGER PRIMARY KEY, source VARCHAR(20))"))
+            connection.execute(text("INSERT INTO note (source) VALUES (:source)"), {'source': name})
+
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI=urls['primary'],
+                      SQLALCHEMY_TRACK_MODIFICATIONS=False, SQLALCHEMY_REPLICA_URLS=[urls['replica']],
+                      READ_YOUR_WRITES_SECONDS=60)
+    db = RoutingSQLAlchemy(app)
+    replicas = ReplicaRouter(app, db)
+
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        source = db.Column(db.String(20))
+
+    def sources():
+        return jsonify([row[0] for row in db.session.execute(text("SELECT source FROM note ORDER BY id"))])
+
+    app.add_url_rule('/notes', 'notes', replicas.read_only(sources))
+    app.add_url_rule('/notes/primary', 'notes_primary', sources)
+
+    @app.route('/notes', methods=['POST'])
+    def add_note():
+        db.session.add(Note(source='written'))
+        db.session.commit()
+        return jsonify(ok=True)
+
+    @app.route('/notes/engine', methods=['POST'])
+    def add_note_on_engine():
+        with db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO note (source) VALUES ('written')"))
+        replicas.note_write()
+        return jsonify(ok=True)
+
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def test_read_only_views_use_the_replica(routed):
+    client = routed.test_client()
+    assert client.get('/notes').get_json() == ['replica']
+    assert client.get('/notes/primary').get_json() == ['primary']
+
+
+@pytest.mark.parametrize('write', ['/notes', '/notes/engine'])
+def test_writers_read_their_writes_from_the_primary(routed, write):
+    writer, other = routed.test_client(), routed.test_client()
+    writer.post(write)
+    with writer.session_transaction() as session:
+        assert RYW_SESSION_KEY in session
+    assert writer.get('/notes').get_json() == ['primary', 'written']
+    assert other.get('/notes').get_json() == ['replica']
+
+
+def test_bulk_import_opens_the_read_your_writes_window(app, login, courses, monkeypatch):
+    import app01
+    monkeypatch.setattr(app01.replicas, 'urls', ['sqlite://'])  # Enabled; no replica is actually read
+    client = login()
+    content = json.dumps({'course_id': courses[0]}).encode()
+    response = client.post('/api/certificates/import', data={'file': (io.BytesIO(content), 'certificates.jsonl')},
+                           content_type='multipart/form-data')
+    assert response.get_json()['inserted'] == 1
+    with client.session_transaction() as session:
+        assert RYW_SESSION_KEY in session
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from cache import SqliteStore
+from events import EventBus, Event, RESET
+
+
+@pytest.fixture
+def bus(tmp_path):
+    bus = EventBus(store=SqliteStore(str(tmp_path / 'events.sqlite')))
+    bus.poll_interval = 3600  # The tests poll by hand
+    return bus
+
+
+def test_nothing_is_published_without_a_store():
+    bus = EventBus()
+    assert not bus.enabled
+    assert bus.publish(1, 'certificate_added', {'id': 3}) is None
+
+
+def test_events_are_numbered_and_replayed_per_user(bus):
+    published = []
+    bus.on_publish = published.append
+    first = bus.publish(1, 'certificate_added', {'id': 3})
+    bus.publish(2, 'certificate_added', {'id': 4})
+    third = bus.publish(1, 'certificate_removed', {'id': 3})
+
+    assert bus.latest() == third == first + 2
+    assert published == ['certificate_added', 'certificate_added', 'certificate_removed']
+    assert bus.replay(1, 0) == [Event(first, 1, 'certificate_added', {'id': 3}),
+                                Event(third, 1, 'certificate_removed', {'id': 3})]
+    assert bus.replay(1, third) == []
+
+
+def test_replay_gives_up_when_events_may_be_missing(bus):
+    for _ in range(3):
+        bus.publish(1, 'statistics', {})
+    assert bus.replay(1, 10) is None  # Ahead of the sequence: the store was flushed
+    bus.replay_limit = 2
+    assert bus.replay(1, 0) is None  # Away too long
+    bus.store.delete('event:3')
+    assert bus.replay(1, 2) is None  # Expired
+
+
+def test_event_encoding():
+    assert Event(7, 1, 'statistics', {'total': 2}).encode() == 'id: 7\nevent: statistics\ndata: {"total":2}\n\n'
+
+
+def test_poll_delivers_new_events_to_subscribers(bus):
+    async def main():
+        loop = asyncio.get_running_loop()
+        bus.publish(1, 'before', {})
+        alice, bob = bus.subscribe(1, loop), bus.subscribe(2, loop)
+        bus.publish(1, 'certificate_added', {'id': 3})
+        bus.publish(2, 'certificate_added', {'id': 4})
+        bus.poll()
+        received = await alice.get(1), await bob.get(1), await alice.get(0.01)
+        bus.unsubscribe(alice)
+        bus.unsubscribe(bob)
+        return received
+    alice_event, bob_event, nothing = asyncio.run(main())
+    assert (alice_event.type, alice_event.data) == ('certificate_added', {'id': 3})
+    assert bob_event.data == {'id': 4}
+    assert nothing is None
+    assert bus.subscriber_count() == 0
+
+
+def test_a_subscriber_that_falls_behind_gets_a_reset(bus):
+    bus.max_queued = 2
+
+    async def main():
+        subscription = bus.subscribe(1, asyncio.get_running_loop())
+        for n in range(3):
+            bus.publish(1, 'statistics', {'n': n})
+        bus.poll()
+        await asyncio.sleep(0)  # Let the deliveries run
+        events = []
+        while (event := await subscription.get(0.01)) is not None:
+            events.append(event)
+        bus.unsubscribe(subscription)
+        return events
+    [reset] = asyncio.run(main())
+    assert reset.type == RESET and reset.id == bus.latest()
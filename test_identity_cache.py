@@ -0,0 +1,84 @@
+from identity_cache import IdentityCache, CachedUser
+
+
+class DictStore:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ttl):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def counting_loader(calls):
+    def loader(user_id):
+        calls.append(user_id)
+        return CachedUser(user_id, f'user{user_id}', f'user{user_id}@example.com') if user_id < 100 else None
+    return loader
+
+
+def test_loads_once_until_invalidated():
+    calls = []
+    cache = IdentityCache(ttl=60)
+    loader = counting_loader(calls)
+
+    assert cache.get_or_load(1, loader).username == 'user1'
+    assert cache.get_or_load(1, loader).username == 'user1'
+    assert calls == [1]
+
+    cache.invalidate(1)
+    cache.get_or_load(1, loader)
+    assert calls == [1, 1]
+
+
+def test_unknown_users_are_not_cached():
+    calls = []
+    cache = IdentityCache()
+    assert cache.get_or_load(404, counting_loader(calls)) is None
+    assert cache.get_or_load(404, counting_loader(calls)) is None
+    assert calls == [404, 404]
+
+
+def test_entries_expire_and_are_bounded():
+    calls = []
+    loader = counting_loader(calls)
+    expired = IdentityCache(ttl=0)
+    expired.get_or_load(1, loader)
+    expired.get_or_load(1, loader)
+    assert calls == [1, 1]
+
+    bounded = IdentityCache(max_entries=2)
+    for user_id in (1, 2, 3):
+        bounded.get_or_load(user_id, loader)
+    assert bounded.peek(1) is None
+    assert bounded.peek(3) is not None
+    assert bounded.stats()['size'] == 2
+
+
+def test_workers_share_lookups_through_the_shared_store():
+    calls = []
+    store = DictStore()
+    first, second = IdentityCache(shared=store), IdentityCache(shared=store)
+    first.get_or_load(7, counting_loader(calls))
+    assert second.get_or_load(7, counting_loader(calls)) == CachedUser(7, 'user7', 'user7@example.com')
+    assert calls == [7]
+
+    second.invalidate(7)
+    assert store.values == {}
+
+
+def test_renaming_a_user_drops_the_cached_identity(app, login):
+    import app01
+    client = login('alice')
+    assert client.get('/dashboard').status_code == 200
+    with app.app_context():
+        user = app01.User.query.filter_by(username='alice').one()
+        assert app01.identity_cache.peek(user.id) is not None
+        user.username = 'alicia'
+        app01.db.session.commit()
+        assert app01.identity_cache.peek(user.id) is None
@@ -0,0 +1,74 @@
+import os
+
+from PIL import Image
+
+from image_pipeline import build_variants, THUMBNAIL_SIZES
+from upload_storage import stored_path
+from test_upload_storage import png_bytes, upload
+
+
+def test_build_variants_never_upscales(tmp_path):
+    source = tmp_path / 'certificate.png'
+    Image.new('RGB', (800, 200), 'white').save(source)
+
+    variants = build_variants(str(source), str(tmp_path), 'ab' * 32)
+
+    assert set(variants) == set(THUMBNAIL_SIZES)
+    with Image.open(stored_path(str(tmp_path), variants['sm'])) as small:
+        assert small.size == (160, 40)
+    with Image.open(stored_path(str(tmp_path), variants['lg'])) as large:
+        assert large.size == (800, 200)
+
+
+def test_build_variants_skips_unreadable_files(tmp_path):
+    source = tmp_path / 'certificate.png'
+    source.write_bytes(b'not an image')
+    assert build_variants(str(source), str(tmp_path), 'cd' * 32) == {}
+
+
+def blob_for(app, certificate_id):
+    import app01
+    with app.app_context():
+        image_path = app01.UserCertificate.query.get(certificate_id).image_path
+        return app01.UploadBlob.query.filter_by(path=app01.upload_relative_path(image_path)).first()
+
+
+def test_thumbnails_are_recorded_and_removed_with_the_upload(app, login, courses):
+    import app01
+    client = login()
+    certificate_id = upload(client, courses[0], png_bytes(size=(600, 400))).get_json()['certificate_id']
+    app01.background.shutdown(wait=True)
+
+    variants = blob_for(app, certificate_id).variant_paths()
+    assert set(variants) == set(THUMBNAIL_SIZES)
+    paths = [stored_path(app.config['UPLOAD_FOLDER'], path) for path in variants.values()]
+    assert all(os.path.exists(path) for path in paths)
+
+    assert client.delete(f'/api/certificates/{certificate_id}').status_code == 200
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_thumbnails_of_an_upload_deleted_meanwhile_are_discarded(app, login, courses, monkeypatch):
+    import app01
+    client = login()
+    certificate_id = upload(client, courses[0], png_bytes('purple')).get_json()['certificate_id']
+    app01.background.shutdown(wait=True)
+    digest = blob_for(app, certificate_id).digest
+    with app.app_context():
+        app01.UploadBlob.query.filter_by(digest=digest).update({app01.UploadBlob.variants: None})
+        app01.db.session.commit()
+
+    written = {}
+
+    def build_then_delete(source, upload_folder, digest):
+        # The last reference goes away while the job is writing thumbnails
+        written.update(build_variants(source, upload_folder, digest))
+        assert client.delete(f'/api/certificates/{certificate_id}').status_code == 200
+        return written
+    monkeypatch.setattr(app01, 'build_variants', build_then_delete)
+
+    with app.app_context():
+        app01.process_certificate_image(digest)
+
+    assert written
+    assert not any(os.path.exists(stored_path(app.config['UPLOAD_FOLDER'], path)) for path in written.values())
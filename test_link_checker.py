@@ -0,0 +1,91 @@
+import asyncio
+
+from aiohttp import web
+
+from link_checker import check_links, check_course_links
+
+
+def serve(test):
+    """Run ``test(base_url)`` against a local stand-in for course providers"""
+    async def ok(request):
+        return web.Response(text='ok')
+
+    async def no_head(request):
+        return web.Response(status=405 if request.method == 'HEAD' else 200)
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    async def moved(request):
+        raise web.HTTPFound('/ok')
+
+    async def slow(request):
+        await asyncio.sleep(2)
+        return web.Response(text='late')
+
+    async def main():
+        app = web.Application()
+        for path, handler in [('/ok', ok), ('/no-head', no_head), ('/missing', missing), ('/moved', moved),
+                              ('/slow', slow)]:
+            app.router.add_route('*', path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await test(f'http://127.0.0.1:{port}')
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def check(urls, **options):
+    options.setdefault('host_delay', 0)
+    return serve(lambda base: check_links([url.format(base=base) for url in urls], **options))
+
+
+def by_path(results):
+    return {result.url.rsplit('/', 1)[-1]: result for result in results}
+
+
+def test_statuses_redirects_and_head_fallback():
+    results = by_path(check(['{base}/ok', '{base}/no-head', '{base}/missing', '{base}/moved']))
+    assert results['ok'].ok and results['ok'].status_code == 200
+    assert results['no-head'].ok  # Answered by the GET fallback
+    assert not results['missing'].ok and results['missing'].status_code == 404
+    assert results['moved'].final_url.endswith('/ok')
+
+
+def test_malformed_urls_fail_without_stopping_the_run():
+    results = {result.url: result for result in check(['{base}/ok', 'http://[bad/x', 'not a url', '{base}/slow'],
+                                                       timeout=0.5)}
+    assert results['http://[bad/x'].error.startswith('ValueError')
+    assert results['not a url'].error == 'Invalid URL'
+    assert not any(result.ok for url, result in results.items() if not url.endswith('/ok'))
+    assert any(result.ok for url, result in results.items() if url.endswith('/ok'))
+    assert [result.error for url, result in results.items() if url.endswith('/slow')] == ['Timed out']
+
+
+def test_course_link_results_are_saved(app, courses):
+    import app01
+    with app.app_context():
+        course_list = app01.Course.query.order_by(app01.Course.id).limit(3).all()
+        paths = ['/ok', '/missing', '/gone']
+        for course, path in zip(course_list, paths):
+            course.url = f'PLACEHOLDER{path}'
+        app01.db.session.commit()
+
+    async def run(base):
+        with app.app_context():
+            app01.Course.query.filter(app01.Course.url.like('PLACEHOLDER%')).update(
+                {app01.Course.url: app01.db.func.replace(app01.Course.url, 'PLACEHOLDER', base)},
+                synchronize_session=False)
+            app01.db.session.commit()
+            engine = app01.db.engine
+        return await check_course_links(engine, app01.Course.__table__, app01.CourseLinkCheck.__table__, host_delay=0)
+
+    assert len(serve(run)) == 3
+    with app.app_context():
+        saved = {check.url.rsplit('/', 1)[-1]: check.ok for check in app01.CourseLinkCheck.query}
+    assert saved == {'ok': True, 'missing': False, 'gone': False}
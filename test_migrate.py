@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine, event, text
+
+import migrate
+from migrate import MigrationOps
+
+
+def legacy_engine(tmp_path):
+    """A database in the schema of the first release"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE course (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, domain VARCHAR(50) NOT NULL, "
+            "duration INTEGER NOT NULL, difficulty VARCHAR(20) NOT NULL, prerequisites VARCHAR(200), "
+            "created_at DATETIME)"))
+        connection.execute(text(
+            "INSERT INTO course (id, name, domain, duration, difficulty, created_at) VALUES "
+            "(:id, :name, 'Data Analysis', 10, 'Beginner', '2024-01-01 00:00:00')"),
+            [{'id': i, 'name': name} for i, name in enumerate(
+                ['SQL Basics', 'Pandas', ' sql basics ', 'Statistics', 'SQL Basics', 'Pandas', 'Excel'], start=1)])
+    return engine
+
+
+def test_backfill_updates_in_batches_and_only_pending_rows(tmp_path, capsys):
+    engine = legacy_engine(tmp_path)
+    ops = MigrationOps(engine, batch_size=2, pause=0)
+    ops.add_column('course', 'rating', 'FLOAT')
+    assert ops.backfill('course', 'rating = id', 'rating IS NULL AND id > 2') == 5
+    assert ops.backfill('course', 'rating = id', 'rating IS NULL AND id > 2') == 0
+    assert 'backfilled 5 rows' in capsys.readouterr().out
+
+
+def test_upgrade_applies_every_migration_once(tmp_path):
+    engine = legacy_engine(tmp_path)
+    assert migrate.upgrade(engine, batch_size=2, pause=0) == len(migrate.discover_migrations())
+    assert migrate.upgrade(engine, batch_size=2, pause=0) == 0
+
+    with engine.connect() as connection:
+        keys = dict(connection.execute(text("SELECT id, catalog_key FROM course ORDER BY id")).all())
+        last_updated = connection.execute(text("SELECT COUNT(*) FROM course WHERE last_updated IS NULL")).scalar()
+    # The oldest of each duplicate keeps the plain key; copies get their id appended
+    assert keys == {1: 'sql basics', 2: 'pandas', 3: 'sql basics#3', 4: 'statistics', 5: 'sql basics#5',
+                    6: 'pandas#6', 7: 'excel'}
+    assert last_updated == 0
+    assert MigrationOps(engine).has_index('course', 'uq_course_catalog_key')
+
+
+def test_duplicates_are_found_once_not_per_batch(tmp_path):
+    engine = legacy_engine(tmp_path)
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    migrate.upgrade(engine, batch_size=1, pause=0)
+
+    assert sum('GROUP BY catalog_key' in statement for statement in statements) == 1
+    assert not MigrationOps(engine).has_table('course_catalog_key_copies')
+
+
+def test_difficulty_levels_are_normalized(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE course SET difficulty = 'ADVANCED ' WHERE id = 2"))
+        connection.execute(text("UPDATE course SET difficulty = 'Mixed' WHERE id = 3"))
+    migrate.upgrade(engine, batch_size=2, pause=0)
+    with engine.connect() as connection:
+        difficulties = dict(connection.execute(text("SELECT id, difficulty FROM course")).all())
+    assert difficulties[1] == 'Beginner' and difficulties[2] == 'Advanced' and difficulties[3] == 'Mixed'
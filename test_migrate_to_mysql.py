@@ -0,0 +1,40 @@
+import sqlite3
+from datetime import datetime
+
+from migrate_to_mysql import Checkpoint, TablePlan, to_datetime, normalize, table_checksum
+
+
+def course_plan():
+    return TablePlan('course', 'id', ['id', 'name', 'rating', 'created_at'], {'created_at'}, {'rating'})
+
+
+def test_checkpoint_survives_restarts_unless_asked_not_to(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = Checkpoint(path)
+    assert checkpoint.get('course') == {'last_key': None, 'rows': 0, 'done': False}
+    checkpoint.save('course', last_key=5000, rows=5000)
+
+    assert Checkpoint(path).get('course') == {'last_key': 5000, 'rows': 5000, 'done': False}
+    assert Checkpoint(path, restart=True).get('course')['last_key'] is None
+
+
+def test_datetimes_are_truncated_to_what_mysql_stores():
+    assert to_datetime('2024-01-31 10:20:30.999999') == datetime(2024, 1, 31, 10, 20, 30)
+    assert to_datetime('2024-01-31T10:20:30Z') == datetime(2024, 1, 31, 10, 20, 30)
+    row = {'id': 1, 'name': 'SQL', 'rating': 4.5, 'created_at': '2024-01-31 10:20:30.5'}
+    assert course_plan().convert(row) == (1, 'SQL', 4.5, datetime(2024, 1, 31, 10, 20, 30))
+
+
+def test_checksums_agree_across_representations():
+    plan = course_plan()
+    sqlite = sqlite3.connect(':memory:')
+    sqlite.execute("CREATE TABLE course (id INTEGER PRIMARY KEY, name TEXT, rating REAL, created_at DATETIME)")
+    sqlite.execute("INSERT INTO course VALUES (1, 'SQL', 4.1000000001, '2024-01-31 10:20:30.250')")
+    # What MySQL hands back for the same row: single-precision float, whole-second datetime
+    mysql = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+    mysql.execute("CREATE TABLE course (id INTEGER PRIMARY KEY, name TEXT, rating REAL, created_at timestamp)")
+    mysql.execute("INSERT INTO course VALUES (1, 'SQL', ?, ?)", (4.099999904632568, datetime(2024, 1, 31, 10, 20, 30)))
+
+    sql = 'SELECT id, name, rating, created_at FROM course ORDER BY id'
+    assert table_checksum(plan, sqlite.cursor(), sql, 100) == table_checksum(plan, mysql.cursor(), sql, 100)
+    assert normalize(plan, 'name', None) is None
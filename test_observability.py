@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+
+import pytest
+from flask import Flask
+
+from observability import Observability, JsonFormatter, SamplingFilter, configure_logging, span
+
+
+@pytest.fixture
+def make_client():
+    def make_client(**config):
+        app = Flask(__name__)
+        app.config.update(config)
+        observability = Observability(app)
+
+        @app.route('/hello')
+        def hello():
+            return 'hello'
+
+        @app.route('/admin/stats')
+        @observability.protected()
+        def admin_stats():
+            return 'stats'
+        return app.test_client()
+    return make_client
+
+
+def test_responses_carry_the_request_id(make_client):
+    client = make_client()
+    generated = client.get('/hello').headers['X-Request-ID']
+    assert len(generated) == 32
+    assert client.get('/hello').headers['X-Request-ID'] != generated
+    assert client.get('/hello', headers={'X-Request-ID': 'abc123'}).headers['X-Request-ID'] == 'abc123'
+
+
+def test_metrics_report_request_latency(make_client):
+    client = make_client()
+    client.get('/hello')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{endpoint="hello",method="GET",status="200"}' in response.get_data(as_text=True)
+
+
+def test_metrics_require_the_token_when_one_is_set(make_client):
+    client = make_client(METRICS_TOKEN='s3cret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+    assert client.get('/admin/stats').status_code == 401
+    assert client.get('/admin/stats', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+
+def test_protected_views_are_refused_without_a_token(make_client):
+    assert make_client().get('/admin/stats').status_code == 401
+
+
+def test_metrics_can_be_disabled(make_client):
+    client = make_client(METRICS_ENABLED=False)
+    assert client.get('/metrics').status_code == 404
+    assert 'X-Request-ID' in client.get('/hello').headers
+
+
+def test_json_records_include_extra_fields():
+    record = logging.LogRecord('certificates', logging.INFO, __file__, 1, 'imported %d rows', (3,), None)
+    record.user_id = 7
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['msg'] == 'imported 3 rows'
+    assert entry['level'] == 'INFO' and entry['user_id'] == 7
+
+
+def test_sampling_keeps_every_warning():
+    sampler = SamplingFilter(0.0)
+    assert not sampler.filter(logging.LogRecord('x', logging.INFO, __file__, 1, 'info', (), None))
+    assert sampler.filter(logging.LogRecord('x', logging.WARNING, __file__, 1, 'warning', (), None))
+
+
+def test_log_records_are_written_by_the_background_handler():
+    stream = io.StringIO()
+    handler = configure_logging('DEBUG', 'json', stream=stream)
+    try:
+        with span('import', rows=3):
+            pass
+        handler.close()  # Drains the queue
+        entry = json.loads(stream.getvalue().splitlines()[-1])
+        assert entry['msg'] == 'span finished'
+        assert entry['span'] == 'import' and entry['rows'] == 3
+    finally:
+        configure_logging('WARNING', 'json')
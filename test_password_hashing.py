@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from conftest import TEST_PASSWORD
+from password_hashing import PasswordHasher, HashingBusy, normalize_method
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+    pwhash = hasher.hash('secret')
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(pwhash, 'secret')
+    assert not hasher.verify(pwhash, 'wrong')
+
+
+def test_needs_rehash_when_parameters_change():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', salt_length=16)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:2000', 16))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000', 8))
+    assert hasher.needs_rehash('not a hash')
+
+
+def test_implicit_iterations_are_spelled_out():
+    assert normalize_method('pbkdf2:sha256') == normalize_method(normalize_method('pbkdf2:sha256'))
+    assert normalize_method('pbkdf2:sha256').count(':') == 2
+
+
+def occupy(hasher):
+    """Fill the hasher's only slot until the returned release function is called"""
+    release, started = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+    worker = threading.Thread(target=hasher._run, args=(block,))
+    worker.start()
+    started.wait(5)
+
+    def done():
+        release.set()
+        worker.join()
+    return done
+
+
+def test_full_queue_fails_fast():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', max_workers=1, max_pending=0)
+    done = occupy(hasher)
+    try:
+        started = time.monotonic()
+        with pytest.raises(HashingBusy):
+            hasher.hash('secret')
+        assert time.monotonic() - started < 0.5
+    finally:
+        done()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+
+def test_queue_timeout_waits_for_room():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_QUEUE_TIMEOUT=5)
+    hasher = PasswordHasher(app, method='pbkdf2:sha256:1000')
+    assert hasher.queue_timeout == 5
+    done = occupy(hasher)
+    threading.Timer(0.05, done).start()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+
+def test_login_upgrades_outdated_hashes(app, make_user):
+    import app01
+    make_user('alice')
+    with app.app_context():
+        user = app01.User.query.filter_by(username='alice').one()
+        user.password_hash = generate_password_hash(TEST_PASSWORD, 'pbkdf2:sha256:500', 16)
+        app01.db.session.commit()
+
+    response = app.test_client().post('/login', data={'username': 'alice', 'password': TEST_PASSWORD})
+    assert response.status_code == 302
+
+    with app.app_context():
+        user = app01.User.query.filter_by(username='alice').one()
+        assert not user.password_needs_rehash()
+        assert user.check_password(TEST_PASSWORD)
@@ -0,0 +1,63 @@
+from read_models import popularity_score
+
+
+def test_popularity_score_formula():
+    assert popularity_score(4.0, 100000) == 4.0 * 0.7 + 0.3
+    assert popularity_score(None, None) == 0
+
+
+def test_stored_score_follows_rating_and_students(app, courses):
+    import app01
+    with app.app_context():
+        course = app01.Course.query.get(courses[0])
+        assert course.popularity_score == popularity_score(course.rating, course.students_count)
+        course.students_count = 900000
+        app01.db.session.commit()
+        assert app01.Course.query.get(courses[0]).popularity_score == popularity_score(course.rating, 900000)
+
+
+def test_top_courses_rank_by_score_and_skip_completed(app, make_user, courses):
+    import app01
+    user_id = make_user('alice')
+    with app.app_context():
+        machine_learning = app01.Course.domain == 'Machine Learning'
+        ranked = app01.top_courses(10, machine_learning)
+        scores = [popularity_score(record.rating, record.students_count) for record in ranked]
+        assert len(ranked) == 6 and scores == sorted(scores, reverse=True)
+
+        app01.db.session.add(app01.UserCertificate(user_id=user_id, course_id=ranked[0].id))
+        app01.db.session.commit()
+        assert [record.id for record in app01.top_courses(10, machine_learning, user_id=user_id)] == \
+            [record.id for record in ranked[1:]]
+
+
+def test_recommendations_follow_the_difficulty_ladder(app, make_user, courses):
+    import app01
+    user_id = make_user('alice')
+    with app.app_context():
+        picks = app01.get_course_recommendations({'domain': 'Data Analysis', 'difficulty': 'Beginner',
+                                                  'user_id': user_id})
+        assert [(pick['domain'] == 'Data Analysis', pick['difficulty']) for pick in picks] == \
+            [(True, 'Intermediate'), (False, 'Beginner')]
+        # Seeded per user and period: asking again gives the same picks
+        assert app01.get_course_recommendations({'domain': 'Data Analysis', 'difficulty': 'Beginner',
+                                                 'user_id': user_id}) == picks
+
+
+def test_mixed_case_difficulty_stays_in_its_bucket(app, courses):
+    import app01
+    with app.app_context():
+        app01.db.session.add_all([
+            app01.Course(name='Deep Learning Next', domain='Machine Learning', duration=20, difficulty='ADVANCED',
+                         rating=5.0, students_count=10**6),
+            app01.Course(name='Custom Level', domain='Machine Learning', duration=5, difficulty='All levels'),
+        ])
+        app01.db.session.commit()
+        difficulties = dict(app01.db.session.query(app01.Course.name, app01.Course.difficulty))
+        assert difficulties['Deep Learning Next'] == 'Advanced'
+        assert difficulties['Custom Level'] == 'All levels'  # Unknown levels are kept as given
+
+        picks = app01.get_course_recommendations({'domain': 'Machine Learning', 'difficulty': 'intermediate'}, 0)
+        advanced = app01.top_courses(1, app01.Course.domain == 'Machine Learning', app01.Course.difficulty == 'Advanced')
+        assert advanced[0].name == 'Deep Learning Next'
+        assert picks[1]['difficulty'] == 'Advanced'
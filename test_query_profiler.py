@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from query_profiler import fingerprint, query_budget, QueryBudgetExceeded
+from test_upload_storage import png_bytes, upload
+
+
+def test_fingerprint_ignores_literal_values():
+    assert fingerprint("SELECT * FROM course WHERE id = 5 AND name = 'x'") == \
+        fingerprint("SELECT *  FROM course WHERE id = 7 AND name = 'it''s'")
+    assert fingerprint("SELECT * FROM course WHERE id IN (?, ?, ?)") == "SELECT * FROM course WHERE id IN (?)"
+    assert fingerprint("SELECT * FROM course WHERE id = :id_1") == "SELECT * FROM course WHERE id = ?"
+
+
+def test_query_budget_reports_repeated_statements():
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        with query_budget(max_queries=3) as stats:
+            connection.execute(text('SELECT 1'))
+        assert stats.count == 1
+
+        with pytest.raises(QueryBudgetExceeded, match='possible N'):
+            with query_budget(n_plus_one_threshold=3):
+                for course_id in range(3):
+                    connection.execute(text('SELECT :id'), {'id': course_id})
+
+        with pytest.raises(QueryBudgetExceeded, match='exceeds budget of 1'):
+            with query_budget(max_queries=1):
+                connection.execute(text('SELECT 1'))
+                connection.execute(text('SELECT 2'))
+
+
+def test_certificate_list_has_no_n_plus_one(app, login, courses):
+    import app01
+    client = login()
+    for course_id in courses[:6]:
+        upload(client, course_id, png_bytes(size=(40 + course_id, 40)))
+    with app.app_context():
+        user_id = app01.User.query.filter_by(username='alice').one().id
+    app01.background.shutdown(wait=True)
+
+    with query_budget(max_queries=6, n_plus_one_threshold=3):
+        response = client.get(f'/api/certificates/{user_id}')
+    assert len(response.get_json()) == 6
+
+
+def test_strict_profiler_fails_requests_over_budget(app, login, monkeypatch):
+    import app01
+    client = login()
+    monkeypatch.setitem(app.config, 'SQL_PROFILER_ENABLED', True)
+    monkeypatch.setitem(app.config, 'SQL_QUERY_BUDGETS', {'dashboard': 0})
+    app01.identity_cache.clear()  # So loading the user takes a query
+    response = client.get('/dashboard')
+    assert response.headers['X-Query-Count'] == '1'
+
+    monkeypatch.setitem(app.config, 'SQL_PROFILER_STRICT', True)
+    app01.identity_cache.clear()
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/dashboard')
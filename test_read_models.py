@@ -0,0 +1,52 @@
+from sqlalchemy import MetaData, Table, create_engine, event, text
+from sqlalchemy.orm import Session
+
+from read_models import (CourseRecord, SUMMARY_FIELDS, PAYLOAD_FIELDS, load_courses, with_descriptions, record_rows,
+                         to_records, serialize_course)
+from query_profiler import query_budget
+
+
+def test_records_round_trip_through_plain_rows():
+    record = CourseRecord(tuple(range(len(SUMMARY_FIELDS))))
+    assert record.description is None
+    assert to_records(record_rows([record]))[0].name == record.name
+    assert list(serialize_course(record)) == list(PAYLOAD_FIELDS)
+    assert 'description' not in serialize_course(record, include_description=False)
+
+
+def test_summary_queries_leave_descriptions_out():
+    engine = create_engine('sqlite://')
+    statements = []
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE course (id INTEGER PRIMARY KEY, name TEXT, domain TEXT, duration INT, "
+                                "difficulty TEXT, prerequisites TEXT, instructor TEXT, rating REAL, "
+                                "students_count INT, url TEXT, description TEXT)"))
+        course_table = Table('course', MetaData(), autoload_with=connection)
+        event.listen(connection, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        load_courses(Session(bind=connection), course_table)
+    assert 'description' not in statements[0]
+
+
+def test_descriptions_are_fetched_in_one_query_for_the_records_kept(app, courses):
+    import app01
+    course_table = app01.Course.__table__
+    with app.app_context():
+        records = load_courses(app01.db.session, course_table, course_table.c.domain == 'Machine Learning')
+        assert len(records) == 6
+
+        kept = records[:2]
+        with query_budget(max_queries=1):
+            with_descriptions(app01.db.session, course_table, kept)
+        assert all(record.description.startswith('A ') for record in kept)
+        assert records[2].description is None
+
+
+def test_course_list_includes_descriptions_only_on_request(login, courses):
+    client = login()
+    summaries = client.get('/api/courses').get_json()
+    assert len(summaries) == len(courses)
+    assert 'description' not in summaries[0]
+
+    full = client.get('/api/courses?include=description').get_json()
+    assert set(full[0]) == set(PAYLOAD_FIELDS)
+    assert all(course['description'] for course in full)
@@ -0,0 +1,81 @@
+import pytest
+
+import app01
+from app01 import recommendation_rng, recommendation_period, get_course_recommendations
+
+
+@pytest.fixture
+def course_names(app, courses):
+    with app.app_context():
+        return {course.id: course.name for course in app01.Course.query.all()}
+
+
+def picks(app, user_data, period):
+    with app.app_context():
+        return [course['name'] for course in get_course_recommendations(user_data, period)]
+
+
+def draw(*seed):
+    return [recommendation_rng(*seed).random() for _ in range(3)]
+
+
+def test_rng_is_seeded_by_user_period_and_bucket():
+    assert draw(1, 100, 'default') == draw(1, 100, 'default')
+    assert draw(1, 100, 'default') != draw(2, 100, 'default')
+    assert draw(1, 100, 'default') != draw(1, 101, 'default')
+    assert draw(1, 100, 'default') != draw(1, 100, 'Machine Learning/beginner/0')
+
+
+def test_period_follows_the_rotation_setting(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RECOMMENDATION_ROTATION_SECONDS', 60)
+    monkeypatch.setattr(app01.time, 'time', lambda: 6000 + 45)
+    with app.app_context():
+        assert recommendation_period() == (100, 15)
+
+
+def test_picks_follow_the_completed_course(app, courses):
+    names = picks(app, {'domain': 'Machine Learning', 'difficulty': 'Intermediate'}, period=1)
+    assert len(names) == 2
+    assert names[0].startswith('Machine Learning Intermediate')
+    assert names[1].startswith('Machine Learning Advanced')
+
+
+def test_picks_are_stable_within_a_period_and_rotate_across_periods(app, courses):
+    user_data = {'domain': 'Data Analysis', 'difficulty': 'Beginner', 'user_id': 1}
+    assert picks(app, user_data, period=5) == picks(app, user_data, period=5)
+    assert len({tuple(picks(app, user_data, period)) for period in range(20)}) > 1
+
+
+def test_completed_courses_are_not_recommended(app, courses, make_user, course_names):
+    user_id = make_user('alice')
+    completed = [course_id for course_id, name in course_names.items() if name.startswith('Data Analysis Intermediate')]
+    with app.app_context():
+        app01.db.session.add_all([app01.UserCertificate(user_id=user_id, course_id=course_id, performance_score=90)
+                                  for course_id in completed])
+        app01.db.session.commit()
+
+    user_data = {'domain': 'Data Analysis', 'difficulty': 'Beginner', 'user_id': user_id}
+    for period in range(10):
+        assert not any(name.startswith('Data Analysis Intermediate') for name in picks(app, user_data, period))
+
+
+def test_unchanged_recommendations_are_not_sent_again(login, courses):
+    client = login()
+    first = client.get(f'/api/recommendations/{courses[0]}')
+    assert first.status_code == 200 and first.get_json()
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    again = client.get(f'/api/recommendations/{courses[0]}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and not again.data
+    stale = client.get(f'/api/recommendations/{courses[0]}', headers={'If-None-Match': '"stale"'})
+    assert stale.status_code == 200
+
+    # Only reads are answered with 304
+    posted = client.post('/api/recommendations', json={'domain': 'Machine Learning', 'difficulty': 'Beginner'},
+                         headers={'If-None-Match': first.headers['ETag']})
+    assert posted.status_code == 200
+
+
+def test_etag_does_not_depend_on_key_order():
+    assert app01.payload_etag({'a': 1, 'b': [2]}) == app01.payload_etag({'b': [2], 'a': 1})
+    assert app01.payload_etag({'a': 1}) != app01.payload_etag({'a': 2})
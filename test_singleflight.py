@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cache import SqliteStore
+from singleflight import SingleFlight, AsyncSingleFlight, MISSING, wait_for_result
+
+
+def run_concurrently(calls):
+    results = [None] * len(calls)
+
+    def run(index, call):
+        try:
+            results[index] = call()
+        except Exception as e:
+            results[index] = e
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_callers_share_one_call():
+    roles = []
+    flights = SingleFlight(on_call=lambda prefix, role: roles.append((prefix, role)))
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return ['report']
+    threads, results = run_concurrently([lambda: flights.do('report:1', compute)] * 3)
+    while flights.in_flight() == 0 or len(roles) < 3:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [['report']] * 3
+    assert len(calls) == 1
+    assert sorted(roles) == [('report', 'leader'), ('report', 'waiter'), ('report', 'waiter')]
+    assert flights.in_flight() == 0
+    assert flights.do('report:1', lambda: 'fresh') == 'fresh'  # Nothing is kept afterwards
+
+
+def test_waiters_get_the_exception():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise LookupError('course is gone')
+    threads, results = run_concurrently([lambda: flights.do('key', fail)] * 2)
+    while flights.in_flight() == 0:
+        time.sleep(0.005)
+    time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+def test_workers_share_a_result_through_the_store(tmp_path):
+    path = str(tmp_path / 'store.sqlite')
+    roles = []
+
+    def record(prefix, role):
+        roles.append(role)
+    leader = SingleFlight(store=SqliteStore(path), on_call=record)
+    other_worker = SingleFlight(store=SqliteStore(path), on_call=record)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'id': 7}
+    leading, leader_results = run_concurrently([lambda: leader.do('recommendations:7', compute, shared=True)])
+    started.wait(5)
+    waiting, waiter_results = run_concurrently([lambda: other_worker.do('recommendations:7', compute, shared=True)])
+    time.sleep(0.05)
+    release.set()
+    for thread in leading + waiting:
+        thread.join()
+
+    assert leader_results == waiter_results == [{'id': 7}]
+    assert len(calls) == 1
+    assert sorted(roles) == ['leader', 'shared_waiter']
+
+
+def test_wait_for_result_stops_when_the_lock_is_released():
+    started = time.monotonic()
+    assert wait_for_result(lambda: MISSING, lambda: False, timeout=5) is MISSING
+    assert time.monotonic() - started < 1
+    assert wait_for_result(lambda: 'done', lambda: True, timeout=5) == 'done'
+
+
+def test_async_callers_share_one_task():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    async def main():
+        return await asyncio.gather(*(flights.do('key', compute) for _ in range(3)))
+    assert asyncio.run(main()) == ['value'] * 3
+    assert len(calls) == 1 and flights.in_flight() == 0
+
+
+def test_cancelled_async_caller_does_not_cancel_the_others():
+    flights = AsyncSingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return 'value'
+
+    async def main():
+        first = asyncio.ensure_future(flights.do('key', compute))
+        second = asyncio.ensure_future(flights.do('key', compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    assert asyncio.run(main()) == 'value'
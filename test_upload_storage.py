@@ -0,0 +1,123 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import upload_storage
+from upload_storage import (spool_upload, store_spooled, stage_removal, finish_removal, undo_removal, shard_path,
+                            stored_path, REMOVED_SUFFIX)
+
+
+def png_bytes(color='red', size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_shard_path_splits_digest_into_two_levels():
+    digest = '3fa2' + '0' * 60
+    assert shard_path(digest, '.png') == f'3f/a2/{digest}.png'
+
+
+def test_spool_upload_hashes_while_writing(tmp_path):
+    temp_path, digest, size = spool_upload(io.BytesIO(b'certificate'), str(tmp_path))
+    assert open(temp_path, 'rb').read() == b'certificate'
+    assert digest == upload_storage.hash_file(temp_path)
+    assert size == len(b'certificate')
+
+
+def test_store_spooled_writes_missing_file_only(tmp_path):
+    folder = str(tmp_path)
+    temp_path, digest, _ = spool_upload(io.BytesIO(b'first'), folder)
+    relative_path = shard_path(digest, '.png')
+
+    assert store_spooled(temp_path, folder, relative_path) is True
+    assert open(stored_path(folder, relative_path), 'rb').read() == b'first'
+    assert os.path.exists(temp_path)  # Left for the caller to discard after the commit
+    assert store_spooled(temp_path, folder, relative_path) is False
+
+
+def test_staged_removal_can_be_undone_or_finished(tmp_path):
+    folder = str(tmp_path)
+    temp_path, digest, _ = spool_upload(io.BytesIO(b'content'), folder)
+    relative_path = shard_path(digest, '.png')
+    store_spooled(temp_path, folder, relative_path)
+    final_path = stored_path(folder, relative_path)
+
+    staged = stage_removal(folder, [relative_path, 'missing/file.png'])
+    assert staged == [relative_path]
+    assert not os.path.exists(final_path)
+    assert os.path.exists(final_path + REMOVED_SUFFIX)
+
+    undo_removal(folder, staged)
+    assert os.path.exists(final_path)
+
+    finish_removal(folder, stage_removal(folder, [relative_path]))
+    assert not os.path.exists(final_path + REMOVED_SUFFIX)
+    assert not os.path.exists(os.path.join(folder, digest[:2]))  # Empty shard directories are pruned
+
+
+def upload(client, course_id, content, filename='certificate.png'):
+    return client.post('/api/certificates', data={
+        'course_id': str(course_id),
+        'performance_score': '90',
+        'certificate_image': (io.BytesIO(content), filename),
+    }, content_type='multipart/form-data')
+
+
+@pytest.fixture
+def blobs(app):
+    import app01
+
+    def blobs():
+        with app.app_context():
+            return [(blob.path, blob.ref_count) for blob in app01.UploadBlob.query.all()]
+    return blobs
+
+
+def test_identical_uploads_share_one_file(app, login, courses, blobs):
+    client = login()
+    content = png_bytes()
+    first = upload(client, courses[0], content).get_json()
+    second = upload(client, courses[1], content).get_json()
+
+    [(relative_path, ref_count)] = blobs()
+    assert ref_count == 2
+    assert os.path.exists(stored_path(app.config['UPLOAD_FOLDER'], relative_path))
+
+    assert client.delete(f"/api/certificates/{first['certificate_id']}").status_code == 200
+    assert blobs() == [(relative_path, 1)]
+    assert os.path.exists(stored_path(app.config['UPLOAD_FOLDER'], relative_path))
+
+    assert client.delete(f"/api/certificates/{second['certificate_id']}").status_code == 200
+    assert blobs() == []
+    assert not os.path.exists(stored_path(app.config['UPLOAD_FOLDER'], relative_path))
+
+
+def test_upload_restores_a_missing_stored_file(app, login, courses, blobs):
+    client = login()
+    content = png_bytes('blue')
+    upload(client, courses[0], content)
+    [(relative_path, _)] = blobs()
+    os.remove(stored_path(app.config['UPLOAD_FOLDER'], relative_path))
+
+    assert upload(client, courses[1], content).status_code == 200
+    assert blobs() == [(relative_path, 2)]
+    assert open(stored_path(app.config['UPLOAD_FOLDER'], relative_path), 'rb').read() == content
+
+
+def test_failed_delete_keeps_the_file(app, login, courses, blobs, monkeypatch):
+    import app01
+    client = login()
+    certificate_id = upload(client, courses[0], png_bytes('green')).get_json()['certificate_id']
+    [(relative_path, _)] = blobs()
+
+    def fail():
+        raise RuntimeError('commit failed')
+    monkeypatch.setattr(app01.db.session, 'commit', fail)
+    assert client.delete(f'/api/certificates/{certificate_id}').status_code == 500
+    monkeypatch.undo()
+
+    assert blobs() == [(relative_path, 1)]
+    assert os.path.exists(stored_path(app.config['UPLOAD_FOLDER'], relative_path))
@@ -1,19 +1,16 @@
-import os
+import argparse
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from db_backend import get_engine
+from course_links import apply_course_urls, load_mapping, print_report
+from cache import CATALOG_TAG, invalidate_shared
 
 # Load environment variables
 load_dotenv()
 
-def update_course_urls():
+def update_course_urls(mapping_path=None):
     try:
-        # Get database URL from environment
-        database_url = os.environ.get('DATABASE_URL')
-        if not database_url:
-            raise ValueError("DATABASE_URL not found in environment variables")
-            
-        # Create SQLAlchemy engine
-        engine = create_engine(database_url)
+        # Create SQLAlchemy engine for DATABASE_URL
+        engine = get_engine()
         
         # Course URLs mapping
         course_urls = {
@@ -22,32 +19,21 @@ def update_course_urls():
             'Data Analysis': 'https://www.coursera.org/professional-certificates/google-data-analytics'
         }
         
-        # Connect to the database
-        with engine.connect() as connection:
-            # Update each course URL
-            for course_name, url in course_urls.items():
-                connection.execute(
-                    text("UPDATE course SET url = :url WHERE name = :name"),
-                    {"url": url, "name": course_name}
-                )
-            connection.commit()
-            
-            print("Successfully updated course URLs")
-            
-            # Verify the updates
-            result = connection.execute(text("SELECT name, url FROM course"))
-            courses = result.fetchall()
-            
-            print("\nUpdated Course URLs:")
-            print("-" * 50)
-            for course in courses:
-                print(f"Course: {course[0]}")
-                print(f"URL: {course[1]}")
-                print("-" * 50)
+        if mapping_path:
+            with open(mapping_path, 'rb') as f:
+                course_urls = load_mapping(f, 'json' if mapping_path.lower().endswith('.json') else 'csv')
+
+        report = apply_course_urls(engine, course_urls)
+        print_report(report)
+        invalidate_shared(CATALOG_TAG)
+        return report
             
     except Exception as e:
         print(f"Error updating course URLs: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    update_course_urls() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Bulk update course URLs from a name -> url mapping')
+    parser.add_argument('mapping', nargs='?', help='CSV (name,url) or JSON mapping; defaults to the built-in one')
+    args = parser.parse_args()
+    update_course_urls(args.mapping) 
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Content-addressed storage for certificate uploads.
+
+Uploads are hashed with SHA-256 while they are streamed to disk and stored
+under a two-level shard directory derived from the digest, e.g.
+``3f/a2/3fa2...c1.png``. Identical uploads therefore map to the same file,
+and no single directory grows past a few hundred entries.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 64 * 1024  # bytes read per iteration while streaming an upload
+TEMP_PREFIX = '.incoming-'
+REMOVED_SUFFIX = '.removed'  # Stored files moved aside until the delete commits
+
+
+def shard_path(digest, extension=''):
+    """Return the storage path (relative to the upload folder) for a digest"""
+    return '/'.join([digest[:2], digest[2:4], f"{digest}{extension}"])
+
+
+def file_extension(filename):
+    """Return the normalised, lower-case extension of an uploaded filename"""
+    return os.path.splitext(secure_filename(filename or ''))[1].lower()
+
+
+def spool_upload(stream, upload_folder):
+    """Stream an upload into a temporary file inside the upload folder.
+
+    The SHA-256 digest is computed on the fly, so the file is only read once.
+    Returns ``(temp_path, digest, size)``; the caller must either hand the
+    temporary file to :func:`store_spooled` or remove it, and remove it afterwards.
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        discard(temp_path)
+        raise
+    return temp_path, hasher.hexdigest(), size
+
+
+def hash_file(path):
+    """Compute the SHA-256 digest of a file already on disk"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def stored_path(upload_folder, relative_path):
+    return os.path.join(upload_folder, *relative_path.split('/'))
+
+
+def store_spooled(temp_path, upload_folder, relative_path):
+    """Make sure ``relative_path`` holds the spooled content, copying it there if it is missing.
+
+    Call it while holding the lock on the upload's reference count, so a
+    concurrent delete can't remove the file in between. The spooled file is
+    left in place; discard it once the reference is committed. Returns True
+    when a new file was written.
+    """
+    final_path = stored_path(upload_folder, relative_path)
+    if os.path.exists(final_path):
+        return False
+    directory = os.path.dirname(final_path)
+    for attempt in range(3):
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd, staging_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+            break
+        except FileNotFoundError:
+            # A delete pruned the empty shard directory in between
+            if attempt == 2:
+                raise
+    os.close(fd)
+    try:
+        shutil.copyfile(temp_path, staging_path)
+        os.replace(staging_path, final_path)
+    except Exception:
+        discard(staging_path)
+        raise
+    return True
+
+
+def stage_removal(upload_folder, relative_paths):
+    """Move stored files aside ahead of deleting them.
+
+    Call it while the rows referencing them are locked and before the delete
+    commits, then :func:`finish_removal` after the commit, or
+    :func:`undo_removal` if it fails. An upload of the same content that was
+    waiting on the lock then finds the file gone and stores it again, instead
+    of referencing a file that is about to disappear.
+    """
+    staged = []
+    for relative_path in relative_paths:
+        final_path = stored_path(upload_folder, relative_path)
+        try:
+            os.replace(final_path, final_path + REMOVED_SUFFIX)
+        except FileNotFoundError:
+            continue
+        staged.append(relative_path)
+    return staged
+
+
+def finish_removal(upload_folder, staged):
+    for relative_path in staged:
+        final_path = stored_path(upload_folder, relative_path)
+        discard(final_path + REMOVED_SUFFIX)
+        prune_shard_dirs(upload_folder, os.path.dirname(final_path))
+
+
+def undo_removal(upload_folder, staged):
+    for relative_path in staged:
+        final_path = stored_path(upload_folder, relative_path)
+        os.replace(final_path + REMOVED_SUFFIX, final_path)
+
+
+def remove_stored(upload_folder, relative_path):
+    """Delete a stored file and prune its shard directories once empty"""
+    final_path = stored_path(upload_folder, relative_path)
+    discard(final_path)
+    prune_shard_dirs(upload_folder, os.path.dirname(final_path))
+
+
+def prune_shard_dirs(upload_folder, directory):
+    root = os.path.abspath(upload_folder)
+    # Walk back up the two shard levels, stopping at the first non-empty one
+    while os.path.abspath(directory) != root and directory.startswith(upload_folder):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def discard(path):
+    """Remove a file, ignoring it if it is already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
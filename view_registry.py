@@ -0,0 +1,38 @@
+"""
+Routes and request handlers declared before there is an application.
+
+``app01`` defines its views at import time but builds applications in
+``create_app``, possibly more than one per process. A :class:`ViewRegistry`
+records ``route``, ``errorhandler`` and ``before_request`` registrations
+made with its decorators and replays them on each application in
+``init_app``. Unlike a blueprint it adds no prefix to endpoint names, so
+``url_for('login')`` and ``login_view = 'login'`` keep working.
+"""
+
+
+class ViewRegistry:
+    def __init__(self):
+        self._registrations = []  # (Flask method name, args, kwargs, function)
+
+    def _defer(self, method, *args, **kwargs):
+        def decorator(f):
+            self._registrations.append((method, args, kwargs, f))
+            return f
+        return decorator
+
+    def route(self, rule, **options):
+        return self._defer('route', rule, **options)
+
+    def errorhandler(self, code_or_exception):
+        return self._defer('errorhandler', code_or_exception)
+
+    def before_request(self, f):
+        self._registrations.append(('before_request', None, None, f))
+        return f
+
+    def init_app(self, app):
+        for method, args, kwargs, f in self._registrations:
+            if args is None:
+                getattr(app, method)(f)
+            else:
+                getattr(app, method)(*args, **kwargs)(f)
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With ``preload_app`` the master imports this module once, so the shared
+state loaded by ``preload_shared_state`` is inherited by every worker.
+"""
+
+from app01 import app, preload_shared_state
+
+preload_shared_state(app)